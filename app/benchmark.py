@@ -0,0 +1,309 @@
+"""Headless load generator and benchmark for the subtitle pipeline.
+
+Runs the real SubtitleApp (server thread, handoff and SubtitleWindow) under
+the offscreen Qt platform, drives it with N concurrent WebSocket clients and
+writes a machine-readable JSON report:
+
+    python app/benchmark.py --clients 4 --rate 20 --duration 30 --output run.json
+
+The load generator runs in the same process, so CPU and RSS figures include
+it; compare runs made with the same client settings.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Subtitle Overlay load benchmark")
+    parser.add_argument('--clients', type=int, default=1,
+                        help="number of concurrent WebSocket clients")
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help="subtitles per second sent by each client")
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help="seconds to generate load")
+    parser.add_argument('--text-length', default='20:80',
+                        help="subtitle length in characters, MIN:MAX (uniform)")
+    parser.add_argument('--protocol', choices=('json', 'binary'), default='json',
+                        help="wire protocol used by the clients")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8790)
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help="server per-client rate limit (0 disables)")
+    parser.add_argument('--switch-delay', type=float, default=0,
+                        help="server source switch delay (0 accepts every client)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+WORDS = ("the quick brown fox jumps over a lazy dog while subtitles roll past "
+         "and everyone keeps talking about nothing in particular").split()
+
+
+def make_text(rng: random.Random, min_length: int, max_length: int, serial: int) -> str:
+    """Build a unique subtitle of roughly uniform random length"""
+    target = rng.randint(min_length, max_length)
+    words = [str(serial)]
+    length = len(words[0])
+    while length < target:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:max(target, len(words[0]))]
+
+
+class ProcessSampler:
+    """CPU time and resident memory of this process"""
+
+    def __init__(self):
+        self.wall = time.perf_counter()
+        self.cpu = self.cpu_seconds()
+
+    @staticmethod
+    def cpu_seconds() -> float:
+        if resource is None:
+            return time.process_time()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    @staticmethod
+    def rss_bytes() -> int:
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            return 0
+
+    @staticmethod
+    def peak_rss_bytes() -> int:
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def result(self):
+        wall = time.perf_counter() - self.wall
+        cpu = self.cpu_seconds() - self.cpu
+        return {
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'cpu_percent': cpu / wall * 100 if wall else 0.0,
+            'rss_bytes': self.rss_bytes(),
+            'peak_rss_bytes': self.peak_rss_bytes(),
+        }
+
+
+class LoadGenerator:
+    """Runs the benchmark clients on their own asyncio loop in a thread"""
+
+    def __init__(self, args):
+        self.args = args
+        self.sent = 0
+        self.bytes_sent = 0
+        self.errors = 0
+        self.finished = threading.Event()
+        min_length, max_length = (int(v) for v in args.text_length.split(':'))
+        self.text_range = (min_length, max_length)
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            asyncio.run(self.run_clients())
+        finally:
+            self.finished.set()
+
+    async def run_clients(self):
+        import websockets
+
+        uri = f"ws://{self.args.host}:{self.args.port}"
+        connections = []
+        for attempt in range(50):
+            try:
+                for _ in range(self.args.clients - len(connections)):
+                    connections.append(await websockets.connect(uri))
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+        else:
+            self.errors += 1
+            return
+
+        deadline = time.monotonic() + self.args.duration
+        await asyncio.gather(*(
+            self.run_client(index, websocket, deadline)
+            for index, websocket in enumerate(connections)
+        ))
+        for websocket in connections:
+            await websocket.close()
+
+    async def run_client(self, index: int, websocket, deadline: float):
+        from protocol import encode_cues, encode_register, PROTOCOL_BINARY
+
+        seed = None if self.args.seed is None else self.args.seed + index
+        rng = random.Random(seed)
+        url = f"https://benchmark.invalid/client/{index}"
+        binary = False
+        if self.args.protocol == 'binary':
+            await websocket.send(json.dumps({
+                'type': 'hello', 'protocols': [PROTOCOL_BINARY], 'url': url
+            }))
+            reply = json.loads(await websocket.recv())
+            binary = reply.get('protocol') == PROTOCOL_BINARY
+            if binary:
+                await websocket.send(encode_register(url, int(time.time() * 1000)))
+
+        interval = 1.0 / self.args.rate if self.args.rate > 0 else 0
+        next_send = time.monotonic() + rng.random() * interval
+        serial = 0
+        while time.monotonic() < deadline:
+            serial += 1
+            text = make_text(rng, *self.text_range, serial=index * 10_000_000 + serial)
+            timestamp = int(time.time() * 1000)
+            if binary:
+                message = encode_cues([(timestamp, text)])
+            else:
+                message = json.dumps({
+                    'type': 'subtitle', 'text': text, 'timestamp': timestamp, 'url': url
+                })
+            try:
+                await websocket.send(message)
+            except Exception:
+                self.errors += 1
+                return
+            self.sent += 1
+            self.bytes_sent += len(message) if binary else len(message.encode('utf-8'))
+
+            next_send += interval
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                await asyncio.sleep(0)
+
+
+def run_benchmark(args):
+    # Nothing of the user's is read or written: no config, history or glossary
+    with tempfile.TemporaryDirectory(prefix='subtitle-benchmark-') as config_dir:
+        return run_in(args, config_dir)
+
+
+def run_in(args, config_dir):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    from config import ConfigManager
+    from main import SubtitleApp
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    app.setQuitOnLastWindowClosed(False)
+
+    # Defaults in a scratch directory, with the optional work that would skew
+    # the numbers switched off; changed in memory only
+    config = ConfigManager(config_dir=config_dir)
+    config.settings['behavior']['persist_history'] = False
+    config.settings['text']['glossary_file'] = ''
+    config.settings['diagnostics']['loop_watchdog'] = False
+    server_settings = config.settings['server']
+    server_settings.update({
+        'host': args.host,
+        'port': args.port,
+        'rate_limit': args.rate_limit,
+        'source_switch_delay': args.switch_delay,
+    })
+    config.refresh_snapshot()
+    subtitle_app = SubtitleApp(config)
+
+    generator = LoadGenerator(args)
+    sampler = None
+
+    def begin():
+        nonlocal sampler
+        sampler = ProcessSampler()
+        generator.start()
+        poll.start(50)
+
+    def check_done():
+        if generator.finished.is_set():
+            poll.stop()
+            # Give the GUI a moment to drain the last subtitle
+            QTimer.singleShot(250, app.quit)
+
+    poll = QTimer()
+    poll.timeout.connect(check_done)
+    QTimer.singleShot(200, begin)
+    app.exec()
+
+    process = sampler.result() if sampler else {}
+    handoff = subtitle_app.handoff.stats()
+    server_stats = subtitle_app.server.get_stats()
+    received = server_stats['json']['cues'] + server_stats['binary']['cues']
+    filtered = (server_stats['rate_limited'] + server_stats['duplicates']
+                + server_stats['inactive_source'])
+    wall = process.get('wall_seconds') or args.duration
+
+    report = {
+        'timestamp': time.time(),
+        'platform': {
+            'python': platform.python_version(),
+            'system': platform.platform(),
+            'qt_platform': os.environ.get('QT_QPA_PLATFORM'),
+        },
+        'config': vars(args),
+        'results': {
+            'sent': generator.sent,
+            'bytes_sent': generator.bytes_sent,
+            'client_errors': generator.errors,
+            'received': received,
+            'lost_in_transit': generator.sent - received,
+            'filtered': filtered,
+            'filter_breakdown': {
+                'rate_limited': server_stats['rate_limited'],
+                'duplicates': server_stats['duplicates'],
+                'inactive_source': server_stats['inactive_source'],
+            },
+            'decode_errors': server_stats['decode_errors'],
+            'handoff': handoff,
+            'displayed': handoff['delivered'],
+            'dropped': generator.sent - handoff['delivered'],
+            'throughput_received_per_second': received / wall,
+            'throughput_displayed_per_second': handoff['delivered'] / wall,
+            'latency_ms': subtitle_app.server.latency.summary(),
+            'process': process,
+        },
+    }
+    subtitle_app.server_thread.stop()
+    return report
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Benchmark report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Fan-out of the live subtitle stream to subscriber clients.
+
+A client becomes a subscriber by sending `{"type": "subscribe"}`. Every
+published subtitle is serialised once per wire format and the same buffer
+is queued for every subscriber. Each subscriber has its own bounded queue
+drained by its own writer task, so a slow consumer only ever fills its own
+queue and the producer never waits on a socket.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
+import websockets.exceptions
+
+from protocol import PROTOCOL_BINARY, ProtocolError, encode_cues
+
+POLICY_DROP = 'drop'              # drop the oldest queued message
+POLICY_DISCONNECT = 'disconnect'  # close the connection
+
+
+class Subscriber:
+    """Bounded send queue and writer task for one subscribing client"""
+
+    def __init__(self, session, queue_size: int, policy: str):
+        self.session = session
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(max(1, queue_size))
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def offer(self, message) -> bool:
+        """Queue a message without waiting; False when the subscriber is cut off"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.policy == POLICY_DISCONNECT:
+            self.close(1008, "subscriber too slow")
+            return False
+        self.queue.get_nowait()
+        self.queue.put_nowait(message)
+        self.dropped += 1
+        return True
+
+    async def run(self):
+        websocket = self.session.websocket
+        try:
+            while True:
+                message = await self.queue.get()
+                await websocket.send(message)
+                self.sent += 1
+        except websockets.exceptions.ConnectionClosed:
+            self.closed = True
+
+    def close(self, code: int = 1000, reason: str = ""):
+        if self.closed:
+            return
+        self.closed = True
+        self.task.cancel()
+        asyncio.get_running_loop().create_task(self.session.websocket.close(code, reason))
+
+    def describe(self) -> Dict:
+        return {
+            'id': self.session.client_id,
+            'queued': self.queue.qsize(),
+            'sent': self.sent,
+            'dropped': self.dropped,
+        }
+
+
+class Broadcaster:
+    """Publishes subtitles to all subscribers; call only on the server loop"""
+
+    def __init__(self, queue_size: int = 64, policy: str = POLICY_DROP):
+        self.queue_size = queue_size
+        self.policy = policy
+        self.subscribers: Dict[int, Subscriber] = {}
+        self.published = 0
+        self.disconnected = 0
+        self.retired = {'sent': 0, 'dropped': 0}  # counters of departed subscribers
+
+    def subscribe(self, session) -> Subscriber:
+        subscriber = self.subscribers.get(session.client_id)
+        if subscriber is None:
+            subscriber = Subscriber(session, self.queue_size, self.policy)
+            self.subscribers[session.client_id] = subscriber
+        return subscriber
+
+    def unsubscribe(self, session):
+        subscriber = self.subscribers.pop(session.client_id, None)
+        if subscriber is not None:
+            subscriber.close()
+            self.retire(subscriber)
+
+    def retire(self, subscriber: Subscriber):
+        self.retired['sent'] += subscriber.sent
+        self.retired['dropped'] += subscriber.dropped
+
+    def publish(self, text: str, source_id: int = 0, timestamp: Optional[float] = None):
+        """Queue a subtitle for every subscriber; empty text clears the display"""
+        if not self.subscribers:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        self.published += 1
+
+        # Serialise at most once per format, shared by all subscribers
+        encoded = {}
+        for client_id, subscriber in list(self.subscribers.items()):
+            binary = subscriber.session.protocol == PROTOCOL_BINARY
+            message = encoded.get(binary)
+            if message is None:
+                message = encoded[binary] = self.encode(text, source_id, timestamp, binary)
+            if not subscriber.offer(message):
+                del self.subscribers[client_id]
+                self.retire(subscriber)
+                self.disconnected += 1
+
+    @staticmethod
+    def encode(text: str, source_id: int, timestamp: float, binary: bool):
+        if binary:
+            try:
+                return encode_cues([(int(timestamp * 1000), text)])
+            except ProtocolError:
+                # Oversized text still goes out as JSON
+                pass
+        return json.dumps({
+            'type': 'subtitle',
+            'text': text,
+            'source': source_id,
+            'timestamp': int(timestamp * 1000),
+        })
+
+    def stats(self) -> Dict:
+        current = list(self.subscribers.values())
+        return {
+            'subscribers': len(self.subscribers),
+            'queued': sum(s.queue.qsize() for s in current),
+            'published': self.published,
+            'sent': self.retired['sent'] + sum(s.sent for s in current),
+            'dropped': self.retired['dropped'] + sum(s.dropped for s in current),
+            'disconnected': self.disconnected,
+        }
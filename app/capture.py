@@ -0,0 +1,76 @@
+"""Capture files: every inbound WebSocket frame with its arrival time.
+
+A capture is a gzip stream (level 1, cheap enough for the server loop):
+
+    header   5s magic b'SOCAP', u8 version, f64 wall-clock start time
+    records  f64 seconds since start, u32 client id, u8 kind, u32 length, payload
+
+Kinds are connect and disconnect (empty payload), text frames (UTF-8
+JSON) and binary frames (protocol 2). `replay.py` feeds a capture back
+into a running server.
+"""
+import gzip
+import struct
+import time
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+CAPTURE_MAGIC = b'SOCAP'
+CAPTURE_VERSION = 1
+CAPTURE_HEADER = struct.Struct('<5sBd')
+RECORD_HEADER = struct.Struct('<dIBI')
+
+KIND_CONNECT = 0
+KIND_DISCONNECT = 1
+KIND_TEXT = 2
+KIND_BINARY = 3
+
+
+class CaptureRecord(NamedTuple):
+    offset: float      # seconds since the capture started
+    client_id: int
+    kind: int
+    payload: bytes
+
+
+class CaptureWriter:
+    """Appends records to a capture file; call from one thread only"""
+
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+        self.started = time.monotonic()
+        self.file = gzip.open(self.path, 'wb', compresslevel=1)
+        self.file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, time.time()))
+        self.records = 0
+
+    def record(self, client_id: int, kind: int, payload=b''):
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        self.file.write(RECORD_HEADER.pack(
+            time.monotonic() - self.started, client_id, kind, len(payload)))
+        self.file.write(payload)
+        self.records += 1
+
+    def close(self):
+        self.file.close()
+
+
+def read_capture(path) -> Iterator[CaptureRecord]:
+    """Yield the records of a capture file in order"""
+    with gzip.open(Path(path).expanduser(), 'rb') as f:
+        magic, version, _ = CAPTURE_HEADER.unpack(f.read(CAPTURE_HEADER.size))
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"{path} is not a subtitle capture file")
+        # A capture cut off by a crash simply ends at the last full record
+        while True:
+            try:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                offset, client_id, kind, length = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+            except EOFError:
+                return
+            if len(payload) < length:
+                return
+            yield CaptureRecord(offset, client_id, kind, payload)
@@ -1,14 +1,107 @@
+import atexit
 import json
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+
+@dataclass(frozen=True)
+class WindowSettings:
+    x: int
+    y: int
+    width: int
+    height: int
+    opacity: float
+    always_on_top: bool
+
+
+@dataclass(frozen=True)
+class TextSettings:
+    font_family: str
+    font_size: int
+    color: str
+    outline: bool
+    outline_color: str
+    outline_width: int
+    highlight_color: str
+    glossary_file: str
+
+
+@dataclass(frozen=True)
+class BackgroundSettings:
+    color: str
+    opacity: float
+
+
+@dataclass(frozen=True)
+class BehaviorSettings:
+    auto_hide: bool
+    auto_hide_delay: int
+    max_lines: int
+    history_size: int
+    persist_history: bool
+    search_index_size: int
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    port: int
+    host: str
+    source_policy: str
+    source_switch_delay: float
+    dedup_window: float
+    rate_limit: float
+    rate_burst: float
+    subscriber_queue: int
+    slow_subscriber: str
+    jitter_window: float
+    max_cue_age: float
+    unix_socket: str
+    line_input: str
+    separate_process: bool
+    transforms: list
+    transform_workers: int
+    transform_executor: str
+    transform_cache: int
+    gloss_dictionary: str
+
+
+@dataclass(frozen=True)
+class DiagnosticsSettings:
+    loop_watchdog: bool
+    stall_threshold: int
+    profiler: str
+    sample_interval: int
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Immutable, typed view of the settings for hot paths"""
+    window: WindowSettings
+    text: TextSettings
+    background: BackgroundSettings
+    behavior: BehaviorSettings
+    server: ServerSettings
+    diagnostics: DiagnosticsSettings
+
 
 class ConfigManager:
-    def __init__(self):
-        self.config_dir = Path.home() / '.subtitle_overlay'
+    def __init__(self, flush_delay: float = 1.0, config_dir: Optional[Path] = None):
+        self.config_dir = Path(config_dir) if config_dir else Path.home() / '.subtitle_overlay'
         self.config_file = self.config_dir / 'config.json'
         self.config_dir.mkdir(exist_ok=True)
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._transaction_depth = 0
+        self._flush_timer = None
         self.settings = self.load_settings()
+        self.snapshot = self.build_snapshot()
+        atexit.register(self.flush)
     
     def get_default_settings(self) -> Dict[str, Any]:
         return {
@@ -26,7 +119,9 @@ class ConfigManager:
                 'color': '#FFFFFF',
                 'outline': True,
                 'outline_color': '#000000',
-                'outline_width': 2
+                'outline_width': 2,
+                'highlight_color': '#FFD54F',  # glossary terms
+                'glossary_file': ''  # one term per line; empty disables highlighting
             },
             'background': {
                 'color': '#000000',
@@ -35,11 +130,38 @@ class ConfigManager:
             'behavior': {
                 'auto_hide': True,
                 'auto_hide_delay': 4000,  # milliseconds
-                'max_lines': 3
+                'max_lines': 3,
+                'history_size': 1000,
+                'persist_history': True,
+                'search_index_size': 100000  # lines kept in the search index
             },
             'server': {
                 'port': 8765,
-                'host': '127.0.0.1'
+                'host': '127.0.0.1',
+                'source_policy': 'latest',  # 'latest' or 'pinned'
+                'source_switch_delay': 2.0,  # seconds
+                'dedup_window': 3.0,  # seconds
+                'rate_limit': 10,  # subtitles per second per client
+                'rate_burst': 20,
+                'subscriber_queue': 64,  # messages buffered per subscriber
+                'slow_subscriber': 'drop',  # 'drop' oldest or 'disconnect' when full
+                'jitter_window': 25,  # ms to hold cues for reordering by client timestamp
+                'max_cue_age': 3000,  # ms; older cues are dropped
+                'unix_socket': '',  # also accept length-prefixed messages on this socket path
+                'line_input': '',  # '-' reads messages from stdin, or a FIFO path
+                'separate_process': False,  # run ingest in a child process
+                # Ordered subset of strip_tags, normalize_whitespace, transliterate, gloss
+                'transforms': [],
+                'transform_workers': 2,
+                'transform_executor': 'thread',  # 'thread' or 'process'
+                'transform_cache': 1024,  # memoized results
+                'gloss_dictionary': ''  # tab-separated "word<TAB>gloss" file
+            },
+            'diagnostics': {
+                'loop_watchdog': False,  # measure event-loop lag, log stalls (Diagnostics menu)
+                'stall_threshold': 250,  # milliseconds without a heartbeat
+                'profiler': 'sampling',  # 'sampling' or 'cprofile'
+                'sample_interval': 5  # milliseconds, sampling profiler
             }
         }
     
@@ -50,18 +172,101 @@ class ConfigManager:
                     loaded = json.load(f)
                     defaults = self.get_default_settings()
                     # Merge with defaults to handle new settings
-                    return {**defaults, **loaded}
+                    return self.merge_settings(defaults, loaded)
             except Exception as e:
                 print(f"Error loading config: {e}")
         return self.get_default_settings()
     
+    def merge_settings(self, defaults: Dict[str, Any], loaded: Dict[str, Any]) -> Dict[str, Any]:
+        """Recursively overlay loaded settings on the defaults"""
+        merged = dict(defaults)
+        for key, value in loaded.items():
+            if isinstance(merged.get(key), dict):
+                # A section that is not an object keeps its defaults
+                if isinstance(value, dict):
+                    merged[key] = self.merge_settings(merged[key], value)
+            else:
+                merged[key] = value
+        return merged
+    
+    def build_snapshot(self) -> Settings:
+        """Build the typed snapshot from the current settings"""
+        defaults = self.get_default_settings()
+        sections = {}
+        for section in fields(Settings):
+            values = {**defaults[section.name], **self.settings.get(section.name, {})}
+            sections[section.name] = section.type(
+                **{field.name: values[field.name] for field in fields(section.type)}
+            )
+        return Settings(**sections)
+    
+    def refresh_snapshot(self):
+        """Rebuild the snapshot after settings were changed in memory"""
+        with self._lock:
+            self.snapshot = self.build_snapshot()
+    
     def save_settings(self):
+        """Write settings now, atomically (temp file + rename)"""
+        with self._lock:
+            data = json.dumps(self.settings, indent=2)
+            self._dirty = False
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.settings, f, indent=2)
+            fd, temp_path = tempfile.mkstemp(
+                dir=self.config_dir, prefix='.config-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.config_file)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
         except Exception as e:
+            with self._lock:
+                self._dirty = True
             print(f"Error saving config: {e}")
     
+    def flush(self):
+        """Write pending changes immediately, if any"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save_settings()
+    
+    def schedule_flush(self):
+        """Debounce writes: save once changes stop arriving for flush_delay"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+    
+    @contextmanager
+    def transaction(self):
+        """Group several set() calls into one snapshot rebuild and one write"""
+        with self._lock:
+            self._transaction_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._transaction_depth -= 1
+                done = self._transaction_depth == 0
+            if done:
+                self.commit()
+    
+    def commit(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self.snapshot = self.build_snapshot()
+        self.schedule_flush()
+    
     def get(self, *keys):
         value = self.settings
         for key in keys:
@@ -71,8 +276,14 @@ class ConfigManager:
         return value
     
     def set(self, *keys, value):
-        settings = self.settings
-        for key in keys[:-1]:
-            settings = settings.setdefault(key, {})
-        settings[keys[-1]] = value
-        self.save_settings()
\ No newline at end of file
+        with self._lock:
+            settings = self.settings
+            for key in keys[:-1]:
+                settings = settings.setdefault(key, {})
+            if keys[-1] in settings and settings[keys[-1]] == value:
+                return
+            settings[keys[-1]] = value
+            self._dirty = True
+            in_transaction = self._transaction_depth > 0
+        if not in_transaction:
+            self.commit()
\ No newline at end of file
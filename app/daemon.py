@@ -0,0 +1,273 @@
+"""Headless subtitle daemon: the WebSocket ingest without any Qt.
+
+Runs SubtitleServer on a plain asyncio loop and writes accepted subtitles
+to one or more sinks instead of the overlay window:
+
+    python app/daemon.py --sink stdout --sink jsonl:~/subs.jsonl --sink text:/tmp/now.txt
+
+Sinks:
+    stdout        print each subtitle
+    jsonl:PATH    append {"time", "source", "text"} lines
+    text:PATH     keep PATH containing only the current subtitle (for
+                  streaming software text sources); emptied on hide
+
+History is persisted like in the desktop app unless --no-history is
+given, and subscribers (see README) receive the stream as usual. Cue
+tracks uploaded by pages are played on the loop's clock. SIGINT/SIGTERM
+stop the server, flush history and close the sinks.
+
+--unix-socket and --input add the local transports described in
+local_ipc.py, e.g. `--input -` to pipe subtitles in on stdin.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from config import ConfigManager
+from rolling import RollingCaption
+from server import SubtitleServer
+
+
+class StdoutSink:
+    def write(self, text: str, timestamp: float, source_id: int):
+        if text:
+            stamp = time.strftime('%H:%M:%S', time.localtime(timestamp))
+            print(f"[{stamp}] {text}", flush=True)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    def __init__(self, path: Path):
+        self.file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def write(self, text: str, timestamp: float, source_id: int):
+        if text:
+            self.file.write(json.dumps(
+                {'time': timestamp, 'source': source_id, 'text': text},
+                ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class TextFileSink:
+    """Replace the file atomically so readers never see a partial line"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.write("", time.time(), 0)
+
+    def write(self, text: str, timestamp: float, source_id: int):
+        try:
+            fd, temp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp, self.path)
+        except OSError as e:
+            print(f"Error writing {self.path}: {e}")
+
+    def close(self):
+        self.write("", time.time(), 0)
+
+
+class HistorySink:
+    """Stores each caption once it is finished, not every growing prefix"""
+
+    def __init__(self, store):
+        self.store = store
+        self.caption = RollingCaption()
+
+    def write(self, text: str, timestamp: float, source_id: int):
+        if text:
+            _, finished = self.caption.update(text, timestamp, source_id)
+        else:
+            finished = self.caption.finish()
+        for line, started, source in finished:
+            self.store.append(line, started, source)
+
+    def close(self):
+        self.write("", time.time(), 0)
+        self.store.close()
+
+
+def create_sink(spec: str):
+    kind, _, target = spec.partition(':')
+    if kind == 'stdout':
+        return StdoutSink()
+    if kind in ('jsonl', 'text') and target:
+        path = Path(target).expanduser()
+        return JsonLinesSink(path) if kind == 'jsonl' else TextFileSink(path)
+    raise ValueError(f"Unknown sink: {spec}")
+
+
+class TrackScheduler:
+    """Plays an uploaded cue track against the page's media clock on the loop.
+
+    The asyncio counterpart of playback.SubtitlePlayer: one timer handle
+    armed for the next cue boundary, re-anchored by clock heartbeats.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, emit, tolerance: float = 0.05):
+        self.loop = loop
+        self.emit = emit
+        self.tolerance = tolerance
+        self.track = None
+        self.source_id = 0
+        self.anchor_position = 0.0
+        self.anchor_time = loop.time()
+        self.rate = 1.0
+        self.playing = False
+        self.current_text = ""
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+    def position(self) -> float:
+        if not self.playing:
+            return self.anchor_position
+        return self.anchor_position + (self.loop.time() - self.anchor_time) * self.rate
+
+    def set_track(self, client_id: int, track):
+        self.track = track
+        self.source_id = client_id
+        self.playing = False
+        self.update()
+
+    def sync_clock(self, client_id: int, position: float, rate: float, playing: bool):
+        drift = abs(self.position() - position)
+        if playing != self.playing or rate != self.rate or drift > self.tolerance:
+            self.anchor_position = position
+            self.anchor_time = self.loop.time()
+            self.rate = rate
+            self.playing = playing
+            self.update()
+
+    def update(self):
+        if self.handle:
+            self.handle.cancel()
+            self.handle = None
+        if self.track is None:
+            self.show("")
+            return
+        now = self.position()
+        self.show(self.track.text_at(now))
+        if not self.playing or self.rate <= 0:
+            return
+        next_change = self.track.next_change(now)
+        if next_change is not None:
+            # +1 ms so the boundary has passed when the timer fires
+            delay = (next_change - now) / self.rate + 0.001
+            self.handle = self.loop.call_later(delay, self.update)
+
+    def show(self, text: str):
+        if text != self.current_text:
+            self.current_text = text
+            self.emit(text, self.source_id)
+
+
+class SubtitleDaemon:
+    def __init__(self, config: ConfigManager, sinks: List, history: bool = True):
+        self.config = config
+        self.sinks = list(sinks)
+        self.server = SubtitleServer.from_config(config)
+        self.server.set_subtitle_callback(self.on_subtitle)
+        self.history_store = None
+        if history and config.get('behavior', 'persist_history'):
+            from history_store import HistoryStore
+            self.history_store = HistoryStore(config.config_dir / 'history')
+            self.sinks.append(HistorySink(self.history_store))
+        self.tracks: Optional[TrackScheduler] = None
+
+    def on_subtitle(self, text: str, timing=None, source_id: int = 0):
+        self.write(text, source_id)
+
+    def on_track_cue(self, text: str, source_id: int):
+        # Track cues never passed through dispatch, so publish them here
+        self.server.publish(text, source_id)
+        self.write(text, source_id)
+
+    def write(self, text: str, source_id: int):
+        timestamp = time.time()
+        for sink in self.sinks:
+            sink.write(text, timestamp, source_id)
+
+    def request_stop(self):
+        print("Shutting down...")
+        asyncio.get_running_loop().create_task(self.server.stop())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.tracks = TrackScheduler(loop, self.on_track_cue)
+        self.server.set_track_callback(self.tracks.set_track)
+        self.server.set_clock_callback(self.tracks.sync_clock)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.request_stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows: fall back to a plain handler that hops onto the loop
+                signal.signal(signum, lambda *_: loop.call_soon_threadsafe(self.request_stop))
+        try:
+            await self.server.start()
+        finally:
+            self.close()
+
+    def close(self):
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except OSError as e:
+                print(f"Error closing sink: {e}")
+        self.sinks = []
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless subtitle server without the overlay")
+    parser.add_argument('--sink', action='append', metavar='SPEC',
+                        help="stdout, jsonl:PATH or text:PATH; repeatable (default: stdout)")
+    parser.add_argument('--no-history', action='store_true',
+                        help="don't persist subtitle history")
+    parser.add_argument('--host', help="override server.host")
+    parser.add_argument('--port', type=int, help="override server.port")
+    parser.add_argument('--capture', metavar='PATH',
+                        help="record every inbound WebSocket frame to PATH for replay.py")
+    parser.add_argument('--unix-socket', metavar='PATH',
+                        help="also accept length-prefixed messages on this Unix socket")
+    parser.add_argument('--input', metavar='PATH',
+                        help="read one message per line from PATH (a FIFO) or - for stdin")
+    args = parser.parse_args(argv)
+
+    config = ConfigManager()
+    if args.host:
+        config.settings['server']['host'] = args.host
+    if args.port:
+        config.settings['server']['port'] = args.port
+    if args.unix_socket:
+        config.settings['server']['unix_socket'] = args.unix_socket
+    if args.input:
+        config.settings['server']['line_input'] = args.input
+    try:
+        sinks = [create_sink(spec) for spec in args.sink or ['stdout']]
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        return 2
+
+    daemon = SubtitleDaemon(config, sinks, history=not args.no_history)
+    if args.capture:
+        daemon.server.start_capture(args.capture)
+    try:
+        asyncio.run(daemon.run())
+    except OSError as e:
+        print(f"Failed to start WebSocket server: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""Event-loop lag watchdog and on-demand profilers.
+
+Each watched loop (the asyncio loop in ServerThread, the Qt main loop)
+runs a heartbeat every `interval`; how late each beat fires is its
+scheduling lag. A watchdog thread checks the heartbeats, and when a loop
+has not beaten for longer than the stall threshold it grabs that loop
+thread's stack right then, while it is still blocked. Stalls are appended
+to `stalls.log`; `Watchdog.dump()` writes lag percentiles and recent
+stalls as JSON for bug reports.
+
+The profilers are started and stopped from the tray:
+
+    SamplingProfiler   samples the watched threads' stacks every few ms and
+                       writes collapsed stacks (flamegraph.pl / speedscope)
+    CProfileCapture    runs cProfile on each thread and writes pstats text
+
+Since Python 3.12 cProfile hooks into sys.monitoring, which allows only one
+active profiler per process and does not tell threads apart, so there
+`create_profiler()` falls back to sampling.
+"""
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from metrics import LatencyHistogram
+
+
+class LoopMonitor:
+    """Heartbeat and lag histogram of one event loop"""
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.thread_id: Optional[int] = None
+        self.lag = LatencyHistogram()
+        self.last_beat = time.monotonic()
+        self.due: Optional[float] = None
+        self.stall: Optional[Dict] = None  # the stall in progress, watchdog thread only
+        self._lock = threading.Lock()
+
+    def beat(self):
+        """Call on the loop's own thread every `interval` seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self.due is not None:
+                self.lag.record(max(0.0, now - self.due) * 1000)
+            self.thread_id = threading.get_ident()
+            self.last_beat = now
+            self.due = now + self.interval
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return self.lag.summary()
+
+
+class Watchdog:
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05,
+                 log_dir: Optional[Path] = None, max_stalls: int = 100):
+        self.threshold = threshold
+        self.interval = interval
+        self.log_dir = log_dir
+        self.monitors: List[LoopMonitor] = []
+        self.stalls = deque(maxlen=max_stalls)
+        self.started = time.time()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_loop(self, name: str) -> LoopMonitor:
+        """Register a loop; its owner must call beat() every `interval` seconds"""
+        monitor = LoopMonitor(name, self.interval)
+        self.monitors.append(monitor)
+        return monitor
+
+    def watch_asyncio(self, name: str, loop) -> LoopMonitor:
+        """Start a heartbeat on an asyncio loop; safe to call from any thread"""
+        monitor = self.add_loop(name)
+
+        def tick():
+            if self._stop.is_set():
+                return
+            monitor.beat()
+            loop.call_later(monitor.interval, tick)
+
+        loop.call_soon_threadsafe(tick)
+        return monitor
+
+    def thread_ids(self) -> Dict[str, int]:
+        return {m.name: m.thread_id for m in self.monitors if m.thread_id is not None}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            for monitor in self.monitors:
+                self.check(monitor, now)
+
+    def check(self, monitor: LoopMonitor, now: float):
+        late = now - monitor.last_beat - monitor.interval
+        if monitor.stall is None:
+            if late > self.threshold and monitor.thread_id is not None:
+                monitor.stall = {
+                    'loop': monitor.name,
+                    'time': time.time() - late,
+                    'beat': monitor.last_beat,
+                    'stack': self.stack_of(monitor.thread_id),
+                }
+        elif monitor.last_beat != monitor.stall['beat']:
+            # The loop is running again; the gap between beats is the stall
+            stall = monitor.stall
+            monitor.stall = None
+            stall['duration_ms'] = (monitor.last_beat - stall.pop('beat') - monitor.interval) * 1000
+            self.record_stall(stall)
+
+    @staticmethod
+    def stack_of(thread_id: int) -> List[str]:
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            return []
+        return [line.rstrip() for line in traceback.format_stack(frame)]
+
+    def record_stall(self, stall: Dict):
+        self.stalls.append(stall)
+        print(f"{stall['loop']} loop stalled for {stall['duration_ms']:.0f} ms")
+        if not self.log_dir:
+            return
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stall['time']))
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.log_dir / 'stalls.log', 'a', encoding='utf-8') as f:
+                f.write(f"{stamp} {stall['loop']} loop stalled for "
+                        f"{stall['duration_ms']:.0f} ms in:\n")
+                f.write("\n".join(stall['stack']) + "\n\n")
+        except OSError as e:
+            print(f"Error writing stall log: {e}")
+
+    def format_summary(self) -> str:
+        lines = []
+        for monitor in self.monitors:
+            lag = monitor.summary()
+            stalls = sum(1 for stall in self.stalls if stall['loop'] == monitor.name)
+            lines.append(f"{monitor.name}: lag p50 {lag['p50']:.1f} / p99 {lag['p99']:.1f} / "
+                         f"max {lag['max']:.0f} ms, {stalls} stalls")
+        return "\n".join(lines) or "No loops watched"
+
+    def dump(self, path):
+        """Write lag percentiles and recent stalls as JSON"""
+        report = {
+            'started': self.started,
+            'written': time.time(),
+            'interval_ms': self.interval * 1000,
+            'stall_threshold_ms': self.threshold * 1000,
+            'lag_ms': {monitor.name: monitor.summary() for monitor in self.monitors},
+            'stalls': list(self.stalls),
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+class SamplingProfiler:
+    """Samples the stacks of the given threads from a background thread.
+
+    Cheap enough to leave running for minutes; the output is one collapsed
+    stack per line ("thread;outer;...;inner count").
+    """
+
+    suffix = '.folded'
+
+    def __init__(self, threads: Dict[str, int], interval: float = 0.005):
+        self.threads = threads
+        self.interval = interval
+        self.samples = Counter()
+        self.count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        names = {ident: name for name, ident in self.threads.items()}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident)
+                if name is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:"
+                                 f"{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                self.samples[';'.join(reversed(stack))] += 1
+            self.count += 1
+
+    def stop(self, path):
+        """Stop sampling and write the collapsed stacks to path"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class CProfileCapture:
+    """cProfile for several threads; cProfile only sees the thread that enabled it.
+
+    `threads` maps a name to a function that runs a callback on that thread
+    (e.g. the server's call_soon_threadsafe, or a plain call for the current one).
+    """
+
+    suffix = '.txt'
+    per_thread = sys.version_info < (3, 12)
+
+    def __init__(self, threads: Dict[str, Callable]):
+        self.threads = threads
+        self.profiles = {name: cProfile.Profile() for name in threads}
+        self.started = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        for name, run_on in self.threads.items():
+            run_on(self.profiles[name].enable)
+
+    def stop(self, path, timeout: float = 2.0):
+        """Disable every profile on its own thread and write the stats to path"""
+        duration = time.perf_counter() - self.started
+        done = {name: threading.Event() for name in self.threads}
+        for name, run_on in self.threads.items():
+            def disable(name=name):
+                self.profiles[name].disable()
+                done[name].set()
+            run_on(disable)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"cProfile capture, {duration:.1f} s\n")
+            for name, profile in self.profiles.items():
+                if not done[name].wait(timeout):
+                    f.write(f"\n=== {name} thread: did not respond\n")
+                    continue
+                out = io.StringIO()
+                try:
+                    stats = pstats.Stats(profile, stream=out)
+                except TypeError:  # nothing was recorded
+                    f.write(f"\n=== {name} thread: no samples\n")
+                    continue
+                stats.sort_stats('cumulative').print_stats(40)
+                f.write(f"\n=== {name} thread\n{out.getvalue()}")
+
+
+def create_profiler(kind: str, runners: Dict[str, Callable], idents: Dict[str, int],
+                    interval: float):
+    """Return a profiler of the configured kind for the given threads.
+
+    `runners` is what CProfileCapture takes, `idents` what SamplingProfiler takes.
+    """
+    if kind == 'cprofile':
+        if CProfileCapture.per_thread:
+            return CProfileCapture(runners)
+        print("cProfile cannot profile threads separately on this Python, sampling instead")
+    return SamplingProfiler(idents, interval)
@@ -0,0 +1,216 @@
+"""Glossary term matching with an Aho-Corasick automaton.
+
+A glossary is a UTF-8 text file with one term per line; anything after a
+tab (e.g. a translation) is ignored for matching. The automaton finds all
+terms in a subtitle in one pass over its characters, independent of the
+glossary size. Building it for tens of thousands of terms takes a moment,
+so the compiled tables are cached on disk, keyed by the glossary's path,
+size and modification time, and reloaded with marshal on the next start.
+"""
+import hashlib
+import marshal
+import os
+import tempfile
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+CACHE_FORMAT = 1
+CHAR_BITS = 21  # enough for any code point
+
+
+def fold(text: str) -> str:
+    """Lowercase text without changing its length, so offsets stay valid"""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def is_word_char(ch: str) -> bool:
+    # Scripts written without spaces (CJK and later blocks) have no word boundaries
+    return ch.isalnum() and ord(ch) < 0x2E80
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over case-folded glossary terms.
+
+    Transitions live in one dict keyed by (state << 21 | code point), which
+    is far smaller than a dict per trie node. `outputs[s]` is the term
+    ending at state s (or -1) and `links[s]` the next state on the failure
+    chain that has an output, so reporting matches never walks dead states.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self.terms: List[str] = []
+        self.lengths = array('l')
+        self.goto = {}
+        self.fail = array('l', [0])
+        self.outputs = array('l', [-1])
+        self.links = array('l', [-1])
+        seen = set()
+        for term in terms:
+            term = ' '.join(term.split())
+            key = fold(term)
+            if key and key not in seen:
+                seen.add(key)
+                self.add(key)
+                self.terms.append(term)
+        self.build()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def add(self, key: str):
+        goto = self.goto
+        state = 0
+        for ch in key:
+            edge = (state << CHAR_BITS) | ord(ch)
+            next_state = goto.get(edge)
+            if next_state is None:
+                next_state = len(self.fail)
+                goto[edge] = next_state
+                self.fail.append(0)
+                self.outputs.append(-1)
+                self.links.append(-1)
+            state = next_state
+        self.outputs[state] = len(self.lengths)
+        self.lengths.append(len(key))
+
+    def build(self):
+        """Compute failure and output links breadth-first"""
+        children = [[] for _ in range(len(self.fail))]
+        for edge, child in self.goto.items():
+            children[edge >> CHAR_BITS].append((edge & ((1 << CHAR_BITS) - 1), child))
+        goto, fail, outputs, links = self.goto, self.fail, self.outputs, self.links
+        queue = deque()
+        for _, child in children[0]:
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            for code, child in children[state]:
+                queue.append(child)
+                target = fail[state]
+                while target and ((target << CHAR_BITS) | code) not in goto:
+                    target = fail[target]
+                target = goto.get((target << CHAR_BITS) | code, 0)
+                fail[child] = target
+                links[child] = target if outputs[target] >= 0 else links[target]
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """Return non-overlapping (start, end) spans of terms, leftmost-longest"""
+        if not self.terms or not text:
+            return []
+        folded = fold(text)
+        goto, fail, outputs, links, lengths = (
+            self.goto, self.fail, self.outputs, self.links, self.lengths)
+        matches = []
+        state = 0
+        for i, ch in enumerate(folded):
+            code = ord(ch)
+            while state and ((state << CHAR_BITS) | code) not in goto:
+                state = fail[state]
+            state = goto.get((state << CHAR_BITS) | code, 0)
+            node = state if outputs[state] >= 0 else links[state]
+            while node >= 0:
+                end = i + 1
+                start = end - lengths[outputs[node]]
+                if self.at_boundary(folded, start, end):
+                    matches.append((start, end))
+                node = links[node]
+        if not matches:
+            return matches
+
+        matches.sort(key=lambda span: (span[0], span[0] - span[1]))
+        spans = []
+        last_end = 0
+        for start, end in matches:
+            if start >= last_end:
+                spans.append((start, end))
+                last_end = end
+        return spans
+
+    @staticmethod
+    def at_boundary(text: str, start: int, end: int) -> bool:
+        """Reject terms that are only part of a longer word"""
+        if start > 0 and is_word_char(text[start]) and is_word_char(text[start - 1]):
+            return False
+        if end < len(text) and is_word_char(text[end - 1]) and is_word_char(text[end]):
+            return False
+        return True
+
+    # Disk cache
+
+    def dumps(self) -> bytes:
+        return marshal.dumps((
+            CACHE_FORMAT, self.terms, self.lengths.tobytes(), self.goto,
+            self.fail.tobytes(), self.outputs.tobytes(), self.links.tobytes(),
+        ))
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'TermMatcher':
+        fmt, terms, lengths, goto, fail, outputs, links = marshal.loads(data)
+        if fmt != CACHE_FORMAT:
+            raise ValueError("Unsupported glossary cache format")
+        matcher = cls.__new__(cls)
+        matcher.terms = terms
+        matcher.goto = goto
+        for name, raw in (('lengths', lengths), ('fail', fail),
+                          ('outputs', outputs), ('links', links)):
+            values = array('l')
+            values.frombytes(raw)
+            setattr(matcher, name, values)
+        return matcher
+
+
+def read_terms(path: Path) -> Iterable[str]:
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        for line in f:
+            term = line.split('\t', 1)[0].strip()
+            if term and not term.startswith('#'):
+                yield term
+
+
+def cache_prefix(path: Path) -> str:
+    """Cache file names of one glossary start with this"""
+    return hashlib.sha1(str(path.resolve()).encode('utf-8')).hexdigest()[:16]
+
+
+def cache_path(path: Path, cache_dir: Path) -> Path:
+    stat = path.stat()
+    key = f"{CACHE_FORMAT}:{stat.st_size}:{stat.st_mtime_ns}"
+    version = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return cache_dir / f"{cache_prefix(path)}-{version}.bin"
+
+
+def load_matcher(path, cache_dir: Optional[Path] = None) -> TermMatcher:
+    """Load the compiled glossary from cache, building and caching it if needed"""
+    path = Path(path).expanduser()
+    cached = cache_path(path, cache_dir) if cache_dir else None
+    if cached and cached.exists():
+        try:
+            return TermMatcher.loads(cached.read_bytes())
+        except (OSError, ValueError, EOFError, TypeError) as e:
+            print(f"Ignoring glossary cache {cached}: {e}")
+
+    matcher = TermMatcher(read_terms(path))
+    if cached:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            # Older versions of this glossary are stale now; other
+            # glossaries keep their caches
+            for old in cache_dir.glob(cache_prefix(path) + '-*.bin'):
+                if old != cached:
+                    old.unlink()
+            fd, temp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(matcher.dumps())
+                os.replace(temp, cached)
+            except OSError:
+                os.unlink(temp)
+                raise
+        except OSError as e:
+            print(f"Error caching glossary: {e}")
+    return matcher
@@ -0,0 +1,71 @@
+import threading
+from typing import Any, Dict, Optional
+
+
+class SubtitleHandoff:
+    """Single-slot, latest-wins handoff between the server thread and the GUI thread.
+
+    The producer overwrites whatever is pending; the consumer only ever sees
+    the newest subtitle. ``put`` reports when the slot went from empty to full
+    so the producer emits at most one wakeup per drain.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item: Optional[Any] = None
+        self._has_item = False
+        self._burst = 0
+
+        self.submitted = 0   # items handed over by the producer
+        self.delivered = 0   # items taken by the consumer
+        self.dropped = 0     # items overwritten before the consumer saw them
+        self.coalesced = 0   # drains that absorbed more than one item or changed nothing
+
+    def put(self, item: Any) -> bool:
+        """Store item as the newest pending subtitle.
+
+        Returns True when the slot was empty, i.e. the consumer needs a wakeup.
+        """
+        with self._lock:
+            self.submitted += 1
+            wake = not self._has_item
+            if self._has_item:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self._burst += 1
+            return wake
+
+    def take(self) -> Optional[Any]:
+        """Remove and return the pending subtitle, or None if there is none"""
+        with self._lock:
+            if not self._has_item:
+                return None
+            item = self._item
+            if self._burst > 1:
+                self.coalesced += 1
+            self.delivered += 1
+            self._item = None
+            self._has_item = False
+            self._burst = 0
+            return item
+
+    def absorbed(self):
+        """Count a delivered item that left the display unchanged as coalesced"""
+        with self._lock:
+            self.coalesced += 1
+
+    def pending(self) -> int:
+        """Return number of items waiting (0 or 1)"""
+        return 1 if self._has_item else 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of the handoff counters"""
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'coalesced': self.coalesced,
+                'pending': 1 if self._has_item else 0,
+            }
@@ -0,0 +1,100 @@
+import time
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+
+class HistoryEntry(NamedTuple):
+    text: str
+    timestamp: float
+    source_id: int
+
+
+class SubtitleHistory:
+    """Fixed-capacity ring buffer of shown subtitles.
+
+    Records live in parallel slot arrays (text reference, timestamp, source
+    id) instead of one dict per entry, and appending overwrites the oldest
+    slot in O(1). Text is interned through a reference-counted pool so the
+    many repeats of rolling captions share a single string.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self.texts: List[Optional[str]] = [None] * capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.sources = array('L', [0]) * capacity
+        self.start = 0
+        self.size = 0
+        self.appended = 0
+        self._pool: Dict[str, list] = {}  # text -> [canonical text, refcount]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def intern(self, text: str) -> str:
+        entry = self._pool.get(text)
+        if entry is None:
+            self._pool[text] = [text, 1]
+            return text
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, text: str):
+        entry = self._pool.get(text)
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._pool[text]
+
+    def append(self, text: str, timestamp: Optional[float] = None, source_id: int = 0) -> int:
+        """Add an entry, evicting the oldest when full; return its sequence number"""
+        if timestamp is None:
+            timestamp = time.time()
+        if self.size < self.capacity:
+            slot = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            slot = self.start
+            self.release(self.texts[slot])
+            self.start = (self.start + 1) % self.capacity
+
+        self.texts[slot] = self.intern(text)
+        self.timestamps[slot] = timestamp
+        self.sources[slot] = source_id
+        self.appended += 1
+        return self.appended - 1
+
+    def __getitem__(self, index: int) -> HistoryEntry:
+        """Return the entry at index, oldest first; negative indexes count from newest"""
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("history index out of range")
+        slot = (self.start + index) % self.capacity
+        return HistoryEntry(self.texts[slot], self.timestamps[slot], self.sources[slot])
+
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        for index in range(self.size):
+            yield self[index]
+
+    def latest(self, count: int) -> List[HistoryEntry]:
+        """Return up to count most recent entries, newest first"""
+        return [self[-i] for i in range(1, min(count, self.size) + 1)]
+
+    def unique_texts(self) -> int:
+        """Return number of distinct strings held"""
+        return len(self._pool)
+
+    def resize(self, capacity: int):
+        """Change capacity, keeping the newest entries"""
+        entries = list(self)[-capacity:]
+        appended = self.appended
+        self.__init__(capacity)
+        for entry in entries:
+            self.append(*entry)
+        self.appended = appended
+
+    def clear(self):
+        self.__init__(self.capacity)
@@ -0,0 +1,267 @@
+"""Persistent append-only subtitle history.
+
+Entries are appended by a background writer thread in compressed blocks to
+`history.dat`; every block gets one fixed-size record in `history.idx`:
+
+    history.dat   repeated blocks of
+                      4s  magic b'SOHB'
+                      u32 compressed length
+                      u32 crc32 of the compressed payload
+                      ... zlib payload: records of
+                              f64 timestamp, u32 source id, u16 length, UTF-8 text
+
+    history.idx   repeated 36-byte records of
+                      u64 block offset, u32 compressed length, u32 entry count,
+                      u32 session id, f64 first timestamp, f64 last timestamp
+
+Readers memory-map the index and binary-search it by time, so a time range
+or a session is read back without touching unrelated blocks. The index is
+written after its block, so a crash can at worst leave a torn block at the
+end of the data file, which is truncated on the next open.
+"""
+import mmap
+import queue
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from history import HistoryEntry
+
+BLOCK_MAGIC = b'SOHB'
+BLOCK_HEADER = struct.Struct('<4sII')
+INDEX_RECORD = struct.Struct('<QIIIdd')
+ENTRY_HEADER = struct.Struct('<dIH')
+
+_STOP = object()
+
+
+class IndexView:
+    """Read-only, memory-mapped view of the block index"""
+
+    def __init__(self, path: Path):
+        self.file = None
+        self.map = None
+        self.count = 0
+        size = path.stat().st_size if path.exists() else 0
+        size -= size % INDEX_RECORD.size
+        if size:
+            self.file = open(path, 'rb')
+            self.map = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+            self.count = size // INDEX_RECORD.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> Tuple[int, int, int, int, float, float]:
+        if not 0 <= index < self.count:
+            raise IndexError("index record out of range")
+        return INDEX_RECORD.unpack_from(self.map, index * INDEX_RECORD.size)
+
+    def first_ending_after(self, timestamp: float) -> int:
+        """Binary-search the first block whose last timestamp is >= timestamp"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle][5] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HistoryStore:
+    """Append-only on-disk history with a background, batching writer"""
+
+    def __init__(self, directory: Path, block_entries: int = 256,
+                 flush_interval: float = 5.0, level: int = 6):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.directory / 'history.dat'
+        self.index_path = self.directory / 'history.idx'
+        self.block_entries = block_entries
+        self.flush_interval = flush_interval
+        self.level = level
+
+        self.recover()
+        self.session_id = self.last_session_id() + 1
+        self.queue = queue.SimpleQueue()
+        self.written_entries = 0
+        self.written_blocks = 0
+        self.thread = threading.Thread(target=self.run, name='HistoryStore', daemon=True)
+        self.thread.start()
+
+    # Writing
+
+    def append(self, text: str, timestamp: Optional[float] = None, source_id: int = 0):
+        """Queue an entry for writing; never blocks the caller"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.queue.put((timestamp, source_id, text))
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending entries and stop the writer thread"""
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join(timeout)
+
+    def run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self.write_block(pending)
+                return
+            if item is not None:
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.append(item)
+
+            if pending and (len(pending) >= self.block_entries
+                            or time.monotonic() >= deadline):
+                self.write_block(pending)
+                pending = []
+                deadline = None
+
+    def write_block(self, entries):
+        if not entries:
+            return
+        parts = []
+        for timestamp, source_id, text in entries:
+            data = text.encode('utf-8')[:0xFFFF]
+            parts.append(ENTRY_HEADER.pack(timestamp, source_id & 0xFFFFFFFF, len(data)))
+            parts.append(data)
+        payload = zlib.compress(b''.join(parts), self.level)
+        header = BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), zlib.crc32(payload))
+        try:
+            with open(self.data_path, 'ab') as f:
+                offset = f.tell()
+                f.write(header)
+                f.write(payload)
+            with open(self.index_path, 'ab') as f:
+                f.write(INDEX_RECORD.pack(
+                    offset, len(payload), len(entries), self.session_id,
+                    entries[0][0], entries[-1][0]
+                ))
+        except OSError as e:
+            print(f"Error writing history: {e}")
+            return
+        self.written_entries += len(entries)
+        self.written_blocks += 1
+
+    def recover(self):
+        """Drop a torn index record or data block left by a crash"""
+        if self.index_path.exists():
+            size = self.index_path.stat().st_size
+            if size % INDEX_RECORD.size:
+                with open(self.index_path, 'r+b') as f:
+                    f.truncate(size - size % INDEX_RECORD.size)
+        end = 0
+        with IndexView(self.index_path) as index:
+            if len(index):
+                offset, length = index[len(index) - 1][:2]
+                end = offset + BLOCK_HEADER.size + length
+        if self.data_path.exists() and self.data_path.stat().st_size > end:
+            with open(self.data_path, 'r+b') as f:
+                f.truncate(end)
+
+    def last_session_id(self) -> int:
+        # Sessions are numbered in append order, so the last block has the newest
+        with IndexView(self.index_path) as index:
+            return index[len(index) - 1][3] if len(index) else 0
+
+    # Reading
+
+    def read_block(self, data_file, offset: int, length: int) -> Iterator[HistoryEntry]:
+        data_file.seek(offset)
+        magic, stored_length, crc = BLOCK_HEADER.unpack(data_file.read(BLOCK_HEADER.size))
+        payload = data_file.read(stored_length)
+        if magic != BLOCK_MAGIC or stored_length != length or zlib.crc32(payload) != crc:
+            print(f"Skipping corrupt history block at offset {offset}")
+            return
+        raw = zlib.decompress(payload)
+        position = 0
+        while position < len(raw):
+            timestamp, source_id, size = ENTRY_HEADER.unpack_from(raw, position)
+            position += ENTRY_HEADER.size
+            text = raw[position:position + size].decode('utf-8', errors='replace')
+            position += size
+            yield HistoryEntry(text, timestamp, source_id)
+
+    def read_range(self, start: float, end: float) -> Iterator[HistoryEntry]:
+        """Yield entries with start <= timestamp <= end, oldest first"""
+        with IndexView(self.index_path) as index:
+            if not len(index):
+                return
+            # Blocks are appended in time order; skip those ending before start
+            first = index.first_ending_after(start)
+            with open(self.data_path, 'rb') as data_file:
+                for i in range(first, len(index)):
+                    offset, length, count, session, t_first, t_last = index[i]
+                    if t_first > end:
+                        break
+                    for entry in self.read_block(data_file, offset, length):
+                        if start <= entry.timestamp <= end:
+                            yield entry
+
+    def read_session(self, session_id: int) -> Iterator[HistoryEntry]:
+        """Yield all entries written by one app session"""
+        with IndexView(self.index_path) as index:
+            if not len(index):
+                return
+            with open(self.data_path, 'rb') as data_file:
+                for i in range(len(index)):
+                    offset, length, count, session, t_first, t_last = index[i]
+                    if session == session_id:
+                        yield from self.read_block(data_file, offset, length)
+
+    def read_latest(self, count: int) -> List[HistoryEntry]:
+        """Return up to count most recent stored entries, oldest first"""
+        blocks: List[List[HistoryEntry]] = []  # newest first
+        total = 0
+        with IndexView(self.index_path) as index:
+            if not len(index) or not count:
+                return []
+            with open(self.data_path, 'rb') as data_file:
+                for i in range(len(index) - 1, -1, -1):
+                    offset, length = index[i][:2]
+                    block = list(self.read_block(data_file, offset, length))
+                    blocks.append(block)
+                    total += len(block)
+                    if total >= count:
+                        break
+        entries = [entry for block in reversed(blocks) for entry in block]
+        return entries[-count:]
+
+    def sessions(self) -> List[Tuple[int, float, float, int]]:
+        """Return (session id, first timestamp, last timestamp, entries) per session"""
+        summary = {}
+        with IndexView(self.index_path) as index:
+            for i in range(len(index)):
+                offset, length, count, session, t_first, t_last = index[i]
+                if session in summary:
+                    _, first, _, total = summary[session]
+                    summary[session] = (session, first, t_last, total + count)
+                else:
+                    summary[session] = (session, t_first, t_last, count)
+        return list(summary.values())
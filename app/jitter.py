@@ -0,0 +1,126 @@
+"""Time-ordered jitter buffer for subtitles, keyed on the client timestamp.
+
+Every client stamps its subtitles with its own Date.now(). ClockOffset
+estimates `local - client` for one client as the smallest difference seen
+recently, i.e. clock skew plus the fastest observed transit, so mapping a
+timestamp through it gives the local time the cue would have arrived
+without queueing anywhere.
+
+A new session has no transit history, so its first cue would always look
+fresh. The server seeds its ClockOffset with the estimate last seen for
+the same page (or any client, as they share this machine's clock), which
+lets the backlog of a reconnecting tab be recognised as stale.
+
+JitterBuffer holds each cue until `window` ms after that mapped time and
+releases cues in timestamp order, so a cue overtaken by a later one (e.g.
+from a tab that reconnected) is put back in order. A cue older than one
+already released from the same source is late and dropped, since a newer
+line from it is on screen; one mapped more than `max_age` ms in the past
+is expired. With a single sending client there is nothing to reorder, and
+the server releases its cues without the hold.
+"""
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ClockOffset:
+    """Windowed minimum of local_ms - client_ms for one client.
+
+    Two windows are kept so the estimate follows the end of a congested
+    period within `window_ms` to 2 * `window_ms`. A sample more than
+    `step_ms` above the estimate is taken as the client's clock being set
+    back rather than as queueing, and restarts the estimate.
+    """
+
+    def __init__(self, window_ms: float = 10000.0, step_ms: float = 30000.0):
+        self.window_ms = window_ms
+        self.step_ms = step_ms
+        self.current: Optional[float] = None
+        self.previous: Optional[float] = None
+        self.window_start = 0.0
+
+    def seed(self, offset: float, local_ms: float):
+        """Start from an estimate made elsewhere; it ages out like an old window"""
+        self.current = None
+        self.previous = offset
+        self.window_start = local_ms
+
+    def update(self, client_ms: float, local_ms: float) -> float:
+        """Add a sample and return the offset estimate"""
+        sample = local_ms - client_ms
+        known = self.current is not None or self.previous is not None
+        if known and sample - self.estimate() > self.step_ms:
+            self.current = self.previous = None
+            self.window_start = local_ms
+        elif local_ms - self.window_start >= self.window_ms:
+            self.previous, self.current = self.current, None
+            self.window_start = local_ms
+        if self.current is None or sample < self.current:
+            self.current = sample
+        return self.estimate()
+
+    def estimate(self) -> float:
+        values = [value for value in (self.current, self.previous) if value is not None]
+        return min(values) if values else 0.0
+
+
+class JitterBuffer:
+    """Reorders cues by mapped client time; all times are wall-clock ms"""
+
+    def __init__(self, window_ms: float = 25.0, max_age_ms: float = 3000.0):
+        self.window_ms = window_ms
+        self.max_age_ms = max_age_ms
+        self.heap: List[Tuple[float, int, Any, Any]] = []
+        self.order = itertools.count()
+        self.newest_pending = float('-inf')
+        self.last_released: Dict[Any, float] = {}  # source -> newest released local time
+        self.stats = {'buffered': 0, 'reordered': 0, 'late': 0, 'expired': 0}
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, local_ms: float, now_ms: float, item: Any, source: Any = None) -> bool:
+        """Queue a cue stamped with the mapped local time; False when it was dropped"""
+        if now_ms - local_ms > self.max_age_ms:
+            self.stats['expired'] += 1
+            return False
+        # Offsets are estimated per client, so only compare within one
+        if local_ms < self.last_released.get(source, float('-inf')):
+            self.stats['late'] += 1
+            return False
+        if local_ms < self.newest_pending:
+            self.stats['reordered'] += 1
+        self.newest_pending = max(self.newest_pending, local_ms)
+        heapq.heappush(self.heap, (local_ms, next(self.order), source, item))
+        self.stats['buffered'] += 1
+        return True
+
+    def pop_ready(self, now_ms: float) -> List[Any]:
+        """Remove and return the cues whose hold time is over, oldest first"""
+        return self.pop_until(now_ms - self.window_ms)
+
+    def flush(self) -> List[Any]:
+        """Remove and return every held cue without waiting, oldest first"""
+        return self.pop_until(float('inf'))
+
+    def pop_until(self, local_ms: float) -> List[Any]:
+        ready = []
+        while self.heap and self.heap[0][0] <= local_ms:
+            released, _, source, item = heapq.heappop(self.heap)
+            self.last_released[source] = released
+            ready.append(item)
+        if not self.heap:
+            self.newest_pending = float('-inf')
+        return ready
+
+    def forget(self, source: Any):
+        """Drop the state kept for a source that went away"""
+        self.last_released.pop(source, None)
+
+    def next_release(self) -> Optional[float]:
+        """Return when the oldest held cue is due, or None"""
+        return self.heap[0][0] + self.window_ms if self.heap else None
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, 'pending': len(self.heap)}
@@ -0,0 +1,206 @@
+"""Local ingest without WebSockets: a Unix domain socket and a line reader.
+
+Both feed the same message path as the WebSocket handler, one ClientSession
+per connection, so source arbitration, dedup, the jitter buffer and
+subscriptions work unchanged.
+
+Unix socket: every message is a little-endian u32 length followed by what
+a WebSocket frame would carry, i.e. protocol 1 JSON text or a protocol 2
+binary frame (told apart by the version byte). Replies such as the hello
+answer or a subscribed stream come back framed the same way.
+
+Line input (stdin or a FIFO): one message per line, either a protocol 1
+JSON object, an mpv JSON IPC `property-change` event for `sub-text`, or
+plain text shown as a subtitle ("\\n" is a line break). A FIFO is reopened
+when its writer goes away, so player scripts can come and go.
+"""
+import asyncio
+import errno
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+import websockets.exceptions
+
+from protocol import PROTOCOL_BINARY
+
+LENGTH = struct.Struct('<I')
+MAX_MESSAGE = 1 << 20
+
+
+def decode_payload(payload: bytes) -> Union[str, bytes]:
+    """Return a framed payload as a WebSocket handler would receive it"""
+    if payload[:1] == bytes([PROTOCOL_BINARY]):
+        return payload
+    return payload.decode('utf-8', errors='replace')
+
+
+def line_message(line: str) -> Optional[str]:
+    """Turn one input line into a protocol 1 JSON message, or None to skip it"""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            if 'event' not in data:
+                return line
+            # mpv sends these after {"command": ["observe_property", 1, "sub-text"]}
+            if data.get('event') == 'property-change' and data.get('name') == 'sub-text':
+                return json.dumps({'type': 'subtitle', 'text': data.get('data') or ''})
+            return None
+    return json.dumps({'type': 'subtitle', 'text': line.replace('\\n', '\n')})
+
+
+class LocalConnection:
+    """Stands in for the websocket of a session on a local transport"""
+
+    def __init__(self, writer: Optional[asyncio.StreamWriter] = None):
+        self.writer = writer  # None for line input, which is one-way
+
+    async def send(self, message: Union[str, bytes]):
+        if self.writer is None:
+            return
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        if self.writer.is_closing():
+            raise websockets.exceptions.ConnectionClosed(None, None)
+        self.writer.write(LENGTH.pack(len(message)) + message)
+        try:
+            await self.writer.drain()
+        except OSError as e:
+            raise websockets.exceptions.ConnectionClosed(None, None) from e
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class UnixSocketListener:
+    """Accepts length-prefixed messages on a Unix domain socket"""
+
+    def __init__(self, server, path: str):
+        self.server = server
+        self.path = Path(path).expanduser()
+        self.listener = None
+
+    async def start(self):
+        if not hasattr(asyncio, 'start_unix_server'):
+            raise OSError("Unix domain sockets are not supported on this platform")
+        self.remove_stale()
+        self.listener = await asyncio.start_unix_server(self.handle, str(self.path))
+        os.chmod(self.path, 0o600)
+        print(f"Local socket listening on {self.path}")
+
+    def remove_stale(self):
+        """Delete a socket file left behind by a crash; refuse a live one"""
+        try:
+            mode = self.path.stat().st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(f"{self.path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.path))
+        except OSError:
+            self.path.unlink()
+        else:
+            raise OSError(errno.EADDRINUSE, f"{self.path} is in use by another instance")
+        finally:
+            probe.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = self.server.open_session(LocalConnection(writer))
+        try:
+            while True:
+                (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                if length > MAX_MESSAGE:
+                    print(f"Local message of {length} bytes is too large, disconnecting")
+                    break
+                payload = await reader.readexactly(length)
+                self.server.stats['local_messages'] += 1
+                await self.server.handle_message(session, decode_payload(payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.server.close_session(session)
+            writer.close()
+
+    async def stop(self):
+        if self.listener:
+            self.listener.close()
+            await self.listener.wait_closed()
+            self.listener = None
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+
+class LineReader:
+    """Reads messages line by line from stdin ('-') or a FIFO on a thread"""
+
+    def __init__(self, server, path: str):
+        self.server = server
+        self.path = path
+        self.loop = None
+        self.session = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.session = self.server.open_session(LocalConnection())
+        self._thread = threading.Thread(target=self.run, name='line-input', daemon=True)
+        self._thread.start()
+        print(f"Reading subtitles from {'stdin' if self.path == '-' else self.path}")
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                stream = sys.stdin if self.path == '-' else open(
+                    Path(self.path).expanduser(), encoding='utf-8', errors='replace')
+            except OSError as e:
+                print(f"Error opening line input {self.path}: {e}")
+                return
+            try:
+                for line in stream:
+                    if self._stop.is_set():
+                        return
+                    message = line_message(line)
+                    if message is not None:
+                        self.feed(message)
+            except (OSError, RuntimeError):
+                return  # the loop is gone
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+            if self.path == '-':
+                return
+
+    def feed(self, message: str):
+        # Wait for each line so a fast writer is throttled by the loop
+        future = asyncio.run_coroutine_threadsafe(self.receive(message), self.loop)
+        future.result()
+
+    async def receive(self, message: str):
+        if self.session is None:
+            return
+        self.server.stats['local_messages'] += 1
+        await self.server.handle_message(self.session, message)
+
+    async def stop(self):
+        self._stop.set()
+        if self.session is not None:
+            self.server.close_session(self.session)
+            self.session = None
@@ -1,13 +1,16 @@
+from startup import PROFILER, StartupProfiler  # first, so import time is measured
+
 import sys
+import argparse
 import asyncio
+import multiprocessing
 import threading
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QObject, pyqtSignal, QThread
+import time
 
-from config import ConfigManager
-from gui import SubtitleWindow
-from server import SubtitleServer
-from tray import TrayIcon
+# Everything else is imported by the phase that first needs it
+with PROFILER.phase('import Qt'):
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer, Qt
 
 
 class ServerThread(QThread):
@@ -20,58 +23,395 @@ class ServerThread(QThread):
         self.loop = None
     
     def run(self):
-        self.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.loop)
         try:
-            self.loop.run_until_complete(self.server.start())
+            self.serve()
         except OSError as e:
-            if e.errno == 10048:
+            from server import is_address_in_use
+            if is_address_in_use(e):
                 self.error_occurred.emit("Port already in use")
             else:
                 self.error_occurred.emit(str(e))
         except Exception as e:
             self.error_occurred.emit(str(e))
+    
+    def serve(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.start())
+    
+    def stop(self, timeout_ms: int = 2000):
+        """Ask the server to shut down and wait for the thread to finish"""
+        self.server.request_stop()
+        self.wait(timeout_ms)
+
+
+class ServerProcessThread(ServerThread):
+    """Relays events from a server running in a child process (see server_process.py)"""
+    
+    def serve(self):
+        self.server.run()
 
 
 class SubtitleApp(QObject):
-    subtitle_received = pyqtSignal(str)
+    subtitle_ready = pyqtSignal()
+    track_received = pyqtSignal(int, object)            # client id, CueIndex or None
+    clock_received = pyqtSignal(int, float, float, bool)  # client id, position, rate, playing
     
-    def __init__(self):
+    def __init__(self, config=None, profiler=None, capture=None, server_process=None):
         super().__init__()
-        self.config = ConfigManager()
+        self.profiler = profiler or StartupProfiler()
+        with self.profiler.phase('config'):
+            from config import ConfigManager
+            self.config = config or ConfigManager()
+        
+        # Latest-wins slot between the server thread and the GUI thread
+        from handoff import SubtitleHandoff
+        self.handoff = SubtitleHandoff()
+        self.last_drain = 0.0
+        self.drain_timer = QTimer(self)
+        self.drain_timer.setSingleShot(True)
+        self.drain_timer.timeout.connect(self.drain_subtitle)
         
         # Initialize server
         host = self.config.get('server', 'host')
         port = self.config.get('server', 'port')
-        self.server = SubtitleServer(host, port)
+        if server_process is None:
+            server_process = self.config.get('server', 'separate_process')
+        self.server_process = bool(server_process)
+        if self.server_process:
+            # Ingest and processing run in a child and can't stall painting
+            with self.profiler.phase('import server process'):
+                from server_process import ServerProcess
+            self.server = ServerProcess(self.config, capture)
+        else:
+            with self.profiler.phase('import server'):
+                from server import SubtitleServer
+            self.server = SubtitleServer.from_config(self.config)
+            if capture:
+                self.server.start_capture(capture)
         self.server.set_subtitle_callback(self.on_subtitle_received)
+        self.server.set_track_callback(self.track_received.emit)
+        self.server.set_clock_callback(self.clock_received.emit)
+        self.server.set_listening_callback(self.on_server_listening)
+        self.server.set_metrics_callback(self.handoff.stats)
+        
+        # Cross-thread signals are queued, so slots only run once the event
+        # loop starts and everything below exists
+        self.subtitle_ready.connect(self.drain_subtitle)
+        self.track_received.connect(self.on_track_received)
+        self.clock_received.connect(self.on_clock_received)
+        
+        # Event-loop lag watchdog, off unless ticked in the Diagnostics menu;
+        # the server loop joins once it is running
+        self.watchdog = None
+        self.heartbeat = None
+        self.server_thread_id = None
+        self.profiling = None
+        if self.config.get('diagnostics', 'loop_watchdog'):
+            self.start_watchdog()
+        
+        # Bind the server before building the GUI so the extension can
+        # connect while the window is still being created
+        with self.profiler.phase('server start'):
+            thread_class = ServerProcessThread if self.server_process else ServerThread
+            self.server_thread = thread_class(self.server)
+            self.server_thread.error_occurred.connect(self.on_server_error)
+            self.server_thread.start()
+        
+        with self.profiler.phase('import gui'):
+            from gui import SubtitleWindow
+            from history_store import HistoryStore
+            from playback import SubtitlePlayer
+            from search import SearchIndex
         
-        # Start server in separate thread
-        self.server_thread = ServerThread(self.server)
-        self.server_thread.error_occurred.connect(self.on_server_error)
-        self.server_thread.start()
+        # Persistent history is written by a background thread
+        self.history_store = None
+        if self.config.get('behavior', 'persist_history'):
+            with self.profiler.phase('history store'):
+                self.history_store = HistoryStore(self.config.config_dir / 'history')
+        
+        # Search index over history; older stored lines are indexed in the background
+        search_size = self.config.get('behavior', 'search_index_size')
+        self.search_index = SearchIndex(search_size)
+        if self.history_store:
+            self.search_index.load_async(self.history_store, search_size)
         
         # Initialize GUI
-        self.window = SubtitleWindow(self.config)
-        self.subtitle_received.connect(self.window.show_subtitle)
+        with self.profiler.phase('window'):
+            self.window = SubtitleWindow(self.config, self.history_store, self.search_index)
+        self.window.subtitle_painted.connect(self.server.latency.record_painted)
+        self.window.quit_requested.connect(self.quit_app)
+        self.frame_interval = self.get_frame_interval()
+        
+        # Local subtitle file playback
+        self.player = SubtitlePlayer(self)
+        self.player.cue_changed.connect(self.on_player_cue)
+        self.player.loaded.connect(self.on_subtitle_file_loaded)
+        self.player.load_failed.connect(self.on_subtitle_file_failed)
+        
+        # Cue tracks prefetched from the page, driven by its media clock
+        self.track_player = SubtitlePlayer(self)
+        self.track_player.cue_changed.connect(self.on_player_cue)
+        
+        # The tray icon is not needed for the first frame
+        self.tray = None
+        self.window.first_painted.connect(self.on_first_paint)
         
-        # Initialize tray icon
-        self.tray = TrayIcon()
+        # Show window initially
+        with self.profiler.phase('show window'):
+            self.window.show()
+        
+        print(f"Application started. WebSocket server on ws://{host}:{port}")
+    
+    def on_server_listening(self):
+        """Runs on the server thread once connections are accepted"""
+        self.profiler.mark('accepting')
+        if self.server_process:
+            return  # the child watches its own loop
+        self.server_thread_id = threading.get_ident()
+        watchdog = self.watchdog  # the GUI thread may swap it
+        if watchdog:
+            watchdog.watch_asyncio('server', self.server.loop)
+    
+    def on_first_paint(self):
+        self.profiler.mark('first_paint')
+        QTimer.singleShot(0, self.init_tray)
+    
+    def init_tray(self):
+        """Create the tray icon once the window is up"""
+        with self.profiler.phase('tray'):
+            from tray import TrayIcon
+            self.tray = TrayIcon()
         self.tray.show_window_signal.connect(self.window.show)
         self.tray.hide_window_signal.connect(self.window.hide)
         self.tray.settings_signal.connect(self.window.open_settings)
+        self.tray.search_signal.connect(self.window.open_search)
+        self.tray.open_subtitle_signal.connect(self.open_subtitle_file)
+        self.tray.playback_signal.connect(self.on_playback_command)
+        self.tray.stats_signal.connect(self.show_stats)
+        self.tray.pin_source_signal.connect(self.on_pin_source)
+        self.tray.latency_signal.connect(self.show_latency)
+        self.tray.save_latency_signal.connect(self.save_latency)
+        self.tray.save_loop_report_signal.connect(self.save_loop_report)
+        self.tray.profiling_signal.connect(self.toggle_profiling)
+        self.tray.watchdog_action.setChecked(self.watchdog is not None)
+        self.tray.watchdog_signal.connect(self.toggle_watchdog)
         self.tray.quit_signal.connect(self.quit_app)
         self.tray.show()
-        
-        # Show window initially
-        self.window.show()
-        
-        print(f"Application started. WebSocket server on ws://{host}:{port}")
     
-    def on_subtitle_received(self, text: str):
+    def on_subtitle_received(self, text: str, timing=None, source_id: int = 0):
         """Called when subtitle is received from browser"""
-        # Emit signal to update GUI (thread-safe)
-        self.subtitle_received.emit(text)
+        # Only the newest subtitle is kept; wake the GUI once per pending slot
+        if self.handoff.put((text, timing, source_id)):
+            self.subtitle_ready.emit()
+    
+    def get_frame_interval(self) -> float:
+        """Return the display frame interval in seconds"""
+        screen = QApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen else 0
+        if refresh_rate <= 0:
+            refresh_rate = 60.0
+        return 1.0 / refresh_rate
+    
+    def drain_subtitle(self):
+        """Show the pending subtitle, at most once per display frame"""
+        elapsed = time.monotonic() - self.last_drain
+        if elapsed < self.frame_interval:
+            if not self.drain_timer.isActive():
+                remaining = self.frame_interval - elapsed
+                self.drain_timer.start(max(1, int(remaining * 1000)))
+            return
+        
+        item = self.handoff.take()
+        if item is None:
+            return
+        self.last_drain = time.monotonic()
+        text, timing, source_id = item
+        if timing is not None:
+            timing.drained = time.perf_counter()
+        if not self.window.show_subtitle(text, timing, source_id):
+            self.handoff.absorbed()
+    
+    def show_stats(self):
+        """Show subtitle delivery counters in a tray notification"""
+        stats = self.handoff.stats()
+        server_stats = self.server.get_stats()
+        if not server_stats:
+            self.tray.show_message("Subtitle Overlay", "The server process has not started yet")
+            return
+        self.tray.show_message(
+            "Subtitle Overlay - Statistics",
+            f"Clients: {self.server.get_client_count()}\n"
+            f"Received: {stats['submitted']}\n"
+            f"Shown: {stats['delivered']}\n"
+            f"Dropped (superseded): {stats['dropped']}\n"
+            f"Coalesced frames: {stats['coalesced']}\n"
+            f"Filtered: {server_stats['duplicates']} duplicate, "
+            f"{server_stats['inactive_source']} other tab, "
+            f"{server_stats['rate_limited']} rate limited\n"
+            f"Out of order: {server_stats['jitter']['reordered']} reordered, "
+            f"{server_stats['jitter']['late']} late, "
+            f"{server_stats['jitter']['expired']} expired\n"
+            f"Subscribers: {server_stats['broadcast']['subscribers']} "
+            f"({server_stats['broadcast']['dropped']} dropped)"
+        )
+    
+    def show_latency(self):
+        """Show per-stage latency percentiles in a tray notification"""
+        self.tray.show_message(
+            "Subtitle Overlay - Latency",
+            self.server.latency.format_summary()
+        )
+    
+    def save_latency(self):
+        """Write the latency report next to the config file"""
+        path = self.config.config_dir / time.strftime('latency-%Y%m%d-%H%M%S.json')
+        try:
+            self.server.latency.dump(path)
+        except OSError as e:
+            self.tray.show_message("Subtitle Overlay", f"Failed to save latency report: {e}")
+            return
+        self.tray.show_message("Subtitle Overlay", f"Latency report saved to {path}")
+    
+    def save_loop_report(self):
+        """Write event-loop lag percentiles and recent stalls next to the config file"""
+        if not self.watchdog:
+            self.tray.show_message("Subtitle Overlay",
+                                   "Tick Diagnostics → Watch Event Loops first")
+            return
+        path = self.config.config_dir / time.strftime('loops-%Y%m%d-%H%M%S.json')
+        try:
+            self.watchdog.dump(path)
+        except OSError as e:
+            self.tray.show_message("Subtitle Overlay", f"Failed to save loop report: {e}")
+            return
+        self.tray.show_message("Subtitle Overlay",
+                               f"{self.watchdog.format_summary()}\nSaved to {path}")
+    
+    def toggle_watchdog(self, enabled: bool):
+        """Start or stop watching the event loops; the choice is saved"""
+        self.config.set('diagnostics', 'loop_watchdog', value=enabled)
+        if enabled and self.watchdog is None:
+            self.start_watchdog()
+        elif not enabled and self.watchdog is not None:
+            self.stop_watchdog()
+    
+    def start_watchdog(self):
+        from diagnostics import Watchdog
+        self.watchdog = Watchdog(
+            threshold=self.config.get('diagnostics', 'stall_threshold') / 1000,
+            log_dir=self.config.config_dir / 'diagnostics')
+        # GUI heartbeat; beats only start once the Qt event loop runs
+        gui_loop = self.watchdog.add_loop('gui')
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setTimerType(Qt.TimerType.PreciseTimer)
+        self.heartbeat.timeout.connect(gui_loop.beat)
+        self.heartbeat.start(int(self.watchdog.interval * 1000))
+        if self.server_process:
+            self.server.set_watchdog(True)
+        elif self.server_thread_id:
+            self.watchdog.watch_asyncio('server', self.server.loop)
+        self.watchdog.start()
+    
+    def stop_watchdog(self):
+        self.heartbeat.stop()
+        self.heartbeat = None
+        self.watchdog.stop()
+        self.watchdog = None
+        if self.server_process:
+            self.server.set_watchdog(False)
+    
+    def toggle_profiling(self, enabled: bool):
+        """Start or stop profiling the GUI and server threads"""
+        from diagnostics import create_profiler
+        if enabled and self.profiling is None:
+            runners = {'gui': lambda callback: callback()}
+            idents = {'gui': threading.get_ident()}
+            if not self.server_process:
+                runners['server'] = self.server.call_soon_threadsafe
+            if self.server_thread_id:
+                idents['server'] = self.server_thread_id
+            self.profiling = create_profiler(
+                self.config.get('diagnostics', 'profiler'), runners, idents,
+                self.config.get('diagnostics', 'sample_interval') / 1000)
+            self.profiling.start()
+        elif not enabled and self.profiling is not None:
+            self.stop_profiling()
+    
+    def stop_profiling(self):
+        profiling, self.profiling = self.profiling, None
+        directory = self.config.config_dir / 'diagnostics'
+        path = directory / (time.strftime('profile-%Y%m%d-%H%M%S') + profiling.suffix)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            profiling.stop(path)
+        except OSError as e:
+            print(f"Error saving profile: {e}")
+            return
+        if self.tray:
+            self.tray.show_message("Subtitle Overlay", f"Profile saved to {path}")
+    
+    def open_subtitle_file(self):
+        """Pick an SRT/VTT/ASS file and play it on the local clock"""
+        from PyQt6.QtWidgets import QFileDialog
+        path, _ = QFileDialog.getOpenFileName(
+            None,
+            "Open Subtitle File",
+            "",
+            "Subtitle files (*.srt *.vtt *.ass *.ssa);;All files (*)"
+        )
+        if path:
+            self.player.load_file(path)
+    
+    def on_subtitle_file_loaded(self, path: str, count: int):
+        self.player.play()
+        self.tray.show_message("Subtitle Overlay", f"Playing {count} subtitles from {path}")
+    
+    def on_subtitle_file_failed(self, error_msg: str):
+        self.tray.show_message("Subtitle Overlay", f"Could not load subtitle file: {error_msg}")
+    
+    def on_playback_command(self, command: str):
+        """Handle Play/Pause, seek and offset actions for local playback"""
+        if command == 'toggle':
+            self.player.toggle()
+        elif command == 'back':
+            self.player.seek_relative(-5.0)
+        elif command == 'forward':
+            self.player.seek_relative(5.0)
+        elif command == 'earlier':
+            self.player.adjust_offset(-0.5)
+        elif command == 'later':
+            self.player.adjust_offset(0.5)
+        elif command == 'stop':
+            self.player.stop()
+    
+    def on_player_cue(self, text: str):
+        """Show the active cue from local playback; the cue end hides it"""
+        self.server.call_soon_threadsafe(self.server.publish, text)
+        if text:
+            self.window.show_subtitle(text, auto_hide=False)
+        else:
+            self.window.hide_subtitle()
+    
+    def on_track_received(self, client_id: int, track):
+        """Switch to (or leave) the cue track uploaded by a page"""
+        if track is None:
+            from subtitle_file import CueIndex
+            self.track_player.set_index(CueIndex())
+            self.track_player.stop()
+        else:
+            self.track_player.set_index(track)
+    
+    def on_clock_received(self, client_id: int, position: float, rate: float, playing: bool):
+        """Follow the page's media clock; small jitter does not re-anchor"""
+        self.track_player.sync_clock(position, rate, playing)
+    
+    def on_pin_source(self, pinned: bool):
+        """Pin or unpin the currently playing tab as the only subtitle source"""
+        if pinned:
+            self.server.call_soon_threadsafe(self.server.pin_source)
+        else:
+            self.server.call_soon_threadsafe(self.server.unpin_source)
     
     def on_server_error(self, error_msg: str):
         """Handle server errors"""
@@ -97,17 +437,51 @@ class SubtitleApp(QObject):
     def quit_app(self):
         """Clean shutdown"""
         self.window.save_window_settings()
+        self.window.finish_caption()
+        if self.profiling:
+            self.stop_profiling()
+        if self.watchdog:
+            self.watchdog.stop()
+        self.server_thread.stop()
+        if self.history_store:
+            self.history_store.close()
+        self.config.flush()
         QApplication.quit()
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Subtitle overlay desktop app")
+    parser.add_argument('--profile-startup', nargs='?', const='', default=None,
+                        metavar='JSON',
+                        help="print import/init timings, time to accepting connections "
+                             "and time to first paint (optionally also write them as JSON)")
+    parser.add_argument('--capture', metavar='PATH',
+                        help="record every inbound WebSocket frame to PATH for app/replay.py")
+    parser.add_argument('--server-process', action='store_true', default=None,
+                        help="run the server in a child process (server.separate_process)")
+    # Leave Qt's own options (-platform, -style, ...) to QApplication
+    return parser.parse_known_args()
+
+
 def main():
-    app = QApplication(sys.argv)
-    app.setQuitOnLastWindowClosed(False)  # Keep running when window is closed
+    args, qt_args = parse_args()
+    profiler = PROFILER
+    if args.profile_startup is not None:
+        profiler.enable(args.profile_startup or None)
+    profiler.mark('imports')
+    
+    with profiler.phase('QApplication'):
+        app = QApplication(sys.argv[:1] + qt_args)
+        app.setQuitOnLastWindowClosed(False)  # Keep running when window is closed
     
-    subtitle_app = SubtitleApp()
+    subtitle_app = SubtitleApp(profiler=profiler, capture=args.capture,
+                               server_process=args.server_process)
     
     sys.exit(app.exec())
 
 
 if __name__ == '__main__':
+    # In a frozen build the server child re-runs this executable; let it
+    # take over before argparse sees --multiprocessing-fork
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
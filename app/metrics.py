@@ -0,0 +1,260 @@
+import bisect
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def _bucket_bounds(low: float = 0.01, high: float = 60000.0, factor: float = 1.2) -> List[float]:
+    bounds = []
+    value = low
+    while value < high:
+        bounds.append(value)
+        value *= factor
+    bounds.append(high)
+    return bounds
+
+
+BUCKET_BOUNDS_MS = _bucket_bounds()
+# Every fourth bound (about x2 apart) keeps /metrics small while staying exact
+EXPORT_BOUNDS = list(range(3, len(BUCKET_BOUNDS_MS), 4))
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram in milliseconds.
+
+    Buckets grow by 20%, so percentiles are accurate to within one bucket
+    while recording stays O(log buckets) with constant memory.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def record(self, value_ms: float):
+        if value_ms < 0:
+            value_ms = 0.0
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms < self.min:
+            self.min = value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, percent: float) -> float:
+        """Return the upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        rank = percent / 100.0 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index >= len(BUCKET_BOUNDS_MS):
+                    return self.max
+                return min(BUCKET_BOUNDS_MS[index], self.max)
+        return self.max
+
+    def copy(self) -> 'LatencyHistogram':
+        histogram = LatencyHistogram()
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.min = self.min
+        histogram.max = self.max
+        return histogram
+
+    def cumulative(self) -> List[tuple]:
+        """Return (upper bound ms, values <= bound) for the exported buckets"""
+        buckets = []
+        seen = 0
+        index = 0
+        for export in EXPORT_BOUNDS:
+            while index <= export:
+                seen += self.counts[index]
+                index += 1
+            buckets.append((BUCKET_BOUNDS_MS[export], seen))
+        return buckets
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class CueTiming:
+    """Timestamps collected for one subtitle on its way to the screen.
+
+    `client_time` is the extension's Date.now() in ms; everything else is
+    time.perf_counter() so stages inside the app don't suffer clock steps.
+    """
+
+    __slots__ = ('client_time', 'received_wall', 'received', 'decoded',
+                 'dispatched', 'drained', 'painted')
+
+    def __init__(self, client_time: Optional[float] = None):
+        self.client_time = client_time
+        self.received_wall = time.time()
+        self.received = time.perf_counter()
+        self.decoded = self.received
+        self.dispatched = self.received
+        self.drained = 0.0
+        self.painted = 0.0
+
+    def copy(self, client_time: Optional[float]) -> 'CueTiming':
+        """Return a timing for another cue from the same frame"""
+        timing = CueTiming(client_time)
+        timing.received_wall = self.received_wall
+        timing.received = self.received
+        timing.decoded = self.decoded
+        return timing
+
+
+class LatencyTracker:
+    """Per-stage latency histograms for the browser-to-screen path"""
+
+    STAGES = (
+        ('network', 'Client timestamp to server receive'),
+        ('decode', 'Frame decode'),
+        ('server', 'Server receive to GUI handoff'),
+        ('signal', 'Cross-thread handoff to GUI drain'),
+        ('paint', 'GUI drain to subtitle painted'),
+        ('end_to_end', 'Client timestamp to subtitle painted'),
+    )
+    GUI_STAGES = ('signal', 'paint', 'end_to_end')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {name: LatencyHistogram() for name, _ in self.STAGES}
+        self.started = time.time()
+
+    def record(self, stage: str, value_ms: float):
+        """Record a value; stages outside STAGES (e.g. 'transform.gloss') are added on first use"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.record(value_ms)
+
+    def record_received(self, timing: CueTiming):
+        """Record the server-side stages of a cue"""
+        with self._lock:
+            if timing.client_time:
+                self.histograms['network'].record(
+                    timing.received_wall * 1000 - timing.client_time)
+            self.histograms['decode'].record((timing.decoded - timing.received) * 1000)
+            self.histograms['server'].record((timing.dispatched - timing.received) * 1000)
+
+    def record_painted(self, timing: CueTiming):
+        """Record the GUI-side stages of a cue once it is on screen"""
+        with self._lock:
+            self.histograms['signal'].record((timing.drained - timing.dispatched) * 1000)
+            self.histograms['paint'].record((timing.painted - timing.drained) * 1000)
+            if timing.client_time:
+                painted_wall = timing.received_wall + (timing.painted - timing.received)
+                self.histograms['end_to_end'].record(
+                    painted_wall * 1000 - timing.client_time)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def snapshot(self) -> Dict[str, LatencyHistogram]:
+        """Return copies of the histograms, safe to read without the lock"""
+        with self._lock:
+            return {name: histogram.copy() for name, histogram in self.histograms.items()}
+
+    def replace(self, histograms: Dict[str, LatencyHistogram]):
+        """Adopt stages measured in another process"""
+        with self._lock:
+            self.histograms.update(histograms)
+
+    def format_summary(self) -> str:
+        """Return a short human-readable report"""
+        lines = []
+        for name, stats in self.summary().items():
+            if not stats['count']:
+                continue
+            lines.append(
+                f"{name}: p50 {stats['p50']:.1f} / p95 {stats['p95']:.1f} / "
+                f"p99 {stats['p99']:.1f} ms (n={stats['count']})"
+            )
+        return "\n".join(lines) or "No subtitles measured yet"
+
+    def dump(self, path):
+        """Write the summary as JSON"""
+        report = {
+            'started': self.started,
+            'written': time.time(),
+            'stages': {name: description for name, description in self.STAGES},
+            'latency_ms': self.summary(),
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {name: LatencyHistogram() for name, _ in self.STAGES}
+            self.started = time.time()
+
+
+class PrometheusText:
+    """Builds a response in the Prometheus text exposition format"""
+
+    def __init__(self, prefix: str = 'subtitle_overlay_'):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    @staticmethod
+    def labels(labels: Optional[Dict[str, str]]) -> str:
+        if not labels:
+            return ''
+        pairs = ','.join(
+            '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+            for key, value in labels.items())
+        return '{' + pairs + '}'
+
+    def metric(self, name: str, kind: str, help_text: str, samples):
+        """Add a counter or gauge; samples is a number or a list of (labels, value)"""
+        name = self.prefix + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        if not isinstance(samples, list):
+            samples = [(None, samples)]
+        for labels, value in samples:
+            self.lines.append(f"{name}{self.labels(labels)} {value}")
+
+    def counter(self, name: str, help_text: str, samples):
+        self.metric(name, 'counter', help_text, samples)
+
+    def gauge(self, name: str, help_text: str, samples):
+        self.metric(name, 'gauge', help_text, samples)
+
+    def histogram(self, name: str, help_text: str, label: str,
+                  histograms: Dict[str, LatencyHistogram]):
+        """Add millisecond histograms as one histogram in seconds, labelled by key"""
+        name = self.prefix + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for key, histogram in histograms.items():
+            for bound, count in histogram.cumulative():
+                labels = self.labels({label: key, 'le': f"{bound / 1000:.6g}"})
+                self.lines.append(f"{name}_bucket{labels} {count}")
+            self.lines.append(f"{name}_bucket{self.labels({label: key, 'le': '+Inf'})} "
+                              f"{histogram.count}")
+            self.lines.append(f"{name}_sum{self.labels({label: key})} "
+                              f"{histogram.total / 1000:.6f}")
+            self.lines.append(f"{name}_count{self.labels({label: key})} {histogram.count}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from PyQt6.QtCore import Qt, QObject, QTimer, pyqtSignal
+
+from subtitle_file import CueIndex, SubtitleFormatError, iter_cues
+
+
+class SubtitlePlayer(QObject):
+    """Plays a CueIndex against a local clock.
+
+    The clock is a (position, monotonic time) anchor plus a rate, so play,
+    pause, seek and rate changes are O(1). Instead of polling, a single-shot
+    timer is armed for the next cue boundary from the index.
+    """
+    cue_changed = pyqtSignal(str)   # active text, "" when nothing is showing
+    loaded = pyqtSignal(str, int)   # file name, cue count
+    load_failed = pyqtSignal(str)
+    _parsed = pyqtSignal(object, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = CueIndex()
+        self.offset = 0.0          # seconds; positive shows subtitles later
+        self.rate = 1.0
+        self.playing = False
+        self.anchor_position = 0.0
+        self.anchor_time = time.monotonic()
+        self.current_text = ""
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.update_cue)
+        self._parsed.connect(self.on_parsed)
+
+    # Loading
+
+    def load_file(self, path: str):
+        """Parse a subtitle file in a background thread"""
+        threading.Thread(target=self._parse, args=(path,), name='SubtitleParser',
+                         daemon=True).start()
+
+    def _parse(self, path: str):
+        try:
+            index = CueIndex(iter_cues(path))
+        except (OSError, SubtitleFormatError, ValueError) as e:
+            self.load_failed.emit(str(e))
+            return
+        self._parsed.emit(index, str(path))
+
+    def on_parsed(self, index: CueIndex, path: str):
+        self.set_index(index)
+        self.loaded.emit(path, len(index))
+
+    def set_index(self, index: CueIndex):
+        self.index = index
+        self.seek(0.0)
+
+    # Clock
+
+    def position(self) -> float:
+        """Return the current media position in seconds"""
+        if not self.playing:
+            return self.anchor_position
+        return self.anchor_position + (time.monotonic() - self.anchor_time) * self.rate
+
+    def set_clock(self, position: float, rate: float = 1.0, playing: bool = True):
+        """Re-anchor the clock to an external media position"""
+        self.anchor_position = position
+        self.anchor_time = time.monotonic()
+        self.rate = rate
+        self.playing = playing
+        self.update_cue()
+
+    def sync_clock(self, position: float, rate: float, playing: bool,
+                   tolerance: float = 0.05):
+        """Follow an external media clock, ignoring jitter below tolerance"""
+        drift = abs(self.position() - position)
+        if playing != self.playing or rate != self.rate or drift > tolerance:
+            self.set_clock(position, rate, playing)
+
+    def play(self):
+        if not self.playing:
+            self.set_clock(self.position(), self.rate, True)
+
+    def pause(self):
+        if self.playing:
+            self.set_clock(self.position(), self.rate, False)
+
+    def toggle(self):
+        if self.playing:
+            self.pause()
+        else:
+            self.play()
+
+    def stop(self):
+        self.set_clock(0.0, self.rate, False)
+        self.timer.stop()
+        self.show_text("")
+
+    def seek(self, position: float):
+        self.set_clock(max(0.0, position), self.rate, self.playing)
+
+    def seek_relative(self, delta: float):
+        self.seek(self.position() + delta)
+
+    def set_offset(self, offset: float):
+        self.offset = offset
+        self.update_cue()
+
+    def adjust_offset(self, delta: float):
+        self.set_offset(self.offset + delta)
+
+    # Scheduling
+
+    def update_cue(self):
+        """Show the cue for the current position and arm the next boundary"""
+        cue_time = self.position() - self.offset
+        self.show_text(self.index.text_at(cue_time))
+
+        self.timer.stop()
+        if not self.playing or self.rate <= 0:
+            return
+        next_change = self.index.next_change(cue_time)
+        if next_change is not None:
+            delay = (next_change - cue_time) / self.rate
+            # +1 ms so the boundary has passed when the timer fires
+            self.timer.start(max(0, int(delay * 1000) + 1))
+
+    def show_text(self, text: str):
+        if text != self.current_text:
+            self.current_text = text
+            self.cue_changed.emit(text)
@@ -0,0 +1,236 @@
+"""Wire formats spoken between the browser extension and SubtitleServer.
+
+Protocol 1 is the original JSON text frame, one cue per message:
+
+    {"type": "subtitle", "text": "...", "timestamp": 1700000000000, "url": "..."}
+
+Protocol 2 is a compact little-endian binary frame. Every frame starts with a
+12-byte header followed by a kind-specific payload:
+
+    u8  version     always 2
+    u8  kind        KIND_REGISTER, KIND_CUES or KIND_DELTA
+    u16 count       number of cues (0 for KIND_REGISTER)
+    u64 base_time   client clock in ms (Date.now())
+
+    KIND_REGISTER  payload is the UTF-8 page URL, sent once per session
+                   and again only when the page URL changes
+    KIND_CUES      `count` records of
+                       u16 delta_ms   offset from base_time
+                       u16 length     byte length of the text
+                       ... UTF-8 text
+    KIND_DELTA     `count` records of
+                       u16 delta_ms   offset from base_time
+                       u16 drop       \
+                       u16 keep        } code points; the new text is
+                       u16 total      /  previous[drop:keep] + text, `total` long
+                       u16 length     byte length of the text
+                       ... UTF-8 text
+
+Deltas let growing captions send only their new words. JSON clients send
+the same fields as {"type": "delta", "drop", "keep", "total", "text",
+"timestamp", "url"}; `previous` is the last text that client sent, either
+way. The server's hello reply says `"deltas": true` when it accepts them.
+
+Clients opt in by sending a JSON hello listing the protocols they speak; the
+server answers with the one it picked. Clients that never say hello keep
+using protocol 1.
+"""
+import json
+import struct
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+PROTOCOL_JSON = 1
+PROTOCOL_BINARY = 2
+SUPPORTED_PROTOCOLS = (PROTOCOL_BINARY, PROTOCOL_JSON)
+
+KIND_REGISTER = 1
+KIND_CUES = 2
+KIND_DELTA = 3
+
+HEADER = struct.Struct('<BBHQ')
+CUE_HEADER = struct.Struct('<HH')
+DELTA_HEADER = struct.Struct('<HHHHH')
+
+
+class ProtocolError(ValueError):
+    """Raised when a binary frame is malformed"""
+
+
+class Delta(NamedTuple):
+    timestamp: int
+    drop: int
+    keep: int
+    total: int
+    text: str
+
+
+class Frame(NamedTuple):
+    kind: int
+    timestamp: int
+    cues: List[Tuple[int, str]]  # Delta records for KIND_DELTA
+    url: Optional[str] = None
+
+
+def negotiate(offered) -> int:
+    """Pick the best protocol both sides support"""
+    try:
+        offered = {int(p) for p in offered}
+    except (TypeError, ValueError):
+        return PROTOCOL_JSON
+    for protocol in SUPPORTED_PROTOCOLS:
+        if protocol in offered:
+            return protocol
+    return PROTOCOL_JSON
+
+
+def encode_register(url: str, timestamp: int) -> bytes:
+    """Encode a URL registration frame"""
+    return HEADER.pack(PROTOCOL_BINARY, KIND_REGISTER, 0, timestamp) + url.encode('utf-8')
+
+
+def encode_cues(cues: List[Tuple[int, str]]) -> bytes:
+    """Encode (timestamp_ms, text) pairs into a single cue frame"""
+    if not cues:
+        raise ProtocolError("Cannot encode an empty cue batch")
+    if len(cues) > 0xFFFF:
+        raise ProtocolError("Too many cues for one frame")
+    base_time = cues[0][0]
+    parts = [HEADER.pack(PROTOCOL_BINARY, KIND_CUES, len(cues), base_time)]
+    for timestamp, text in cues:
+        data = text.encode('utf-8')
+        delta = timestamp - base_time
+        if not 0 <= delta <= 0xFFFF or len(data) > 0xFFFF:
+            raise ProtocolError("Cue does not fit the frame layout")
+        parts.append(CUE_HEADER.pack(delta, len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def encode_deltas(deltas: List[Delta]) -> bytes:
+    """Encode caption deltas into a single delta frame"""
+    if not deltas:
+        raise ProtocolError("Cannot encode an empty delta batch")
+    if len(deltas) > 0xFFFF:
+        raise ProtocolError("Too many deltas for one frame")
+    base_time = deltas[0].timestamp
+    parts = [HEADER.pack(PROTOCOL_BINARY, KIND_DELTA, len(deltas), base_time)]
+    for delta in deltas:
+        data = delta.text.encode('utf-8')
+        offset = delta.timestamp - base_time
+        fields = (offset, delta.drop, delta.keep, delta.total, len(data))
+        if not all(0 <= value <= 0xFFFF for value in fields):
+            raise ProtocolError("Delta does not fit the frame layout")
+        parts.append(DELTA_HEADER.pack(*fields))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def decode_frame(data: bytes) -> Frame:
+    """Decode a protocol 2 binary frame"""
+    if len(data) < HEADER.size:
+        raise ProtocolError("Frame shorter than header")
+    version, kind, count, base_time = HEADER.unpack_from(data, 0)
+    if version != PROTOCOL_BINARY:
+        raise ProtocolError(f"Unsupported frame version {version}")
+
+    if kind == KIND_REGISTER:
+        try:
+            url = data[HEADER.size:].decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise ProtocolError(f"Invalid URL encoding: {e}")
+        return Frame(kind, base_time, [], url)
+
+    if kind == KIND_DELTA:
+        return Frame(kind, base_time, decode_deltas(data, count, base_time))
+    if kind != KIND_CUES:
+        raise ProtocolError(f"Unknown frame kind {kind}")
+
+    cues = []
+    offset = HEADER.size
+    end = len(data)
+    for _ in range(count):
+        if offset + CUE_HEADER.size > end:
+            raise ProtocolError("Truncated cue header")
+        delta, length = CUE_HEADER.unpack_from(data, offset)
+        offset += CUE_HEADER.size
+        if offset + length > end:
+            raise ProtocolError("Truncated cue text")
+        try:
+            text = data[offset:offset + length].decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise ProtocolError(f"Invalid cue encoding: {e}")
+        offset += length
+        cues.append((base_time + delta, text))
+    if offset != end:
+        raise ProtocolError("Trailing bytes after last cue")
+    return Frame(kind, base_time, cues)
+
+
+def decode_deltas(data: bytes, count: int, base_time: int) -> List[Delta]:
+    deltas = []
+    offset = HEADER.size
+    end = len(data)
+    for _ in range(count):
+        if offset + DELTA_HEADER.size > end:
+            raise ProtocolError("Truncated delta header")
+        delta, drop, keep, total, length = DELTA_HEADER.unpack_from(data, offset)
+        offset += DELTA_HEADER.size
+        if offset + length > end:
+            raise ProtocolError("Truncated delta text")
+        try:
+            text = data[offset:offset + length].decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise ProtocolError(f"Invalid delta encoding: {e}")
+        offset += length
+        deltas.append(Delta(base_time + delta, drop, keep, total, text))
+    if offset != end:
+        raise ProtocolError("Trailing bytes after last delta")
+    return deltas
+
+
+def measure(cue_count: int = 10000, batch_size: int = 1):
+    """Compare bytes per cue and decode time of the JSON and binary formats"""
+    url = 'https://www.netflix.com/watch/81234567?trackId=14170286&tctx=1%2C0%2C'
+    base = int(time.time() * 1000)
+    cues = [(base + i * 40, f"Subtitle line number {i}, said by someone on screen")
+            for i in range(cue_count)]
+
+    json_frames = [
+        json.dumps({'type': 'subtitle', 'text': text, 'timestamp': ts, 'url': url})
+        for ts, text in cues
+    ]
+    binary_frames = [encode_register(url, base)]
+    for i in range(0, cue_count, batch_size):
+        binary_frames.append(encode_cues(cues[i:i + batch_size]))
+
+    start = time.perf_counter()
+    for frame in json_frames:
+        json.loads(frame)
+    json_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in binary_frames[1:]:
+        decode_frame(frame)
+    binary_seconds = time.perf_counter() - start
+
+    json_bytes = sum(len(f.encode('utf-8')) for f in json_frames)
+    binary_bytes = sum(len(f) for f in binary_frames)
+    return {
+        'cues': cue_count,
+        'batch_size': batch_size,
+        'json_bytes_per_cue': json_bytes / cue_count,
+        'binary_bytes_per_cue': binary_bytes / cue_count,
+        'json_decode_us_per_cue': json_seconds / cue_count * 1e6,
+        'binary_decode_us_per_cue': binary_seconds / cue_count * 1e6,
+    }
+
+
+if __name__ == '__main__':
+    for batch in (1, 8):
+        result = measure(batch_size=batch)
+        print(f"batch={batch}: "
+              f"JSON {result['json_bytes_per_cue']:.1f} B/cue, "
+              f"{result['json_decode_us_per_cue']:.2f} us/cue | "
+              f"binary {result['binary_bytes_per_cue']:.1f} B/cue, "
+              f"{result['binary_decode_us_per_cue']:.2f} us/cue")
@@ -0,0 +1,401 @@
+import math
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from PyQt6.QtCore import Qt, QPointF
+from PyQt6.QtGui import (QColor, QFont, QFontMetricsF, QPainter, QPainterPath, QPen, QPixmap,
+                         QTextLayout, QTextOption)
+from PyQt6.QtWidgets import QSizePolicy, QWidget
+
+from rolling import common_prefix
+
+
+class SubtitleStyle(NamedTuple):
+    font_family: str = 'Arial'
+    font_size: int = 22
+    color: str = '#FFFFFF'
+    outline: bool = True
+    outline_color: str = '#000000'
+    outline_width: int = 2
+    padding_x: int = 16
+    padding_y: int = 8
+    highlight_color: str = '#FFD54F'
+
+
+class Line(NamedTuple):
+    start: int     # offset of the line in the text
+    end: int       # end of its visible text (trailing spaces dropped)
+    height: float
+
+
+def make_font(family: str, size: int) -> QFont:
+    font = QFont(family, max(1, size))
+    font.setBold(True)
+    return font
+
+
+class FontFitter:
+    """Finds the largest font size at which text fits a line and height budget.
+
+    Candidate sizes are binary-searched. Each probe wraps the text greedily
+    using word widths from an LRU keyed by (family, size, word), so lines
+    that share words with recent ones are measured almost for free, and
+    the final size per (text, family, size, width, height, lines) is kept
+    in a second LRU. Splitting only at spaces never underestimates the
+    line count, so the chosen size errs on the small side.
+    """
+
+    def __init__(self, min_size: int = 10, width_cache: int = 4096, fit_cache: int = 256):
+        self.min_size = min_size
+        self.width_cache_size = width_cache
+        self.fit_cache_size = fit_cache
+        self.widths: "OrderedDict[tuple, float]" = OrderedDict()
+        self.fitted: "OrderedDict[tuple, int]" = OrderedDict()
+        self.metrics: Dict[tuple, QFontMetricsF] = {}
+        self.probes = 0
+        self.fit_hits = 0
+
+    def font_metrics(self, family: str, size: int) -> QFontMetricsF:
+        key = (family, size)
+        metrics = self.metrics.get(key)
+        if metrics is None:
+            metrics = self.metrics[key] = QFontMetricsF(make_font(family, size))
+        return metrics
+
+    def width(self, family: str, size: int, word: str) -> float:
+        key = (family, size, word)
+        value = self.widths.get(key)
+        if value is not None:
+            self.widths.move_to_end(key)
+            return value
+        value = self.font_metrics(family, size).horizontalAdvance(word)
+        self.widths[key] = value
+        if len(self.widths) > self.width_cache_size:
+            self.widths.popitem(last=False)
+        return value
+
+    def count_lines(self, text: str, family: str, size: int, available: float) -> int:
+        """Estimate wrapped line count with greedy word wrapping"""
+        space = self.width(family, size, ' ')
+        lines = 0
+        for paragraph in text.split('\n'):
+            lines += 1
+            x = 0.0
+            for word in paragraph.split():
+                w = self.width(family, size, word)
+                if x and x + space + w <= available:
+                    x += space + w
+                    continue
+                if x:
+                    lines += 1
+                if w > available:
+                    # Broken anywhere: it fills whole lines
+                    extra = math.ceil(w / available) - 1
+                    lines += extra
+                    w -= extra * available
+                x = w
+        return lines
+
+    def fits(self, text: str, family: str, size: int, available: float,
+             height: float, max_lines: int) -> bool:
+        self.probes += 1
+        lines = self.count_lines(text, family, size, available)
+        if max_lines and lines > max_lines:
+            return False
+        return height <= 0 or lines * self.font_metrics(family, size).lineSpacing() <= height
+
+    def fit(self, text: str, family: str, size: int, available: float,
+            height: float, max_lines: int) -> int:
+        """Return the largest size <= size that fits, or min_size if none does"""
+        if available <= 0 or (not max_lines and height <= 0):
+            return size
+        key = (text, family, size, available, height, max_lines)
+        fitted = self.fitted.get(key)
+        if fitted is not None:
+            self.fitted.move_to_end(key)
+            self.fit_hits += 1
+            return fitted
+
+        if self.fits(text, family, size, available, height, max_lines):
+            fitted = size
+        else:
+            low, high = self.min_size, size - 1
+            fitted = min(self.min_size, size)
+            while low <= high:
+                middle = (low + high) // 2
+                if self.fits(text, family, middle, available, height, max_lines):
+                    fitted = middle
+                    low = middle + 1
+                else:
+                    high = middle - 1
+
+        self.fitted[key] = fitted
+        if len(self.fitted) > self.fit_cache_size:
+            self.fitted.popitem(last=False)
+        return fitted
+
+    def clear(self):
+        self.widths.clear()
+        self.fitted.clear()
+        self.metrics.clear()
+
+
+class SubtitleView(QWidget):
+    """Paints subtitle text with a real outline.
+
+    Each (text, highlights, style, size, width) combination is laid out and
+    rasterised once into a pixmap kept in a small LRU, so repeated or
+    recently shown lines are painted with a single blit. Style objects are
+    only rebuilt when the settings change. With `max_lines` set, the font
+    shrinks per subtitle until the text fits that many lines and the view.
+
+    Rolling captions change only their tail, so line breaks before the
+    change are reused from the previous text and every wrapped line is
+    rasterised on its own, in a second LRU: a caption that grew by a word
+    re-renders only its last line.
+    """
+
+    def __init__(self, parent=None, cache_size: int = 64, line_cache_size: int = 256):
+        super().__init__(parent)
+        self._text = ""
+        self._spans: Tuple[Tuple[int, int], ...] = ()
+        self.subtitle_style = SubtitleStyle()
+        self.text_font = self.make_font(self.subtitle_style)
+        self.fonts: Dict[int, QFont] = {}
+        self.max_lines = 0  # 0: never shrink
+        self.fitter = FontFitter()
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[tuple, QPixmap]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.line_cache_size = line_cache_size
+        self.line_cache: "OrderedDict[tuple, QPixmap]" = OrderedDict()
+        self.line_hits = 0
+        self.line_misses = 0
+        self.wrapped: Optional[tuple] = None  # (text, font key, available, lines)
+        self.lines_reused = 0
+        self.lines_wrapped = 0
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+
+    @staticmethod
+    def make_font(style: SubtitleStyle) -> QFont:
+        return make_font(style.font_family, style.font_size)
+
+    def font_at(self, size: int) -> QFont:
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = make_font(self.subtitle_style.font_family, size)
+        return font
+
+    def set_style(self, style: SubtitleStyle):
+        """Apply a new style; cached pixmaps for other styles age out of the LRU"""
+        if style == self.subtitle_style:
+            return
+        self.subtitle_style = style
+        self.text_font = self.make_font(style)
+        self.fonts = {}
+        self.update()
+
+    def set_max_lines(self, max_lines: int):
+        if max_lines != self.max_lines:
+            self.max_lines = max_lines
+            self.update()
+
+    def fitted_size(self, text: str, width: int, height: int) -> int:
+        """Return the font size that fits text into max_lines and the view"""
+        style = self.subtitle_style
+        if not self.max_lines:
+            return style.font_size
+        return self.fitter.fit(
+            text, style.font_family, style.font_size,
+            width - 2 * style.padding_x, height - 2 * style.padding_y, self.max_lines)
+
+    def setText(self, text: str, spans: Sequence[Tuple[int, int]] = ()) -> bool:
+        """Show text; spans are (start, end) character ranges to highlight.
+
+        Returns False when nothing changed and no repaint was scheduled.
+        """
+        spans = tuple(spans)
+        if text == self._text and spans == self._spans:
+            return False
+        self._text = text
+        self._spans = spans
+        self.update()
+        return True
+
+    def text(self) -> str:
+        return self._text
+
+    def paintEvent(self, event):
+        if not self._text:
+            return
+        size = self.fitted_size(self._text, self.width(), self.height())
+        pixmap = self.pixmap_for(self._text, self.width(), self._spans, size)
+        if pixmap is None:
+            return
+        ratio = pixmap.devicePixelRatio()
+        height = pixmap.height() / ratio
+        top = max(0.0, (self.height() - height) / 2)
+        painter = QPainter(self)
+        painter.drawPixmap(QPointF(0, top), pixmap)
+        painter.end()
+
+    def pixmap_for(self, text: str, width: int, spans: Tuple[Tuple[int, int], ...] = (),
+                   size: Optional[int] = None) -> Optional[QPixmap]:
+        """Return the rendered pixmap for text, from the LRU when possible"""
+        ratio = self.devicePixelRatioF()
+        if size is None:
+            size = self.subtitle_style.font_size
+        key = (text, spans, self.subtitle_style, size, width, ratio)
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return pixmap
+
+        self.cache_misses += 1
+        pixmap = self.render_text(text, width, ratio, spans, self.font_at(size))
+        if pixmap is not None:
+            self.cache[key] = pixmap
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return pixmap
+
+    def wrap(self, text: str, available: float, font: QFont) -> List[Line]:
+        """Word-wrap text, reusing the previous text's line breaks before its changed tail"""
+        key = (font.family(), font.pointSize())
+        lines: List[Line] = []
+        start = 0
+        if self.wrapped and self.wrapped[1:3] == (key, available):
+            old_text, _, _, old_lines = self.wrapped
+            changed = common_prefix(old_text, text)
+            # A line's break depends on the first word of the next line, so a
+            # line is kept only when that word lies wholly before the change
+            for line, following in zip(old_lines, old_lines[1:]):
+                if following.start >= changed or not any(
+                        c.isspace() for c in old_text[following.start:changed]):
+                    break
+                lines.append(line)
+            if lines:
+                start = old_lines[len(lines)].start
+        self.lines_reused += len(lines)
+
+        # QTextLayout only forces a break at the Unicode line separator
+        tail = text[start:].replace('\n', '\u2028')
+        layout = QTextLayout(tail, font)
+        option = QTextOption()
+        option.setWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
+        layout.setTextOption(option)
+        layout.beginLayout()
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(available)
+            line_start = line.textStart()
+            visible = tail[line_start:line_start + line.textLength()].rstrip()
+            lines.append(Line(start + line_start, start + line_start + len(visible),
+                              line.height()))
+            self.lines_wrapped += 1
+        layout.endLayout()
+        self.wrapped = (text, key, available, lines)
+        return lines
+
+    def line_pixmap(self, text: str, spans: Tuple[Tuple[int, int], ...], width: int,
+                    ratio: float, font: QFont) -> Tuple[QPixmap, float]:
+        """Return one wrapped line rendered across the full width, and its top margin"""
+        style = self.subtitle_style
+        margin = style.outline_width + 2 if style.outline else 2
+        key = (text, spans, style, font.pointSize(), width, ratio)
+        pixmap = self.line_cache.get(key)
+        if pixmap is not None:
+            self.line_cache.move_to_end(key)
+            self.line_hits += 1
+            return pixmap, margin
+
+        self.line_misses += 1
+        available = max(1, width - 2 * style.padding_x)
+        layout = QTextLayout(text, font)
+        layout.beginLayout()
+        line = layout.createLine()
+        line.setLineWidth(1e6)
+        layout.endLayout()
+        x = style.padding_x + max(0.0, (available - line.naturalTextWidth()) / 2)
+        baseline = margin + line.ascent()
+
+        # Split the line at highlight boundaries; each piece is placed at
+        # the x the layout gave its first character
+        path = QPainterPath()
+        highlight_path = QPainterPath()
+        position = 0
+        for span_start, span_end in spans:
+            if span_start > position:
+                path.addText(QPointF(x + line.cursorToX(position)[0], baseline),
+                             font, text[position:span_start])
+            highlight_path.addText(QPointF(x + line.cursorToX(span_start)[0], baseline),
+                                   font, text[span_start:span_end])
+            position = span_end
+        if position < len(text):
+            path.addText(QPointF(x + line.cursorToX(position)[0], baseline),
+                         font, text[position:])
+
+        height = line.height() + 2 * margin
+        pixmap = QPixmap(int(width * ratio), int(math.ceil(height * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if style.outline and style.outline_width > 0:
+            # Stroke at twice the width; the fill covers the inner half
+            pen = QPen(QColor(style.outline_color), style.outline_width * 2)
+            pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
+            painter.strokePath(path, pen)
+            painter.strokePath(highlight_path, pen)
+        painter.fillPath(path, QColor(style.color))
+        painter.fillPath(highlight_path, QColor(style.highlight_color))
+        painter.end()
+
+        self.line_cache[key] = pixmap
+        if len(self.line_cache) > self.line_cache_size:
+            self.line_cache.popitem(last=False)
+        return pixmap, margin
+
+    def render_text(self, text: str, width: int, ratio: float,
+                    spans: Sequence[Tuple[int, int]] = (),
+                    font: Optional[QFont] = None) -> Optional[QPixmap]:
+        if width <= 0:
+            return None
+        style = self.subtitle_style
+        font = font or self.text_font
+        lines = self.wrap(text, max(1, width - 2 * style.padding_x), font)
+        height = 2 * style.padding_y + sum(line.height for line in lines)
+
+        pixmap = QPixmap(int(width * ratio), int(height * ratio) + 1)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        y = float(style.padding_y)
+        for line in lines:
+            line_spans = tuple(
+                (max(start, line.start) - line.start, min(end, line.end) - line.start)
+                for start, end in spans if start < line.end and end > line.start)
+            line_text = text[line.start:line.end]
+            if line_text:
+                line_image, margin = self.line_pixmap(line_text, line_spans, width, ratio, font)
+                painter.drawPixmap(QPointF(0, y - margin), line_image)
+            y += line.height
+        painter.end()
+        return pixmap
+
+    def text_height(self, text: str, width: int) -> float:
+        """Return the laid-out height of text at width"""
+        style = self.subtitle_style
+        lines = self.wrap(text, max(1, width - 2 * style.padding_x), self.text_font)
+        return 2 * style.padding_y + sum(line.height for line in lines)
+
+    def cache_stats(self):
+        return {'size': len(self.cache), 'hits': self.cache_hits, 'misses': self.cache_misses,
+                'line_hits': self.line_hits, 'line_misses': self.line_misses,
+                'lines_reused': self.lines_reused, 'lines_wrapped': self.lines_wrapped,
+                'fit_probes': self.fitter.probes, 'fit_hits': self.fitter.fit_hits}
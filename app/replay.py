@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Replay a capture file into a running subtitle server.
+
+Every captured client gets its own WebSocket connection, opened and closed
+when the original one was, and its frames are sent on the original
+schedule scaled by --speed (0 sends as fast as possible). Client
+timestamps inside the frames are rewritten to the replay time unless
+--keep-timestamps is given, so the latency report stays meaningful.
+
+    python app/replay.py session.socap --speed 1
+    python app/replay.py session.socap --speed 10 --url ws://127.0.0.1:8790
+    python app/replay.py session.socap --speed 0 --output replay.json
+"""
+import argparse
+import asyncio
+import json
+import struct
+import sys
+import time
+from typing import Dict, List
+
+import websockets
+
+from capture import (KIND_BINARY, KIND_CONNECT, KIND_DISCONNECT, KIND_TEXT,
+                     CaptureRecord, read_capture)
+from metrics import LatencyHistogram
+from protocol import HEADER
+
+BASE_TIME = struct.Struct('<Q')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a subtitle capture file")
+    parser.add_argument('capture', help="capture file written with --capture")
+    parser.add_argument('--url', default='ws://127.0.0.1:8765',
+                        help="server to replay into (default: %(default)s)")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="time scale: 1 = real time, 10 = ten times faster, "
+                             "0 = as fast as possible (default: %(default)s)")
+    parser.add_argument('--keep-timestamps', action='store_true',
+                        help="send client timestamps exactly as captured")
+    parser.add_argument('--output', help="write a JSON report here")
+    return parser.parse_args(argv)
+
+
+def retime(kind: int, payload: bytes, now_ms: int) -> bytes:
+    """Replace the client timestamp of a frame with now_ms"""
+    if kind == KIND_BINARY:
+        if len(payload) >= HEADER.size:
+            return payload[:4] + BASE_TIME.pack(now_ms) + payload[4 + BASE_TIME.size:]
+        return payload
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return payload
+    if isinstance(data, dict) and 'timestamp' in data:
+        data['timestamp'] = now_ms
+        return json.dumps(data).encode('utf-8')
+    return payload
+
+
+class Replayer:
+    def __init__(self, records: List[CaptureRecord], url: str, speed: float,
+                 keep_timestamps: bool = False):
+        self.records = records
+        self.url = url
+        self.speed = speed
+        self.keep_timestamps = keep_timestamps
+        self.connections: Dict[int, websockets.WebSocketClientProtocol] = {}
+        self.readers: List[asyncio.Task] = []
+        self.lateness = LatencyHistogram()
+        self.sent = 0
+        self.failed = 0
+        self.received = 0
+
+    async def drain(self, connection):
+        # Hello replies and broadcasts must be read or the server's sends back up
+        try:
+            async for _ in connection:
+                self.received += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def connect(self, client_id: int):
+        connection = await websockets.connect(self.url, max_size=None)
+        self.connections[client_id] = connection
+        self.readers.append(asyncio.create_task(self.drain(connection)))
+        return connection
+
+    async def run(self) -> float:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for record in self.records:
+            if self.speed > 0:
+                due = started + record.offset / self.speed
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.lateness.record(max(0.0, loop.time() - due) * 1000)
+            await self.play(record)
+        for connection in list(self.connections.values()):
+            await connection.close()
+        await asyncio.gather(*self.readers, return_exceptions=True)
+        return loop.time() - started
+
+    async def play(self, record: CaptureRecord):
+        connection = self.connections.get(record.client_id)
+        try:
+            if record.kind == KIND_CONNECT:
+                if connection is None:
+                    await self.connect(record.client_id)
+            elif record.kind == KIND_DISCONNECT:
+                if connection is not None:
+                    del self.connections[record.client_id]
+                    await connection.close()
+            elif record.kind in (KIND_TEXT, KIND_BINARY):
+                if connection is None:
+                    # The capture started while this client was already connected
+                    connection = await self.connect(record.client_id)
+                payload = record.payload
+                if not self.keep_timestamps:
+                    payload = retime(record.kind, payload, int(time.time() * 1000))
+                if record.kind == KIND_TEXT:
+                    await connection.send(payload.decode('utf-8', errors='replace'))
+                else:
+                    await connection.send(payload)
+                self.sent += 1
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            self.failed += 1
+            print(f"Replay error for client {record.client_id}: {e}")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        records = list(read_capture(args.capture))
+    except (OSError, ValueError) as e:
+        print(f"Error reading capture: {e}")
+        return 1
+    if not records:
+        print("Capture is empty")
+        return 1
+
+    clients = len({record.client_id for record in records})
+    print(f"Replaying {len(records)} records from {clients} clients "
+          f"({records[-1].offset:.1f} s captured) at "
+          f"{'max speed' if args.speed <= 0 else f'{args.speed:g}x'}")
+    replayer = Replayer(records, args.url, args.speed, args.keep_timestamps)
+    duration = asyncio.run(replayer.run())
+
+    report = {
+        'capture': args.capture,
+        'speed': args.speed,
+        'records': len(records),
+        'clients': clients,
+        'captured_seconds': records[-1].offset,
+        'replay_seconds': duration,
+        'frames_sent': replayer.sent,
+        'frames_failed': replayer.failed,
+        'frames_per_second': replayer.sent / duration if duration else 0.0,
+        'schedule_lateness_ms': replayer.lateness.summary(),
+    }
+    print(f"Sent {replayer.sent} frames in {duration:.2f} s "
+          f"({report['frames_per_second']:.0f}/s), {replayer.failed} failed")
+    if args.speed > 0:
+        lateness = report['schedule_lateness_ms']
+        print(f"Schedule lateness: p50 {lateness['p50']:.1f} / p99 {lateness['p99']:.1f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0 if not replayer.failed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
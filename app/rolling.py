@@ -0,0 +1,142 @@
+"""Rolling and growing captions.
+
+Auto-generated captions (YouTube, some Rezka players) grow word by word
+and scroll earlier words off the top, so consecutive polls look like:
+
+    "we were"  ->  "we were going to"              extend
+    "we were going to"  ->  "we were going two"     revise (last word corrected)
+    "we were going to\\nthe park"  ->  "the park and"  scroll
+
+`classify()` tells these apart from a genuinely new subtitle. Ordinary
+cues often start like the one before ("Thank you." -> "Thank you, sir."),
+so a finished sentence is never extended or revised, and `RollingCaption`
+only coalesces updates that arrive within ROLLING_GAP of each other, as
+a caption being recognised does. The wire
+format sends such updates as deltas (see `apply_delta`), the renderer keeps
+the laid-out lines before the changed tail, and `RollingCaption` writes one
+finished line to history instead of every growing prefix.
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+EXTEND = 'extend'
+REVISE = 'revise'
+SCROLL = 'scroll'
+REPLACE = 'replace'
+
+MIN_OVERLAP = 8  # characters a scrolled caption must keep from the previous one
+SENTENCE_END = '.!?…。！？'
+ROLLING_GAP = 1.5  # seconds; a growing caption updates more often than this
+
+
+class Update(NamedTuple):
+    kind: str
+    dropped: int  # characters scrolled off the front of the previous text
+    kept: int     # characters of the previous text still shown, after `dropped`
+
+
+def common_prefix(a: str, b: str) -> int:
+    """Return the length of the common prefix of a and b"""
+    limit = min(len(a), len(b))
+    if a[:limit] == b[:limit]:
+        return limit
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def scroll_offset(previous: str, text: str) -> int:
+    """Return where the longest suffix of previous that starts text begins, or -1.
+
+    The suffix must start at a word and cover at least half of text, so a
+    new subtitle that happens to start with the last word of the old one
+    is not mistaken for a scroll.
+    """
+    minimum = max(MIN_OVERLAP, len(text) // 2)
+    for start in range(1, len(previous) - minimum + 1):
+        if not previous[start - 1].isspace() or previous[start].isspace():
+            continue
+        if text.startswith(previous[start:]):
+            return start
+    return -1
+
+
+def ends_sentence(text: str) -> bool:
+    text = text.rstrip()
+    return bool(text) and text[-1] in SENTENCE_END
+
+
+def classify(previous: str, text: str) -> Update:
+    """Describe how text relates to the previously shown text"""
+    if previous and text.startswith(previous):
+        if text == previous or not ends_sentence(previous):
+            return Update(EXTEND, 0, len(previous))
+        return Update(REPLACE, 0, 0)
+    prefix = common_prefix(previous, text)
+    # Recognisers only ever correct the word being spoken, not a finished sentence
+    tail = previous[prefix:]
+    if prefix >= MIN_OVERLAP and not any(c.isspace() or c in SENTENCE_END for c in tail):
+        return Update(REVISE, 0, prefix)
+    start = scroll_offset(previous, text) if previous else -1
+    if start > 0:
+        return Update(SCROLL, start, len(previous) - start)
+    return Update(REPLACE, 0, 0)
+
+
+def apply_delta(previous: str, drop: int, keep: int, tail: str,
+                length: Optional[int] = None) -> Optional[str]:
+    """Rebuild a caption sent as previous[drop:keep] + tail; None if out of sync"""
+    if not 0 <= drop <= keep <= len(previous):
+        return None
+    text = previous[drop:keep] + tail
+    if length is not None and len(text) != length:
+        return None
+    return text
+
+
+class RollingCaption:
+    """Tracks the caption on screen and yields the lines that are finished.
+
+    A line is finished when it scrolls off, when a different subtitle
+    replaces it, or when it is hidden. Growing and corrected versions of
+    the same line are never reported. Anything but a repeat that comes more
+    than `gap` seconds after the previous update is a new subtitle.
+    """
+
+    def __init__(self, gap: float = ROLLING_GAP):
+        self.gap = gap
+        self.text = ""
+        self.started = 0.0
+        self.updated = 0.0
+        self.source_id = 0
+
+    def update(self, text: str, timestamp: float,
+               source_id: int = 0) -> Tuple[Update, List[Tuple[str, float, int]]]:
+        """Show text; return the update kind and finished (text, timestamp, source) lines"""
+        finished = []
+        if source_id != self.source_id:
+            update = Update(REPLACE, 0, 0)
+        elif text != self.text and timestamp - self.updated > self.gap:
+            update = Update(REPLACE, 0, 0)
+        else:
+            update = classify(self.text, text)
+        if update.kind == SCROLL:
+            finished.append((self.text[:update.dropped], self.started, self.source_id))
+            self.started = timestamp
+        elif update.kind == REPLACE:
+            finished.append((self.text, self.started, self.source_id))
+            self.started = timestamp
+        self.text = text
+        self.updated = timestamp
+        self.source_id = source_id
+        return update, [(line.strip(), started, source)
+                        for line, started, source in finished if line.strip()]
+
+    def finish(self) -> List[Tuple[str, float, int]]:
+        """The caption was hidden; return it as a finished line"""
+        text, self.text = self.text.strip(), ""
+        return [(text, self.started, self.source_id)] if text else []
@@ -0,0 +1,170 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from history import HistoryEntry
+
+# A posting list this long is narrowed with a second trigram before verifying
+INTERSECT_THRESHOLD = 10000
+# Queries shorter than a trigram only scan this many of the newest lines
+SHORT_QUERY_SCAN = 10000
+# Posting lists trimmed of evicted ids per added line
+TRIM_BATCH = 64
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Incrementally maintained trigram index over subtitle history.
+
+    Every entry gets a sequential id and each of its distinct trigrams an
+    id appended to that trigram's posting list, so adding a line costs
+    O(line length) and posting lists stay sorted by time. A query walks
+    the rarest posting list newest-first and verifies candidates with a
+    substring check; queries shorter than a trigram fall back to a scan of
+    the newest SHORT_QUERY_SCAN lines.
+
+    At most `capacity` lines are kept. Once a quarter more have been added,
+    the oldest are evicted; their ids are trimmed from the posting lists a
+    batch per added line, and until then queries stop at the first evicted
+    id, so no single add pays for the whole index.
+    """
+
+    def __init__(self, capacity: int = 100000):
+        self.capacity = max(1, capacity)
+        self.base = 0  # id of texts[0]; older ids have been evicted
+        self._lock = threading.Lock()
+        self.postings: Dict[str, array] = {}
+        self.texts: List[str] = []
+        self.timestamps = array('d')
+        self.sources = array('L')
+        self._pool: Dict[str, str] = {}
+        self._untrimmed: List[str] = []  # grams that may still hold evicted ids
+        self.loading = False
+        self._backlog: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, text: str, timestamp: Optional[float] = None, source_id: int = 0):
+        """Index a new history entry"""
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            if self.loading:
+                # Keep ids in time order: live entries wait for the stored ones
+                self._backlog.append((text, timestamp, source_id))
+                return
+            self._add(text, timestamp, source_id)
+
+    def _add(self, text: str, timestamp: float, source_id: int):
+        doc_id = self.base + len(self.texts)
+        text = self._pool.setdefault(text, text)
+        self.texts.append(text)
+        self.timestamps.append(timestamp)
+        self.sources.append(source_id)
+        postings = self.postings
+        for gram in trigrams(normalize(text)):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('L')
+            posting.append(doc_id)
+        if self._untrimmed:
+            self._trim(TRIM_BATCH)
+        elif len(self.texts) >= self.capacity + max(1, self.capacity // 4):
+            self._evict(len(self.texts) - self.capacity)
+
+    def _evict(self, count: int):
+        """Drop the oldest count lines; their postings are trimmed later"""
+        for text in self.texts[:count]:
+            # A repeat of the line that is still kept just won't be shared
+            self._pool.pop(text, None)
+        del self.texts[:count]
+        del self.timestamps[:count]
+        del self.sources[:count]
+        self.base += count
+        self._untrimmed = list(self.postings)
+
+    def _trim(self, count: int):
+        postings = self.postings
+        for _ in range(min(count, len(self._untrimmed))):
+            gram = self._untrimmed.pop()
+            posting = postings.get(gram)
+            if posting is None:
+                continue
+            cut = bisect_left(posting, self.base)
+            if cut == len(posting):
+                del postings[gram]
+            elif cut:
+                del posting[:cut]
+
+    def load_async(self, store, count: int):
+        """Index the most recent stored entries in a background thread"""
+        cutoff = time.time()
+        with self._lock:
+            self.loading = True
+        threading.Thread(target=self._load, args=(store, count, cutoff),
+                         name='SearchIndexLoader', daemon=True).start()
+
+    def _load(self, store, count: int, cutoff: float):
+        try:
+            entries = [e for e in store.read_latest(count) if e.timestamp < cutoff]
+        except (OSError, ValueError) as e:
+            print(f"Error loading history for search: {e}")
+            entries = []
+        batch = 200
+        for start in range(0, len(entries), batch):
+            with self._lock:
+                for entry in entries[start:start + batch]:
+                    self._add(entry.text, entry.timestamp, entry.source_id)
+        with self._lock:
+            for item in self._backlog:
+                self._add(*item)
+            self._backlog = []
+            self.loading = False
+
+    def search(self, query: str, limit: int = 200) -> List[HistoryEntry]:
+        """Return up to limit entries containing query, newest first"""
+        needle = normalize(query)
+        if not needle:
+            return []
+        with self._lock:
+            texts = self.texts
+            base = self.base
+            if len(needle) < 3:
+                newest = base + len(texts) - 1
+                candidates = range(newest, max(base, newest - SHORT_QUERY_SCAN + 1) - 1, -1)
+            else:
+                lists = []
+                for gram in trigrams(needle):
+                    posting = self.postings.get(gram)
+                    if posting is None:
+                        return []
+                    lists.append(posting)
+                lists.sort(key=len)
+                candidates = lists[0]
+                if len(candidates) > INTERSECT_THRESHOLD and len(lists) > 1:
+                    other = set(lists[1])
+                    candidates = [doc_id for doc_id in candidates if doc_id in other]
+                candidates = reversed(candidates)
+
+            results = []
+            for doc_id in candidates:
+                if doc_id < base:
+                    break  # the rest was evicted
+                index = doc_id - base
+                text = texts[index]
+                if needle in normalize(text):
+                    results.append(HistoryEntry(
+                        text, self.timestamps[index], self.sources[index]))
+                    if len(results) >= limit:
+                        break
+            return results
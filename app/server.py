@@ -1,53 +1,603 @@
 import asyncio
+import errno
 import json
+import time
+from http import HTTPStatus
 from typing import Callable, Optional
 import websockets
 from websockets.server import serve
 
+from broadcast import Broadcaster, POLICY_DROP
+from capture import (CaptureWriter, KIND_BINARY, KIND_CONNECT, KIND_DISCONNECT,
+                     KIND_TEXT)
+from jitter import JitterBuffer
+from local_ipc import LineReader, UnixSocketListener
+from metrics import CueTiming, LatencyTracker, PrometheusText
+from protocol import (PROTOCOL_BINARY, KIND_REGISTER, KIND_CUES, KIND_DELTA,
+                      ProtocolError, decode_frame, negotiate)
+from rolling import apply_delta
+from subtitle_file import Cue, CueIndex, clean_markup
+from transforms import TransformPipeline
+from session import ClientSession, DuplicateFilter, SourceArbiter, POLICY_LATEST
+
+
+ACTIVE_SENDER_WINDOW = 5.0  # seconds since its last cue that a client counts as sending
+MAX_CLOCK_SEEDS = 64        # pages whose clock offset is remembered for reconnects
+
+
+def is_address_in_use(error: OSError) -> bool:
+    """True when binding failed because another process holds the port"""
+    # 10048 is WSAEADDRINUSE; errno.EADDRINUSE is 98 on Linux and 48 on macOS
+    return error.errno in (errno.EADDRINUSE, 10048)
+
 class SubtitleServer:
-    def __init__(self, host: str = '127.0.0.1', port: int = 8765):
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765,
+                 source_policy: str = POLICY_LATEST, switch_delay: float = 2.0,
+                 dedup_window: float = 3.0, rate_limit: float = 10.0,
+                 rate_burst: float = 20.0, subscriber_queue: int = 64,
+                 slow_subscriber: str = POLICY_DROP,
+                 pipeline: Optional[TransformPipeline] = None,
+                 jitter_window: float = 25.0, max_cue_age: float = 3000.0,
+                 unix_socket: str = '', line_input: str = ''):
         self.host = host
         self.port = port
         self.server = None
-        self.clients = set()
+        self.unix_socket = unix_socket  # path of a local socket to listen on too
+        self.line_input = line_input    # '-' for stdin or a FIFO path
+        self.local_transports = []
+        self.loop = None
+        self.stop_future = None
+        self.clients = {}  # client_id -> ClientSession
         self.on_subtitle_callback: Optional[Callable] = None
+        self.on_track_callback: Optional[Callable] = None
+        self.on_clock_callback: Optional[Callable] = None
+        self.on_listening_callback: Optional[Callable] = None
+        self.metrics_callback: Optional[Callable] = None
+        self.recorder: Optional[CaptureWriter] = None
+        self.track_source = None  # (client_id, track_version) last forwarded
         self.running = False
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        self.arbiter = SourceArbiter(source_policy, switch_delay)
+        self.duplicates = DuplicateFilter(dedup_window)
+        self.latency = LatencyTracker()
+        self.broadcaster = Broadcaster(subscriber_queue, slow_subscriber)
+        self.pipeline = pipeline or TransformPipeline()
+        # Cues are released in client-timestamp order, `jitter_window` ms late
+        self.jitter = JitterBuffer(jitter_window, max_cue_age)
+        self.jitter_timer: Optional[asyncio.TimerHandle] = None
+        self.clock_seeds = {}  # page URL -> last clock offset, seeds new sessions
+        self.last_clock_offset: Optional[float] = None
+        self.sequence = 0            # accepted subtitles, in arrival order
+        self.delivered_sequence = 0  # newest one handed to the GUI
+        self.transform_tasks = set()
+        self.stats = {
+            'json': {'frames': 0, 'cues': 0, 'bytes': 0, 'decode_seconds': 0.0},
+            'binary': {'frames': 0, 'cues': 0, 'bytes': 0, 'decode_seconds': 0.0},
+            'decode_errors': 0,
+            'deltas': 0,
+            'delta_errors': 0,
+            'local_messages': 0,
+            'rate_limited': 0,
+            'duplicates': 0,
+            'inactive_source': 0,
+            'tracks': 0,
+            'clock_updates': 0,
+            'transform_errors': 0,
+            'transform_stale': 0,
+        }
+    
+    @classmethod
+    def from_config(cls, config) -> 'SubtitleServer':
+        """Build a server from the 'server' section of a ConfigManager"""
+        get = lambda key: config.get('server', key)
+        return cls(
+            get('host'), get('port'),
+            source_policy=get('source_policy'),
+            switch_delay=get('source_switch_delay'),
+            dedup_window=get('dedup_window'),
+            rate_limit=get('rate_limit'),
+            rate_burst=get('rate_burst'),
+            subscriber_queue=get('subscriber_queue'),
+            slow_subscriber=get('slow_subscriber'),
+            jitter_window=get('jitter_window'),
+            max_cue_age=get('max_cue_age'),
+            unix_socket=get('unix_socket'),
+            line_input=get('line_input'),
+            pipeline=TransformPipeline(
+                get('transforms'),
+                workers=get('transform_workers'),
+                executor=get('transform_executor'),
+                cache_size=get('transform_cache'),
+                gloss_dictionary=get('gloss_dictionary') or None
+            )
+        )
     
     def set_subtitle_callback(self, callback: Callable):
         """Set callback function to handle received subtitles"""
         self.on_subtitle_callback = callback
     
+    def set_track_callback(self, callback: Callable):
+        """Set callback(client_id, CueIndex or None) for uploaded cue tracks"""
+        self.on_track_callback = callback
+    
+    def set_clock_callback(self, callback: Callable):
+        """Set callback(client_id, position, rate, playing) for media-clock heartbeats"""
+        self.on_clock_callback = callback
+    
+    def set_listening_callback(self, callback: Callable):
+        """Set callback() run on the server thread once connections are accepted"""
+        self.on_listening_callback = callback
+    
+    def set_metrics_callback(self, callback: Callable):
+        """Set callback() returning the GUI handoff stats to include in /metrics"""
+        self.metrics_callback = callback
+    
+    async def process_request(self, path: str, request_headers):
+        """Answer plain HTTP GET /metrics; everything else goes on to the WebSocket handshake"""
+        if path.split('?', 1)[0] != '/metrics':
+            return None
+        body = self.render_metrics().encode('utf-8')
+        headers = [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+                   ('Content-Length', str(len(body)))]
+        return HTTPStatus.OK, headers, body
+    
+    def render_metrics(self) -> str:
+        """Return the server counters and latency histograms in Prometheus text format"""
+        out = PrometheusText()
+        formats = ('json', 'binary')
+        out.gauge('clients', "Connected clients on all transports", len(self.clients))
+        out.counter('frames_received_total', "WebSocket frames received",
+                    [({'format': name}, self.stats[name]['frames']) for name in formats])
+        out.counter('bytes_received_total', "Payload bytes received",
+                    [({'format': name}, self.stats[name]['bytes']) for name in formats])
+        out.counter('cues_received_total', "Subtitle cues decoded",
+                    [({'format': name}, self.stats[name]['cues']) for name in formats])
+        out.counter('local_messages_total', "Messages received on the local socket or line input",
+                    self.stats['local_messages'])
+        out.counter('decode_errors_total', "Frames that failed to decode",
+                    self.stats['decode_errors'])
+        out.counter('deltas_total', "Growing captions received as deltas",
+                    self.stats['deltas'])
+        out.counter('delta_errors_total', "Deltas that did not match the previous caption",
+                    self.stats['delta_errors'])
+        out.counter('filtered_total', "Subtitles dropped before display",
+                    [({'reason': reason}, self.stats[reason]) for reason in
+                     ('rate_limited', 'duplicates', 'inactive_source', 'transform_stale')])
+        jitter = self.jitter.snapshot()
+        out.counter('jitter_dropped_total', "Cues dropped by the jitter buffer",
+                    [({'reason': reason}, jitter[reason]) for reason in ('late', 'expired')])
+        out.counter('jitter_reordered_total', "Cues put back in client-timestamp order",
+                    jitter['reordered'])
+        out.gauge('jitter_pending', "Cues held in the jitter buffer", jitter['pending'])
+        out.counter('transform_errors_total', "Subtitles whose transforms failed",
+                    self.stats['transform_errors'])
+        if self.metrics_callback:
+            handoff = self.metrics_callback()
+            out.gauge('handoff_pending', "Subtitles waiting for the GUI thread",
+                      handoff['pending'])
+            out.counter('handoff_superseded_total',
+                        "Subtitles replaced by a newer one before the GUI drew them",
+                        handoff['dropped'])
+            out.counter('handoff_coalesced_total', "GUI drains that absorbed several subtitles or changed nothing",
+                        handoff['coalesced'])
+        broadcast = self.broadcaster.stats()
+        out.gauge('subscribers', "Connected stream subscribers", broadcast['subscribers'])
+        out.gauge('subscriber_queue_depth', "Messages queued for all subscribers",
+                  broadcast['queued'])
+        out.counter('subscriber_dropped_total', "Messages dropped for slow subscribers",
+                    broadcast['dropped'])
+        out.histogram('latency_seconds', "Subtitle latency per pipeline stage", 'stage',
+                      self.latency.snapshot())
+        return out.text()
+    
     async def handler(self, websocket):
         """Handle WebSocket connections"""
-        self.clients.add(websocket)
-        print(f"Client connected. Total clients: {len(self.clients)}")
-        
+        session = self.open_session(websocket)
         try:
             async for message in websocket:
-                try:
-                    data = json.loads(message)
-                    if data.get('type') == 'subtitle' and self.on_subtitle_callback:
-                        subtitle_text = data.get('text', '')
-                        # Call the callback in a thread-safe way
-                        if subtitle_text:
-                            self.on_subtitle_callback(subtitle_text)
-                except json.JSONDecodeError:
-                    print(f"Invalid JSON received: {message}")
+                await self.handle_message(session, message)
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
-            self.clients.remove(websocket)
-            print(f"Client disconnected. Total clients: {len(self.clients)}")
+            self.close_session(session)
+    
+    def open_session(self, connection) -> ClientSession:
+        """Register a client; connection needs the send() and close() of a websocket"""
+        session = ClientSession(connection, self.rate_limit, self.rate_burst)
+        self.clients[session.client_id] = session
+        print(f"Client connected. Total clients: {len(self.clients)}")
+        if self.recorder:
+            self.recorder.record(session.client_id, KIND_CONNECT)
+        return session
+    
+    def close_session(self, session: ClientSession):
+        if self.recorder:
+            self.recorder.record(session.client_id, KIND_DISCONNECT)
+        del self.clients[session.client_id]
+        self.jitter.forget(session.client_id)
+        self.arbiter.on_disconnect(session)
+        self.broadcaster.unsubscribe(session)
+        if self.track_source and self.track_source[0] == session.client_id:
+            self.forward_track(session.client_id, None)
+        print(f"Client disconnected. Total clients: {len(self.clients)}")
+    
+    async def handle_message(self, session: ClientSession, message):
+        """Handle one inbound message from any transport"""
+        if self.recorder:
+            self.recorder.record(session.client_id,
+                                 KIND_BINARY if isinstance(message, bytes) else KIND_TEXT,
+                                 message)
+        if isinstance(message, bytes):
+            self.handle_binary(session, message)
+        else:
+            await self.handle_json(session, message)
+    
+    async def handle_json(self, session: ClientSession, message: str):
+        """Handle a protocol 1 JSON text frame"""
+        timing = CueTiming()
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError:
+            self.stats['decode_errors'] += 1
+            print(f"Invalid JSON received: {message}")
+            return
+        if not isinstance(data, dict):
+            self.stats['decode_errors'] += 1
+            print(f"JSON message is not an object: {message[:80]}")
+            return
+        timing.decoded = time.perf_counter()
+        stats = self.stats['json']
+        stats['decode_seconds'] += timing.decoded - timing.received
+        stats['frames'] += 1
+        stats['bytes'] += len(message.encode('utf-8'))
+        
+        msg_type = data.get('type')
+        if msg_type == 'hello':
+            session.protocol = negotiate(data.get('protocols', []))
+            self.register_url(session, data.get('url'))
+            await session.websocket.send(json.dumps({
+                'type': 'hello',
+                'protocol': session.protocol,
+                'client_id': session.client_id,
+                'deltas': True
+            }))
+        elif msg_type == 'subtitle':
+            stats['cues'] += 1
+            self.register_url(session, data.get('url'))
+            client_time = data.get('timestamp')
+            if isinstance(client_time, (int, float)):
+                timing.client_time = client_time
+            text = data.get('text', '')
+            if not isinstance(text, str):
+                self.stats['decode_errors'] += 1
+                return
+            session.caption = text
+            self.dispatch_subtitle(session, session.caption, timing)
+        elif msg_type == 'delta':
+            stats['cues'] += 1
+            self.register_url(session, data.get('url'))
+            client_time = data.get('timestamp')
+            if isinstance(client_time, (int, float)):
+                timing.client_time = client_time
+            try:
+                drop, keep, total = int(data['drop']), int(data['keep']), int(data['total'])
+                tail = str(data.get('text', ''))
+            except (KeyError, TypeError, ValueError):
+                self.stats['decode_errors'] += 1
+                return
+            self.handle_delta(session, drop, keep, total, tail, timing)
+        elif msg_type == 'subscribe':
+            # Second screens, loggers and streaming tools receive the live stream
+            self.broadcaster.subscribe(session)
+        elif msg_type == 'unsubscribe':
+            self.broadcaster.unsubscribe(session)
+        elif msg_type == 'track':
+            self.handle_track(session, data)
+        elif msg_type == 'clock':
+            self.handle_clock(session, data, timing)
+    
+    def handle_binary(self, session: ClientSession, message: bytes):
+        """Handle a protocol 2 binary frame"""
+        received = CueTiming()
+        try:
+            frame = decode_frame(message)
+        except ProtocolError as e:
+            self.stats['decode_errors'] += 1
+            print(f"Invalid binary frame received: {e}")
+            return
+        received.decoded = time.perf_counter()
+        stats = self.stats['binary']
+        stats['decode_seconds'] += received.decoded - received.received
+        stats['frames'] += 1
+        stats['bytes'] += len(message)
+        session.protocol = PROTOCOL_BINARY
+        
+        if frame.kind == KIND_REGISTER:
+            self.register_url(session, frame.url)
+        elif frame.kind == KIND_CUES:
+            stats['cues'] += len(frame.cues)
+            for timestamp, text in frame.cues:
+                session.caption = text
+                self.dispatch_subtitle(session, text, received.copy(timestamp))
+        elif frame.kind == KIND_DELTA:
+            stats['cues'] += len(frame.cues)
+            for delta in frame.cues:
+                self.handle_delta(session, delta.drop, delta.keep, delta.total,
+                                  delta.text, received.copy(delta.timestamp))
+    
+    def handle_delta(self, session: ClientSession, drop: int, keep: int, total: int,
+                     tail: str, timing: CueTiming):
+        """Rebuild a growing caption from the client's previous text and dispatch it"""
+        text = apply_delta(session.caption, drop, keep, tail, total)
+        if text is None:
+            # Out of sync; the client's next full subtitle starts over
+            self.stats['delta_errors'] += 1
+            session.caption = ""
+            return
+        self.stats['deltas'] += 1
+        session.caption = text
+        self.dispatch_subtitle(session, text, timing)
+    
+    def handle_track(self, session: ClientSession, data: dict):
+        """Store a cue track uploaded by the page.
+
+        A full upload replaces the track (empty clears it); with "append"
+        the cues are added to the current one.
+        """
+        cues = []
+        for item in data.get('cues') or []:
+            try:
+                start = float(item['start'])
+                end = float(item['end'])
+                text = clean_markup(str(item['text'])).strip()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if text and end > start:
+                cues.append(Cue(start, end, text))
+        if data.get('append') is True and session.track is not None:
+            cues = session.track.cues + cues
+        session.track = CueIndex(cues) if cues else None
+        session.track_version += 1
+        self.stats['tracks'] += 1
+        self.register_url(session, data.get('url'))
+        if self.track_source and self.track_source[0] == session.client_id:
+            # Replace or clear the track that is currently playing
+            self.forward_track(session.client_id, session.track, session.track_version)
+    
+    def handle_clock(self, session: ClientSession, data: dict, timing: CueTiming):
+        """Forward a media-time heartbeat for the active track"""
+        if session.track is None:
+            return
+        try:
+            media_time = float(data['media_time'])
+            rate = float(data.get('rate', 1.0))
+        except (KeyError, TypeError, ValueError):
+            return
+        playing = not data.get('paused', False)
+        now = time.monotonic()
+        is_source = self.track_source and self.track_source[0] == session.client_id
+        # Playing heartbeats compete for the overlay like subtitles do
+        if is_source:
+            if playing:
+                self.arbiter.accept(session, now)
+        elif not (playing and self.arbiter.accept(session, now)):
+            return
+        
+        if self.track_source != (session.client_id, session.track_version):
+            self.forward_track(session.client_id, session.track, session.track_version)
+        
+        # Advance the position by the time the heartbeat spent in transit
+        client_time = data.get('timestamp')
+        if playing and isinstance(client_time, (int, float)):
+            transit = max(0.0, timing.received_wall - client_time / 1000)
+            media_time += min(transit, 1.0) * rate
+        
+        self.stats['clock_updates'] += 1
+        if self.on_clock_callback:
+            self.on_clock_callback(session.client_id, media_time, rate, playing)
+    
+    def forward_track(self, client_id: int, track, version: int = 0):
+        self.track_source = (client_id, version) if track is not None else None
+        if self.on_track_callback:
+            self.on_track_callback(client_id, track)
+    
+    def register_url(self, session: ClientSession, url: Optional[str]):
+        """Record the page URL a client is playing"""
+        if url and url != session.url:
+            session.url = url
+            self.arbiter.on_register(session)
+    
+    def dispatch_subtitle(self, session: ClientSession, subtitle_text: str,
+                          timing: Optional[CueTiming] = None):
+        """Filter a decoded subtitle and pass it on to the application"""
+        if not subtitle_text:
+            return
+        now = time.monotonic()
+        session.cues_received += 1
+        session.last_cue_at = now
+        
+        # A runaway tab must not flood the GUI thread
+        if not session.bucket.consume(now):
+            session.cues_rate_limited += 1
+            self.stats['rate_limited'] += 1
+            return
+        if timing is None:
+            timing = CueTiming()
+        if timing.client_time is None:
+            self.accept_subtitle(session, subtitle_text, timing)
+            return
+        
+        local_ms = self.map_client_time(session, timing)
+        if not self.jitter.push(local_ms, time.time() * 1000,
+                                (session, subtitle_text, timing), session.client_id):
+            return
+        if len(self.jitter) == 1 and self.sending_clients(now) == 1:
+            # Nothing to reorder against, so don't hold it
+            self.accept_released(self.jitter.flush())
+        else:
+            self.release_subtitles()
+    
+    def map_client_time(self, session: ClientSession, timing: CueTiming) -> float:
+        """Return the local wall-clock ms a cue's client timestamp corresponds to"""
+        received_ms = timing.received_wall * 1000
+        clock = session.clock
+        if clock.current is None and clock.previous is None:
+            # A reconnecting tab's first cue may be backlog; judge it by an earlier estimate
+            seed = self.clock_seeds.get(session.url, self.last_clock_offset)
+            if seed is not None:
+                clock.seed(seed, received_ms)
+        offset = clock.update(timing.client_time, received_ms)
+        self.last_clock_offset = offset
+        if session.url:
+            self.clock_seeds.pop(session.url, None)
+            self.clock_seeds[session.url] = offset
+            if len(self.clock_seeds) > MAX_CLOCK_SEEDS:
+                del self.clock_seeds[next(iter(self.clock_seeds))]
+        return timing.client_time + offset
+    
+    def sending_clients(self, now: float) -> int:
+        return sum(1 for session in self.clients.values()
+                   if now - session.last_cue_at < ACTIVE_SENDER_WINDOW)
+    
+    def release_subtitles(self):
+        """Pass on the cues whose jitter hold is over and re-arm the timer for the rest"""
+        if self.jitter_timer:
+            self.jitter_timer.cancel()
+            self.jitter_timer = None
+        self.accept_released(self.jitter.pop_ready(time.time() * 1000))
+        due = self.jitter.next_release()
+        if due is not None:
+            delay = max(0.0, due / 1000 - time.time())
+            self.jitter_timer = self.loop.call_later(delay, self.release_subtitles)
+    
+    def accept_released(self, entries):
+        for session, subtitle_text, timing in entries:
+            if session.client_id in self.clients:
+                self.accept_subtitle(session, subtitle_text, timing)
+    
+    def accept_subtitle(self, session: ClientSession, subtitle_text: str, timing: CueTiming):
+        """Apply the source and duplicate filters, then transform and deliver"""
+        now = time.monotonic()
+        if not self.arbiter.accept(session, now):
+            self.stats['inactive_source'] += 1
+            return
+        if self.duplicates.is_duplicate(subtitle_text, session.client_id, now):
+            self.stats['duplicates'] += 1
+            return
+        
+        session.cues_accepted += 1
+        self.sequence += 1
+        if self.pipeline:
+            transformed = self.pipeline.lookup(subtitle_text)
+            if transformed is None:
+                task = self.loop.create_task(self.transform_subtitle(
+                    session.client_id, subtitle_text, timing, self.sequence))
+                self.transform_tasks.add(task)
+                task.add_done_callback(self.transform_tasks.discard)
+                return
+            subtitle_text = transformed
+        self.deliver_subtitle(session.client_id, subtitle_text, timing, self.sequence)
+    
+    async def transform_subtitle(self, client_id: int, subtitle_text: str,
+                                 timing: CueTiming, sequence: int):
+        """Run the transform pipeline off the loop, then deliver"""
+        try:
+            transformed, stage_times = await self.pipeline.process(subtitle_text)
+        except Exception as e:
+            # A broken transform must not lose the subtitle
+            self.stats['transform_errors'] += 1
+            print(f"Subtitle transform failed: {e}")
+            transformed, stage_times = subtitle_text, []
+        for name, seconds in stage_times:
+            self.latency.record('transform.' + name, seconds * 1000)
+        self.deliver_subtitle(client_id, transformed, timing, sequence)
+    
+    def deliver_subtitle(self, client_id: int, subtitle_text: str,
+                         timing: CueTiming, sequence: int):
+        """Hand a finished subtitle to subscribers and the GUI"""
+        # Workers can finish out of order; never replace a newer line with an older one
+        if sequence < self.delivered_sequence:
+            self.stats['transform_stale'] += 1
+            return
+        self.delivered_sequence = sequence
+        if not subtitle_text:
+            return
+        timing.dispatched = time.perf_counter()
+        self.latency.record_received(timing)
+        self.broadcaster.publish(subtitle_text, client_id)
+        if self.on_subtitle_callback:
+            self.on_subtitle_callback(subtitle_text, timing, client_id)
+    
+    def publish(self, text: str, source_id: int = 0):
+        """Send text to subscribers; call on the server loop"""
+        self.broadcaster.publish(text, source_id)
+    
+    def start_capture(self, path):
+        """Record every inbound frame to path; call before start() or on the server loop"""
+        self.stop_capture()
+        try:
+            self.recorder = CaptureWriter(path)
+        except OSError as e:
+            print(f"Error starting capture {path}: {e}")
+            return
+        print(f"Capturing inbound frames to {path}")
+    
+    def stop_capture(self):
+        if self.recorder:
+            recorder, self.recorder = self.recorder, None
+            recorder.close()
+            print(f"Capture saved: {recorder.records} records in {recorder.path}")
+    
+    def pin_source(self, client_id: Optional[int] = None):
+        """Pin the given client (or the active one) as the only source; call on the server loop"""
+        if client_id is None:
+            client_id = self.arbiter.active_id
+        self.arbiter.pin(self.clients.get(client_id))
+    
+    def unpin_source(self):
+        """Go back to following the most recently playing client; call on the server loop"""
+        self.arbiter.pin(None)
+    
+    def call_soon_threadsafe(self, callback: Callable, *args):
+        """Schedule a call on the server loop from another thread"""
+        if self.loop:
+            self.loop.call_soon_threadsafe(callback, *args)
+    
+    def get_stats(self) -> dict:
+        """Return filter counters plus bytes per cue and decode cost for each wire format"""
+        summary = {key: self.stats[key] for key in
+                   ('decode_errors', 'local_messages', 'deltas', 'delta_errors', 'rate_limited', 'duplicates',
+                    'inactive_source', 'tracks', 'clock_updates', 'transform_errors',
+                    'transform_stale')}
+        summary['jitter'] = self.jitter.snapshot()
+        summary['broadcast'] = self.broadcaster.stats()
+        summary['transforms'] = self.pipeline.stats()
+        for name in ('json', 'binary'):
+            stats = self.stats[name]
+            cues = stats['cues'] or 1
+            summary[name] = {
+                **stats,
+                'bytes_per_cue': stats['bytes'] / cues,
+                'decode_us_per_cue': stats['decode_seconds'] / cues * 1e6,
+            }
+        return summary
     
     async def start(self):
         """Start the WebSocket server"""
         self.running = True
+        self.loop = asyncio.get_running_loop()
+        self.stop_future = self.loop.create_future()
         try:
-            self.server = await serve(self.handler, self.host, self.port)
+            self.server = await serve(self.handler, self.host, self.port,
+                                      process_request=self.process_request)
             print(f"WebSocket server started on ws://{self.host}:{self.port}")
-            await asyncio.Future()  # Run forever
+            await self.start_local()
+            if self.on_listening_callback:
+                self.on_listening_callback()
+            await self.stop_future  # Run until stop() is called
         except OSError as e:
-            if e.errno == 10048:  # Windows: Address already in use
+            if is_address_in_use(e):
                 print(f"\n⚠ ERROR: Port {self.port} is already in use!")
                 print("Another instance of this application may be running.")
                 print("Please close it or use a different port in the config.\n")
@@ -55,6 +605,22 @@ class SubtitleServer:
             else:
                 raise
     
+    async def start_local(self):
+        """Start the Unix socket and line input transports that are configured"""
+        transports = []
+        if self.unix_socket:
+            transports.append(UnixSocketListener(self, self.unix_socket))
+        if self.line_input:
+            transports.append(LineReader(self, self.line_input))
+        for transport in transports:
+            try:
+                await transport.start()
+            except OSError as e:
+                # The WebSocket server is still useful without it
+                print(f"Error starting local input: {e}")
+                continue
+            self.local_transports.append(transport)
+    
     def get_client_count(self) -> int:
         """Return number of connected clients"""
         return len(self.clients)
@@ -62,6 +628,21 @@ class SubtitleServer:
     async def stop(self):
         """Stop the WebSocket server"""
         self.running = False
+        if self.jitter_timer:
+            self.jitter_timer.cancel()
+            self.jitter_timer = None
+        self.pipeline.shutdown()
+        self.stop_capture()
+        for transport in self.local_transports:
+            await transport.stop()
+        self.local_transports = []
         if self.server:
             self.server.close()
-            await self.server.wait_closed()
\ No newline at end of file
+            await self.server.wait_closed()
+        if self.stop_future and not self.stop_future.done():
+            self.stop_future.set_result(None)
+    
+    def request_stop(self):
+        """Stop the server from another thread"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(lambda: self.loop.create_task(self.stop()))
\ No newline at end of file
@@ -0,0 +1,389 @@
+"""Run SubtitleServer in a child process, away from the GUI's interpreter.
+
+With `server.separate_process` the WebSocket server, decoding, filters and
+transforms run in a spawned child, so they never hold the GIL the GUI needs
+for painting. Accepted subtitles travel back through SubtitleRing, a
+single-producer single-consumer ring in shared memory; the child only
+sends a wakeup over the event pipe when the ring goes from empty to
+non-empty, so a burst costs one wakeup. Everything rare (tracks, media
+clock, errors, and stats pushed once a second) goes over the pipes as
+small pickled tuples. The parent answers each stats push with its GUI
+handoff counters and paint-side latency stages, and gets the child's
+transform stages in return, so /metrics and the tray reports are complete
+in either process (at most STATS_INTERVAL behind).
+
+ServerProcess is the parent side. It has the parts of SubtitleServer the
+app uses (callbacks, latency, stats, publish and source pinning) and its
+run() relays events until the child exits.
+"""
+import math
+import multiprocessing
+import struct
+import threading
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import CueTiming, LatencyTracker
+
+RING_HEADER = struct.Struct('<QQQ')  # capacity, bytes written, bytes read
+RECORD_LENGTH = struct.Struct('<I')
+SKIP = 0xFFFFFFFF                    # rest of the buffer is padding
+STATS_INTERVAL = 1.0  # seconds between stats pushed by the child
+SUBTITLE = struct.Struct('<Iddddd')  # source, client time (NaN: none), wall, received,
+                                     # decoded, dispatched
+
+
+class SubtitleRing:
+    """Length-prefixed records in a shared-memory ring; one writer, one reader.
+
+    The write and read counters only grow, so `written - read` is the fill
+    level. A record never wraps: when it does not fit before the end of
+    the buffer the rest is skipped, so records up to half the capacity
+    always fit in an empty ring. A writer that finds the ring full drops
+    the record; the reader is the GUI thread, which only falls that far
+    behind when it is stuck.
+    """
+
+    def __init__(self, name: Optional[str] = None, size: int = 1 << 20):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=RING_HEADER.size + size)
+            RING_HEADER.pack_into(self.memory.buf, 0, size, 0, 0)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.capacity = RING_HEADER.unpack_from(self.memory.buf, 0)[0]
+        self.data = self.memory.buf[RING_HEADER.size:RING_HEADER.size + self.capacity]
+        self.dropped = 0
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def counters(self) -> Tuple[int, int]:
+        _, written, read = RING_HEADER.unpack_from(self.memory.buf, 0)
+        return written, read
+
+    def put(self, payload: bytes) -> Optional[bool]:
+        """Append a record; True if the reader needs a wakeup, None if it was dropped"""
+        written, read = self.counters()
+        start = written
+        offset = written % self.capacity
+        needed = RECORD_LENGTH.size + len(payload)
+        padding = self.capacity - offset if self.capacity - offset < needed else 0
+        if written + padding + needed - read > self.capacity:
+            self.dropped += 1
+            return None
+        if padding:
+            if padding >= RECORD_LENGTH.size:
+                RECORD_LENGTH.pack_into(self.data, offset, SKIP)
+            written += padding
+            offset = 0
+        RECORD_LENGTH.pack_into(self.data, offset, len(payload))
+        self.data[offset + RECORD_LENGTH.size:offset + needed] = payload
+        struct.pack_into('<Q', self.memory.buf, 8, written + needed)
+        # Checked after publishing, so a reader that is just finishing sees
+        # the record or leaves the read counter where this wakes it
+        return self.counters()[1] == start
+
+    def take_all(self) -> List[bytes]:
+        """Remove and return every record, oldest first"""
+        records = []
+        read = self.counters()[1]
+        while True:
+            written = self.counters()[0]
+            if read == written:
+                return records
+            while read < written:
+                offset = read % self.capacity
+                if self.capacity - offset < RECORD_LENGTH.size:
+                    read += self.capacity - offset
+                    continue
+                (length,) = RECORD_LENGTH.unpack_from(self.data, offset)
+                if length == SKIP:
+                    read += self.capacity - offset
+                    continue
+                start = offset + RECORD_LENGTH.size
+                records.append(bytes(self.data[start:start + length]))
+                read += RECORD_LENGTH.size + length
+            struct.pack_into('<Q', self.memory.buf, 16, read)
+
+    def close(self, unlink: bool = False):
+        self.data.release()
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def encode_subtitle(text: str, timing: CueTiming, source_id: int) -> bytes:
+    client_time = timing.client_time if timing.client_time is not None else math.nan
+    return SUBTITLE.pack(source_id, client_time, timing.received_wall, timing.received,
+                         timing.decoded, timing.dispatched) + text.encode('utf-8')
+
+
+def decode_subtitle(payload: bytes) -> Tuple[str, CueTiming, int]:
+    # perf_counter is a system-wide monotonic clock, so the child's stamps
+    # line up with the GUI's drain and paint times
+    source_id, client_time, wall, received, decoded, dispatched = SUBTITLE.unpack_from(payload)
+    timing = CueTiming(None if math.isnan(client_time) else client_time)
+    timing.received_wall = wall
+    timing.received = received
+    timing.decoded = decoded
+    timing.dispatched = dispatched
+    return payload[SUBTITLE.size:].decode('utf-8'), timing, source_id
+
+
+class SettingsView:
+    """Read-only stand-in for ConfigManager inside the child"""
+
+    def __init__(self, settings: Dict, config_dir):
+        self.settings = settings
+        self.config_dir = config_dir
+
+    def get(self, *keys):
+        value = self.settings
+        for key in keys:
+            value = value.get(key)
+            if value is None:
+                return None
+        return value
+
+
+def serve_child(settings: Dict, config_dir, ring_name: str, events, commands,
+                capture: Optional[str] = None):
+    """Entry point of the child process"""
+    import asyncio
+    from server import SubtitleServer
+
+    config = SettingsView(settings, config_dir)
+    ring = SubtitleRing(ring_name)
+    server = SubtitleServer.from_config(config)
+
+    def on_subtitle(text: str, timing: CueTiming, source_id: int):
+        if ring.put(encode_subtitle(text, timing, source_id)):
+            events.send(('wake',))
+
+    watchdog = None
+
+    def set_watchdog(enabled: bool):
+        nonlocal watchdog
+        if enabled and watchdog is None:
+            from diagnostics import Watchdog
+            watchdog = Watchdog(threshold=config.get('diagnostics', 'stall_threshold') / 1000,
+                                log_dir=config.config_dir / 'diagnostics')
+            watchdog.watch_asyncio('server', server.loop)
+            watchdog.start()
+        elif not enabled and watchdog is not None:
+            watchdog.stop()
+            watchdog = None
+
+    def on_listening():
+        set_watchdog(config.get('diagnostics', 'loop_watchdog'))
+        # Commands sent before now wait in the pipe until the loop can run them
+        threading.Thread(target=read_commands, name='server-commands', daemon=True).start()
+        events.send(('listening',))
+        push_stats()
+
+    def push_stats():
+        # Pushed rather than asked for, so reading them never blocks the GUI
+        stats = server.get_stats()
+        stats['clients'] = server.get_client_count()
+        stats['ring_dropped'] = ring.dropped
+        stats['transform_latency'] = {name: histogram for name, histogram
+                                      in server.latency.snapshot().items()
+                                      if name.startswith('transform.')}
+        events.send(('stats', stats))
+        server.loop.call_later(STATS_INTERVAL, push_stats)
+
+    def on_command(command: Tuple):
+        name = command[0]
+        if name == 'publish':
+            server.publish(*command[1:])
+        elif name == 'pin':
+            server.pin_source(*command[1:])
+        elif name == 'unpin':
+            server.unpin_source()
+        elif name == 'metrics':
+            handoff, histograms = command[1:]
+            if handoff is not None:
+                server.set_metrics_callback(lambda: handoff)
+            server.latency.replace(histograms)
+        elif name == 'watchdog':
+            set_watchdog(command[1])
+        elif name == 'stop':
+            server.loop.create_task(server.stop())
+
+    def read_commands():
+        while True:
+            try:
+                command = commands.recv()
+            except (EOFError, OSError):
+                command = ('stop',)  # the GUI is gone
+            server.call_soon_threadsafe(on_command, command)
+            if command[0] == 'stop':
+                return
+
+    server.set_subtitle_callback(on_subtitle)
+    server.set_track_callback(lambda client_id, track: events.send(('track', client_id, track)))
+    server.set_clock_callback(lambda *clock: events.send(('clock',) + clock))
+    server.set_listening_callback(on_listening)
+    if capture:
+        server.start_capture(capture)
+    try:
+        asyncio.run(server.start())
+    except OSError as e:
+        events.send(('error', e.errno, str(e)))
+    except Exception as e:
+        events.send(('error', None, str(e)))
+    else:
+        events.send(('stopped',))
+    finally:
+        ring.close()
+
+
+class ServerProcess:
+    """Parent side of a server running in a child process"""
+
+    loop = None  # no server loop in this process
+
+    def __init__(self, config, capture: Optional[str] = None, ring_size: int = 1 << 20):
+        self.config = config
+        self.capture = capture
+        self.ring_size = ring_size
+        self.ring: Optional[SubtitleRing] = None
+        self.process = None
+        self.events = None
+        self.commands = None
+        self.stopping = False
+        self.latency = LatencyTracker()  # every stage up to the paint, measured here
+        self.last_stats: Dict = {}  # as of the child's last push
+        self.on_subtitle_callback: Optional[Callable] = None
+        self.on_track_callback: Optional[Callable] = None
+        self.on_clock_callback: Optional[Callable] = None
+        self.on_listening_callback: Optional[Callable] = None
+        self.metrics_callback: Optional[Callable] = None
+        self._send_lock = threading.Lock()  # the GUI and the relay thread both send
+
+    def set_subtitle_callback(self, callback: Callable):
+        self.on_subtitle_callback = callback
+
+    def set_track_callback(self, callback: Callable):
+        self.on_track_callback = callback
+
+    def set_clock_callback(self, callback: Callable):
+        self.on_clock_callback = callback
+
+    def set_listening_callback(self, callback: Callable):
+        self.on_listening_callback = callback
+
+    def set_metrics_callback(self, callback: Callable):
+        """Set callback() returning the GUI handoff stats forwarded for /metrics"""
+        self.metrics_callback = callback
+
+    def start(self):
+        # Never fork a process that is running Qt threads
+        context = multiprocessing.get_context('spawn')
+        self.ring = SubtitleRing(size=self.ring_size)
+        self.events, child_events = context.Pipe(duplex=False)
+        child_commands, self.commands = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=serve_child, name='subtitle-server', daemon=True,
+            args=(self.config.settings, self.config.config_dir, self.ring.name,
+                  child_events, child_commands, self.capture))
+        self.process.start()
+        # Our copies must go, or a crashed child never shows up as EOF
+        child_events.close()
+        child_commands.close()
+
+    def run(self):
+        """Start the child and relay its events until it stops; call on a worker thread"""
+        self.start()
+        try:
+            while True:
+                try:
+                    event = self.events.recv()
+                except EOFError:
+                    if self.stopping:
+                        return
+                    self.process.join(1.0)
+                    raise OSError(f"Server process exited with code {self.process.exitcode}")
+                kind = event[0]
+                if kind == 'wake':
+                    self.drain()
+                elif kind == 'track':
+                    if self.on_track_callback:
+                        self.on_track_callback(event[1], event[2])
+                elif kind == 'clock':
+                    if self.on_clock_callback:
+                        self.on_clock_callback(*event[1:])
+                elif kind == 'stats':
+                    self.last_stats = event[1]
+                    self.latency.replace(self.last_stats.pop('transform_latency', {}))
+                    self.forward_metrics()
+                elif kind == 'listening':
+                    if self.on_listening_callback:
+                        self.on_listening_callback()
+                elif kind == 'error':
+                    raise OSError(event[1], event[2])
+                elif kind == 'stopped':
+                    return
+        finally:
+            self.shutdown()
+
+    def drain(self):
+        for payload in self.ring.take_all():
+            text, timing, source_id = decode_subtitle(payload)
+            self.latency.record_received(timing)
+            if self.on_subtitle_callback:
+                self.on_subtitle_callback(text, timing, source_id)
+
+    def shutdown(self, timeout: float = 2.0):
+        self.process.join(timeout)
+        if self.process.is_alive():
+            print("Server process did not stop, terminating it")
+            self.process.terminate()
+            self.process.join()
+        self.events.close()
+        self.commands.close()
+        self.ring.close(unlink=True)
+
+    def forward_metrics(self):
+        handoff = self.metrics_callback() if self.metrics_callback else None
+        histograms = {name: histogram for name, histogram in self.latency.snapshot().items()
+                      if name in LatencyTracker.GUI_STAGES}
+        self.send('metrics', handoff, histograms)
+
+    def send(self, *command):
+        if self.commands is None:
+            return
+        try:
+            with self._send_lock:
+                self.commands.send(command)
+        except (OSError, ValueError):
+            pass  # the child already exited
+
+    def call_soon_threadsafe(self, callback: Callable, *args):
+        """Commands are messages already, so just call it"""
+        callback(*args)
+
+    def publish(self, text: str, source_id: int = 0):
+        self.send('publish', text, source_id)
+
+    def pin_source(self, client_id: Optional[int] = None):
+        self.send('pin', client_id)
+
+    def unpin_source(self):
+        self.send('unpin')
+
+    def set_watchdog(self, enabled: bool):
+        """Start or stop the child's own loop watchdog"""
+        self.send('watchdog', enabled)
+
+    def get_stats(self) -> Dict:
+        """Return the child's counters, at most STATS_INTERVAL old; empty until it listens"""
+        return self.last_stats
+
+    def get_client_count(self) -> int:
+        return self.last_stats.get('clients', 0)
+
+    def request_stop(self):
+        self.stopping = True
+        self.send('stop')
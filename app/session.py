@@ -0,0 +1,163 @@
+import itertools
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from jitter import ClockOffset
+from protocol import PROTOCOL_JSON
+
+POLICY_LATEST = 'latest'
+POLICY_PINNED = 'pinned'
+
+_client_ids = itertools.count(1)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` tokens per second, up to `burst` banked"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def consume(self, now: Optional[float] = None, tokens: float = 1.0) -> bool:
+        """Take tokens if available; return False when the caller is over its rate"""
+        if self.rate <= 0:
+            return True
+        if now is None:
+            now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+
+class ClientSession:
+    """State kept for one connected client (WebSocket or local transport)"""
+
+    def __init__(self, websocket, rate_limit: float, rate_burst: float):
+        self.client_id = next(_client_ids)
+        self.websocket = websocket
+        self.protocol = PROTOCOL_JSON
+        self.url: Optional[str] = None
+        self.connected_at = time.monotonic()
+        self.last_cue_at = 0.0
+        self.bucket = TokenBucket(rate_limit, rate_burst)
+        self.cues_received = 0
+        self.cues_accepted = 0
+        self.cues_rate_limited = 0
+        self.track = None          # CueIndex uploaded by the page, if any
+        self.track_version = 0
+        self.caption = ""          # last text received, the base for deltas
+        self.clock = ClockOffset()  # maps the client's timestamps to local time
+
+    def describe(self) -> Dict:
+        """Return a summary suitable for display"""
+        return {
+            'id': self.client_id,
+            'url': self.url,
+            'protocol': self.protocol,
+            'received': self.cues_received,
+            'accepted': self.cues_accepted,
+            'rate_limited': self.cues_rate_limited,
+            'clock_offset_ms': self.clock.estimate(),
+        }
+
+
+class DuplicateFilter:
+    """Short-window hash index of recently shown subtitle text.
+
+    Text seen from one client is dropped when another client sends it again
+    within `window` seconds, which is what two tabs on the same video or a
+    reconnecting tab produce.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self.seen: Dict[str, tuple] = {}
+        self.order = deque()
+
+    def is_duplicate(self, text: str, client_id: int, now: float) -> bool:
+        self.expire(now)
+        entry = self.seen.get(text)
+        if entry is not None and entry[0] != client_id:
+            return True
+        self.seen[text] = (client_id, now)
+        self.order.append((now, text))
+        return False
+
+    def expire(self, now: float):
+        cutoff = now - self.window
+        order = self.order
+        seen = self.seen
+        while order and order[0][0] < cutoff:
+            stamp, text = order.popleft()
+            entry = seen.get(text)
+            # Only remove if not refreshed by a newer occurrence
+            if entry is not None and entry[1] == stamp:
+                del seen[text]
+
+
+class SourceArbiter:
+    """Decide which connected client drives the overlay.
+
+    `latest` follows the most recently playing client: another client only
+    takes over once the active one has been quiet for `switch_delay` seconds
+    or has disconnected, so two playing tabs don't interleave.
+    `pinned` only accepts the pinned client (matched again by URL when the
+    tab reconnects) and falls back to `latest` while it is gone. With no pin
+    yet, the first client to play gets pinned.
+    """
+
+    def __init__(self, policy: str = POLICY_LATEST, switch_delay: float = 2.0):
+        self.policy = policy
+        self.switch_delay = switch_delay
+        self.active_id: Optional[int] = None
+        self.active_last_cue = 0.0
+        self.pinned_id: Optional[int] = None
+        self.pinned_url: Optional[str] = None
+
+    def accept(self, session: ClientSession, now: float) -> bool:
+        """Return True if a cue from this session should reach the overlay"""
+        if self.policy == POLICY_PINNED and self.pinned_id is None and not self.pinned_url:
+            self.pin(session)
+        if self.policy == POLICY_PINNED and self.pinned_id is not None:
+            if session.client_id != self.pinned_id:
+                return False
+        elif (self.active_id is not None
+              and self.active_id != session.client_id
+              and now - self.active_last_cue < self.switch_delay):
+            return False
+
+        self.active_id = session.client_id
+        self.active_last_cue = now
+        return True
+
+    def pin(self, session: Optional[ClientSession]):
+        """Pin a session, or unpin with None"""
+        if session is None:
+            self.policy = POLICY_LATEST
+            self.pinned_id = None
+            self.pinned_url = None
+        else:
+            self.policy = POLICY_PINNED
+            self.pinned_id = session.client_id
+            self.pinned_url = session.url
+
+    def on_register(self, session: ClientSession):
+        """Move a URL pin to a reconnected tab"""
+        if session.client_id == self.pinned_id:
+            self.pinned_url = session.url
+        elif (self.policy == POLICY_PINNED and self.pinned_id is None
+                and self.pinned_url and session.url == self.pinned_url):
+            self.pinned_id = session.client_id
+
+    def on_disconnect(self, session: ClientSession):
+        if session.client_id == self.active_id:
+            self.active_id = None
+        if session.client_id == self.pinned_id:
+            # Keep the URL so the pin follows the tab when it reconnects
+            self.pinned_id = None
@@ -0,0 +1,89 @@
+"""Startup phase timing for `main.py --profile-startup`.
+
+Import this module first so START is as close to interpreter start as
+the app can get. `PROFILER` exists from then on, so main.py can time its
+own module-level imports before the command line is parsed; phases are
+always recorded and only reported once `enable()` was called. Phases are
+timed with `phase()`; one-off events such as
+the server accepting connections or the first window paint are recorded
+with `mark()`, from any thread. Once both of those have happened the
+report is printed (and written as JSON when a path was given).
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+START = time.perf_counter()
+
+MILESTONES = ('accepting', 'first_paint')
+
+
+class StartupProfiler:
+    def __init__(self, enabled: bool = False, output: Optional[str] = None):
+        self.enabled = enabled
+        self.output = output
+        self.phases: List[Tuple[str, float, float]] = []  # name, start, duration
+        self.milestones: Dict[str, float] = {}
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def enable(self, output: Optional[str] = None):
+        self.enabled = True
+        self.output = output
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            with self._lock:
+                self.phases.append((name, started - START, ended - started))
+
+    def mark(self, name: str):
+        """Record the first time an event happens; thread-safe"""
+        now = time.perf_counter() - START
+        with self._lock:
+            if name in self.milestones:
+                return
+            self.milestones[name] = now
+            done = (self.enabled and not self.reported
+                    and all(m in self.milestones for m in MILESTONES))
+            if done:
+                self.reported = True
+        if done:
+            self.report()
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                'phases_ms': [
+                    {'name': name, 'start': start * 1000, 'duration': duration * 1000}
+                    for name, start, duration in self.phases
+                ],
+                'milestones_ms': {name: t * 1000 for name, t in self.milestones.items()},
+            }
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        lines = ["Startup profile (ms since main.py started):"]
+        for phase in summary['phases_ms']:
+            lines.append(f"  {phase['start']:8.1f}  +{phase['duration']:7.1f}  {phase['name']}")
+        for name, t in sorted(summary['milestones_ms'].items(), key=lambda item: item[1]):
+            lines.append(f"  {t:8.1f}  {'':8}  [{name}]")
+        return "\n".join(lines)
+
+    def report(self):
+        print(self.format_summary())
+        if self.output:
+            try:
+                with open(self.output, 'w') as f:
+                    json.dump(self.summary(), f, indent=2)
+            except OSError as e:
+                print(f"Error writing startup profile: {e}")
+
+
+PROFILER = StartupProfiler()
@@ -0,0 +1,208 @@
+"""Streaming SRT / WebVTT / ASS parsers and a sorted cue index.
+
+Parsers are generators over lines, so a multi-megabyte file is never held
+in memory as a whole and can be parsed off the GUI thread while cues are
+collected. Times are in seconds.
+"""
+import bisect
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+
+class Cue(NamedTuple):
+    start: float
+    end: float
+    text: str
+
+
+class SubtitleFormatError(ValueError):
+    """Raised when a file is not a recognised subtitle format"""
+
+
+TIMING_RE = re.compile(
+    r'^\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})'
+)
+HTML_TAG_RE = re.compile(r'</?[a-zA-Z][^>]*>|<\d+:\d{2}[:.\d]*>')
+ASS_OVERRIDE_RE = re.compile(r'\{[^}]*\}')
+
+
+def parse_timestamp(value: str) -> float:
+    """Parse [hh:]mm:ss(.|,)fff into seconds"""
+    value = value.replace(',', '.')
+    parts = value.split(':')
+    seconds = float(parts[-1])
+    minutes = int(parts[-2]) if len(parts) > 1 else 0
+    hours = int(parts[-3]) if len(parts) > 2 else 0
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def clean_markup(text: str) -> str:
+    text = HTML_TAG_RE.sub('', text)
+    return (text.replace('&amp;', '&').replace('&lt;', '<')
+                .replace('&gt;', '>').replace('&nbsp;', ' '))
+
+
+def _parse_timed_blocks(lines: Iterable[str]) -> Iterator[Cue]:
+    """Shared SRT/VTT parser: a timing line followed by text up to a blank line"""
+    start = end = None
+    text_lines: List[str] = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        match = TIMING_RE.match(line)
+        if match:
+            if start is not None and text_lines:
+                yield Cue(start, end, clean_markup('\n'.join(text_lines)).strip())
+            start = parse_timestamp(match.group(1))
+            end = parse_timestamp(match.group(2))
+            text_lines = []
+        elif not line.strip():
+            if start is not None and text_lines:
+                yield Cue(start, end, clean_markup('\n'.join(text_lines)).strip())
+            start = None
+            text_lines = []
+        elif start is not None:
+            text_lines.append(line.strip())
+    if start is not None and text_lines:
+        yield Cue(start, end, clean_markup('\n'.join(text_lines)).strip())
+
+
+def parse_srt(lines: Iterable[str]) -> Iterator[Cue]:
+    """Parse SubRip; numeric cue counters are skipped as they precede timings"""
+    return _parse_timed_blocks(lines)
+
+
+def parse_vtt(lines: Iterable[str]) -> Iterator[Cue]:
+    """Parse WebVTT, skipping the header and NOTE/STYLE/REGION blocks"""
+    def body():
+        skipping = False
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                skipping = False
+            elif stripped.startswith(('WEBVTT', 'NOTE', 'STYLE', 'REGION')):
+                skipping = True
+            if not skipping:
+                yield line
+    return _parse_timed_blocks(body())
+
+
+def parse_ass(lines: Iterable[str]) -> Iterator[Cue]:
+    """Parse the [Events] section of SubStation Alpha / Advanced SSA"""
+    in_events = False
+    fields: Optional[List[str]] = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            in_events = line.lower() == '[events]'
+            continue
+        if not in_events:
+            continue
+        if line.startswith('Format:'):
+            fields = [f.strip().lower() for f in line[len('Format:'):].split(',')]
+        elif line.startswith('Dialogue:') and fields:
+            values = line[len('Dialogue:'):].split(',', len(fields) - 1)
+            if len(values) != len(fields):
+                continue
+            record = dict(zip(fields, values))
+            text = ASS_OVERRIDE_RE.sub('', record.get('text', ''))
+            text = text.replace('\\N', '\n').replace('\\n', '\n').replace('\\h', ' ').strip()
+            if text:
+                yield Cue(parse_timestamp(record['start'].strip()),
+                          parse_timestamp(record['end'].strip()), text)
+
+
+PARSERS = {
+    '.srt': parse_srt,
+    '.vtt': parse_vtt,
+    '.ass': parse_ass,
+    '.ssa': parse_ass,
+}
+
+
+def iter_cues(path) -> Iterator[Cue]:
+    """Stream cues from a subtitle file, choosing the parser by extension"""
+    path = Path(path)
+    parser = PARSERS.get(path.suffix.lower())
+    if parser is None:
+        raise SubtitleFormatError(f"Unsupported subtitle format: {path.suffix}")
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        yield from parser(f)
+
+
+class IntervalNode:
+    """Node of a centered interval tree over cues"""
+
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, cues: List[Cue]):
+        # The median start is covered by its own cue, so both halves shrink
+        self.center = cues[len(cues) // 2].start
+        left, right, here = [], [], []
+        for cue in cues:
+            if cue.end <= self.center:
+                left.append(cue)
+            elif cue.start > self.center:
+                right.append(cue)
+            else:
+                here.append(cue)
+        self.by_start = here                                      # cues arrive sorted
+        self.by_end = sorted(here, key=lambda cue: cue.end, reverse=True)
+        self.left = IntervalNode(left) if left else None
+        self.right = IntervalNode(right) if right else None
+
+
+class CueIndex:
+    """Cues sorted by start time, with a centered interval tree for lookups.
+
+    Every tree node keeps the cues that span its center, so finding the
+    cues active at t visits one node per level and only touches cues that
+    are either active or the first one rejected: O(log n + k) even with
+    cues lasting the whole file.
+    """
+
+    def __init__(self, cues: Iterable[Cue] = ()):
+        self.cues: List[Cue] = sorted(cues)
+        self.starts = [cue.start for cue in self.cues]
+        self.end = max((cue.end for cue in self.cues), default=0.0)
+        # Empty cues are never active
+        spans = [cue for cue in self.cues if cue.end > cue.start]
+        self.root = IntervalNode(spans) if spans else None
+
+    def __len__(self) -> int:
+        return len(self.cues)
+
+    @property
+    def duration(self) -> float:
+        return self.end
+
+    def active(self, t: float) -> List[Cue]:
+        """Return cues with start <= t < end, in start order"""
+        found = []
+        node = self.root
+        while node is not None:
+            if t < node.center:
+                for cue in node.by_start:
+                    if cue.start > t:
+                        break
+                    found.append(cue)
+                node = node.left
+            else:
+                for cue in node.by_end:
+                    if cue.end <= t:
+                        break
+                    found.append(cue)
+                node = node.right
+        found.sort()
+        return found
+
+    def text_at(self, t: float) -> str:
+        return '\n'.join(cue.text for cue in self.active(t))
+
+    def next_change(self, t: float) -> Optional[float]:
+        """Return the next time after t at which the active set changes"""
+        candidates = [cue.end for cue in self.active(t)]
+        i = bisect.bisect_right(self.starts, t)
+        if i < len(self.starts):
+            candidates.append(self.starts[i])
+        return min(candidates) if candidates else None
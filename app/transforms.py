@@ -0,0 +1,252 @@
+"""Ordered chain of text transforms applied to received subtitles.
+
+Stages are named in the config (`server.transforms`) and run in order.
+Cheap stages run inline on the server loop; when the chain contains a heavy
+stage it runs on a thread or process pool instead, so neither the asyncio
+loop nor the Qt thread waits for it. Results are memoized in an LRU keyed
+by (pipeline version, text); reconfiguring bumps the version, so stale
+results simply age out.
+"""
+import asyncio
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from subtitle_file import clean_markup
+
+WORD_RE = re.compile(r"\w+(?:['’]\w+)*")
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'є': 'ye', 'і': 'i', 'ї': 'yi', 'ґ': 'g', 'ў': 'w',
+}
+TRANSLITERATION = str.maketrans({
+    **CYRILLIC_TO_LATIN,
+    **{k.upper(): v.capitalize() for k, v in CYRILLIC_TO_LATIN.items()},
+})
+
+
+def strip_tags(text: str) -> str:
+    """Remove HTML/WebVTT tags and entities"""
+    return clean_markup(text)
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of spaces inside lines and drop empty lines"""
+    lines = (' '.join(line.split()) for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def transliterate(text: str) -> str:
+    """Romanise Cyrillic and strip diacritics from Latin letters"""
+    text = text.translate(TRANSLITERATION)
+    decomposed = unicodedata.normalize('NFKD', text)
+    return unicodedata.normalize(
+        'NFC', ''.join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+class GlossDictionary:
+    """Offline word -> gloss dictionary (server.gloss_dictionary), tab-separated.
+
+    Not to be confused with glossary.py, which only highlights terms.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.entries: Dict[str, str] = {}
+        if path:
+            self.load(Path(path).expanduser())
+
+    def load(self, path: Path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    word, sep, gloss = line.rstrip('\n').partition('\t')
+                    if sep and word.strip() and gloss.strip():
+                        self.entries[word.strip().casefold()] = gloss.strip()
+        except OSError as e:
+            print(f"Error loading gloss dictionary {path}: {e}")
+
+    def __call__(self, text: str) -> str:
+        """Append the gloss after each known word, once per line"""
+        if not self.entries:
+            return text
+        out = []
+        for line in text.split('\n'):
+            seen = set()
+
+            def annotate(match):
+                word = match.group(0)
+                key = word.casefold()
+                gloss = self.entries.get(key)
+                if gloss is None or key in seen:
+                    return word
+                seen.add(key)
+                return f"{word} ({gloss})"
+
+            out.append(WORD_RE.sub(annotate, line))
+        return '\n'.join(out)
+
+
+class Stage(NamedTuple):
+    name: str
+    func: Callable[[str], str]
+    heavy: bool   # run on the worker pool rather than inline
+
+
+def build_stages(names: Sequence[str], gloss_dictionary: Optional[str] = None) -> List[Stage]:
+    """Instantiate the named stages in order, skipping unknown names"""
+    factories = {
+        'strip_tags': lambda: Stage('strip_tags', strip_tags, False),
+        'normalize_whitespace': lambda: Stage('normalize_whitespace', normalize_whitespace, False),
+        'transliterate': lambda: Stage('transliterate', transliterate, True),
+        'gloss': lambda: Stage('gloss', GlossDictionary(gloss_dictionary), True),
+    }
+    stages = []
+    for name in names:
+        factory = factories.get(name)
+        if factory is None:
+            print(f"Unknown subtitle transform: {name}")
+            continue
+        stages.append(factory())
+    return stages
+
+
+def run_stages(stages: Sequence[Stage], text: str) -> Tuple[str, List[Tuple[str, float]]]:
+    """Apply stages in order; return the result and (stage, seconds) timings"""
+    timings = []
+    for stage in stages:
+        started = time.perf_counter()
+        text = stage.func(text)
+        timings.append((stage.name, time.perf_counter() - started))
+    return text, timings
+
+
+# Process pool workers rebuild the stages once instead of pickling them per call
+_worker_stages: List[Stage] = []
+
+
+def _init_worker(names: Sequence[str], gloss_dictionary: Optional[str]):
+    global _worker_stages
+    _worker_stages = build_stages(names, gloss_dictionary)
+
+
+def _run_in_worker(text: str):
+    return run_stages(_worker_stages, text)
+
+
+class TransformPipeline:
+    """Configured transform chain with a worker pool and a result LRU"""
+
+    def __init__(self, names: Sequence[str] = (), workers: int = 2,
+                 executor: str = 'thread', cache_size: int = 1024,
+                 gloss_dictionary: Optional[str] = None):
+        self.workers = max(1, workers)
+        self.executor_kind = executor
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.pool: Optional[Executor] = None
+        self.inflight: Dict[tuple, asyncio.Future] = {}  # only touched on the server loop
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.configure(names, gloss_dictionary)
+
+    def configure(self, names: Sequence[str], gloss_dictionary: Optional[str] = None):
+        """Replace the chain; results of the previous chain are no longer used"""
+        self.names = list(names)
+        self.gloss_dictionary = gloss_dictionary
+        self.stages = build_stages(self.names, gloss_dictionary)
+        self.heavy = any(stage.heavy for stage in self.stages)
+        self.version += 1
+        # Process workers hold their own copy of the stages
+        if self.executor_kind == 'process':
+            self.shutdown()
+
+    def __bool__(self) -> bool:
+        return bool(self.stages)
+
+    def lookup(self, text: str) -> Optional[str]:
+        """Return a memoized result, or None"""
+        key = (self.version, text)
+        with self._lock:
+            result = self.cache.get(key)
+            if result is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+            return result
+
+    def store(self, text: str, result: str, version: int):
+        with self._lock:
+            self.cache[(version, text)] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def get_pool(self) -> Executor:
+        if self.pool is None:
+            if self.executor_kind == 'process':
+                self.pool = ProcessPoolExecutor(
+                    self.workers, initializer=_init_worker,
+                    initargs=(self.names, self.gloss_dictionary))
+            else:
+                self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix='Transform')
+        return self.pool
+
+    def run(self, text: str) -> Tuple[str, List[Tuple[str, float]]]:
+        """Run the chain synchronously, bypassing the cache"""
+        return run_stages(self.stages, text)
+
+    async def process(self, text: str) -> Tuple[str, List[Tuple[str, float]]]:
+        """Run the chain off the loop when it has heavy stages, and memoize"""
+        version = self.version
+        if not self.heavy:
+            with self._lock:
+                self.misses += 1
+            result, timings = self.run(text)
+            self.store(text, result, version)
+            return result, timings
+
+        # A line repeated while its first copy is still in a worker shares that run
+        key = (version, text)
+        future = self.inflight.get(key)
+        if future is not None:
+            result, _ = await asyncio.shield(future)
+            return result, []
+        with self._lock:
+            self.misses += 1
+        loop = asyncio.get_running_loop()
+        if self.executor_kind == 'process':
+            future = loop.run_in_executor(self.get_pool(), _run_in_worker, text)
+        else:
+            future = loop.run_in_executor(self.get_pool(), self.run, text)
+        self.inflight[key] = future
+        try:
+            result, timings = await future
+        finally:
+            del self.inflight[key]
+        self.store(text, result, version)
+        return result, timings
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'stages': [stage.name for stage in self.stages],
+                'version': self.version,
+                'cache_size': len(self.cache),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
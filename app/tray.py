@@ -7,6 +7,16 @@ class TrayIcon(QObject):
     hide_window_signal = pyqtSignal()
     quit_signal = pyqtSignal()
     settings_signal = pyqtSignal()
+    search_signal = pyqtSignal()
+    open_subtitle_signal = pyqtSignal()
+    playback_signal = pyqtSignal(str)
+    stats_signal = pyqtSignal()
+    pin_source_signal = pyqtSignal(bool)
+    latency_signal = pyqtSignal()
+    save_latency_signal = pyqtSignal()
+    save_loop_report_signal = pyqtSignal()
+    profiling_signal = pyqtSignal(bool)
+    watchdog_signal = pyqtSignal(bool)
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -36,6 +46,60 @@ class TrayIcon(QObject):
         self.settings_action.triggered.connect(self.settings_signal.emit)
         self.menu.addAction(self.settings_action)
         
+        self.search_action = QAction("Search History", self)
+        self.search_action.triggered.connect(self.search_signal.emit)
+        self.menu.addAction(self.search_action)
+        
+        # Local subtitle file playback
+        self.playback_menu = self.menu.addMenu("Subtitle File")
+        self.open_subtitle_action = QAction("Open...", self)
+        self.open_subtitle_action.triggered.connect(self.open_subtitle_signal.emit)
+        self.playback_menu.addAction(self.open_subtitle_action)
+        self.playback_menu.addSeparator()
+        for label, command in (("Play/Pause", 'toggle'),
+                               ("Back 5 s", 'back'),
+                               ("Forward 5 s", 'forward'),
+                               ("Show Earlier (-0.5 s)", 'earlier'),
+                               ("Show Later (+0.5 s)", 'later'),
+                               ("Stop", 'stop')):
+            action = QAction(label, self)
+            action.triggered.connect(
+                lambda checked=False, command=command: self.playback_signal.emit(command))
+            self.playback_menu.addAction(action)
+        
+        self.pin_action = QAction("Pin Current Source", self)
+        self.pin_action.setCheckable(True)
+        self.pin_action.toggled.connect(self.pin_source_signal.emit)
+        self.menu.addAction(self.pin_action)
+        
+        self.diagnostics_menu = self.menu.addMenu("Diagnostics")
+        
+        self.stats_action = QAction("Statistics", self)
+        self.stats_action.triggered.connect(self.stats_signal.emit)
+        self.diagnostics_menu.addAction(self.stats_action)
+        
+        self.latency_action = QAction("Latency Report", self)
+        self.latency_action.triggered.connect(self.latency_signal.emit)
+        self.diagnostics_menu.addAction(self.latency_action)
+        
+        self.save_latency_action = QAction("Save Latency Report", self)
+        self.save_latency_action.triggered.connect(self.save_latency_signal.emit)
+        self.diagnostics_menu.addAction(self.save_latency_action)
+        
+        self.watchdog_action = QAction("Watch Event Loops", self)
+        self.watchdog_action.setCheckable(True)
+        self.watchdog_action.toggled.connect(self.watchdog_signal.emit)
+        self.diagnostics_menu.addAction(self.watchdog_action)
+        
+        self.save_loop_report_action = QAction("Save Event Loop Report", self)
+        self.save_loop_report_action.triggered.connect(self.save_loop_report_signal.emit)
+        self.diagnostics_menu.addAction(self.save_loop_report_action)
+        
+        self.profiling_action = QAction("Record Profile", self)
+        self.profiling_action.setCheckable(True)
+        self.profiling_action.toggled.connect(self.profiling_signal.emit)
+        self.diagnostics_menu.addAction(self.profiling_action)
+        
         self.menu.addSeparator()
         
         self.quit_action = QAction("Quit", self)
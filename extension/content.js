@@ -1,8 +1,46 @@
+// Wire protocol versions (see app/protocol.py)
+const PROTOCOL_JSON = 1;
+const PROTOCOL_BINARY = 2;
+const KIND_REGISTER = 1;
+const KIND_CUES = 2;
+const KIND_DELTA = 3;
+const HEADER_SIZE = 12;
+const CUE_HEADER_SIZE = 4;
+const DELTA_HEADER_SIZE = 10;
+
+// Cut at most `limit` bytes without splitting a multi-byte character:
+// back off while the first dropped byte is a continuation byte
+function truncateUtf8(bytes, limit) {
+  if (bytes.length <= limit) {
+    return bytes;
+  }
+  let end = limit;
+  while (end > 0 && (bytes[end] & 0xc0) === 0x80) {
+    end--;
+  }
+  return bytes.subarray(0, end);
+}
+
 // Subtitle detection for various streaming platforms
 class SubtitleDetector {
   constructor() {
     this.lastSubtitle = "";
     this.websocket = null;
+    this.protocol = PROTOCOL_JSON;
+    this.registeredUrl = null;
+    this.pendingCues = [];
+    this.pendingDeltas = [];
+    this.flushScheduled = false;
+    // Growing captions are sent as deltas once the app says it accepts them
+    this.deltas = false;
+    this.encoder = new TextEncoder();
+    // Track mode: the whole cue track is uploaded and timed by the app
+    this.trackMode = false;
+    this.trackKey = null;
+    this.lastCueCount = 0;
+    this.sentCueCount = 0;
+    this.sentCues = new WeakSet();
+    this.clockVideo = null;
     this.connectToServer();
     this.startDetection();
   }
@@ -10,10 +48,43 @@ class SubtitleDetector {
   connectToServer() {
     try {
       this.websocket = new WebSocket("ws://127.0.0.1:8765");
+      this.websocket.binaryType = "arraybuffer";
+      this.protocol = PROTOCOL_JSON;
+      this.registeredUrl = null;
+      // Deltas are relative to what this connection has seen
+      this.deltas = false;
+      this.lastSubtitle = "";
+      // A new connection is a new session; upload the track again
+      this.trackKey = null;
 
       this.websocket.onopen = () => {
         console.log("Connected to subtitle overlay app");
         this.sendConnectionStatus(true);
+        // Offer the binary protocol; stay on JSON until the server agrees
+        this.websocket.send(
+          JSON.stringify({
+            type: "hello",
+            protocols: [PROTOCOL_BINARY, PROTOCOL_JSON],
+            url: window.location.href,
+          })
+        );
+      };
+
+      this.websocket.onmessage = (event) => {
+        if (typeof event.data !== "string") {
+          return;
+        }
+        try {
+          const data = JSON.parse(event.data);
+          if (data.type === "hello") {
+            this.protocol = data.protocol;
+            this.deltas = data.deltas === true;
+            // The hello already carried the URL
+            this.registeredUrl = window.location.href;
+          }
+        } catch (error) {
+          console.error("Invalid message from server:", error);
+        }
       };
 
       this.websocket.onclose = () => {
@@ -32,21 +103,212 @@ class SubtitleDetector {
     }
   }
 
+  sendJson(message) {
+    if (this.websocket && this.websocket.readyState === WebSocket.OPEN) {
+      this.websocket.send(JSON.stringify(message));
+      return true;
+    }
+    return false;
+  }
+
   sendSubtitle(text) {
+    if (this.trackMode) {
+      // The app already has every cue and follows the media clock
+      return;
+    }
     if (this.websocket && this.websocket.readyState === WebSocket.OPEN) {
       // Only send if subtitle has changed
       if (text !== this.lastSubtitle) {
+        const previous = this.lastSubtitle;
         this.lastSubtitle = text;
-        this.websocket.send(
-          JSON.stringify({
-            type: "subtitle",
-            text: text,
-            timestamp: Date.now(),
-            url: window.location.href,
-          })
-        );
+        // 0x3fff code points keeps any UTF-8 tail within a u16 length
+        const delta = this.deltas && text.length <= 0x3fff
+          ? this.computeDelta(previous, text) : null;
+        // Offsets into a longer previous caption would wrap in a u16 field
+        if (delta && delta.drop <= 0xffff && delta.keep <= 0xffff) {
+          this.sendDelta(delta);
+        } else if (this.protocol === PROTOCOL_BINARY) {
+          if (this.pendingDeltas.length) {
+            // Keep the full cue behind the deltas already queued
+            this.flushCues();
+          }
+          this.queueCue(text);
+        } else {
+          this.websocket.send(
+            JSON.stringify({
+              type: "subtitle",
+              text: text,
+              timestamp: Date.now(),
+              url: window.location.href,
+            })
+          );
+        }
+      }
+    }
+  }
+
+  computeDelta(previous, text) {
+    // Offsets count code points, like Python string indexes
+    const prev = Array.from(previous);
+    const next = Array.from(text);
+    let keep = 0;
+    while (keep < prev.length && keep < next.length && prev[keep] === next[keep]) {
+      keep++;
+    }
+    let best = { drop: 0, keep: keep, tail: next.slice(keep) };
+    // Rolling captions scroll whole words off the front
+    for (let start = 1; start < prev.length; start++) {
+      const overlap = prev.length - start;
+      if (next.length - overlap >= best.tail.length) {
+        break;
+      }
+      if (!/\s/.test(prev[start - 1]) || /\s/.test(prev[start])) {
+        continue;
+      }
+      let matches = overlap <= next.length;
+      for (let i = 0; matches && i < overlap; i++) {
+        matches = prev[start + i] === next[i];
       }
+      if (matches) {
+        best = { drop: start, keep: prev.length, tail: next.slice(overlap) };
+        break;
+      }
+    }
+    if (best.keep - best.drop === 0) {
+      best = { drop: 0, keep: 0, tail: next };
+    }
+    return {
+      drop: best.drop,
+      keep: best.keep,
+      total: next.length,
+      text: best.tail.join(""),
+    };
+  }
+
+  sendDelta(delta) {
+    if (this.protocol === PROTOCOL_BINARY) {
+      this.pendingDeltas.push([Date.now(), delta]);
+      this.scheduleFlush();
+    } else {
+      this.sendJson({
+        type: "delta",
+        drop: delta.drop,
+        keep: delta.keep,
+        total: delta.total,
+        text: delta.text,
+        timestamp: Date.now(),
+        url: window.location.href,
+      });
+    }
+  }
+
+  queueCue(text) {
+    // Cues produced in the same task are batched into one binary frame
+    this.pendingCues.push([Date.now(), text]);
+    this.scheduleFlush();
+  }
+
+  scheduleFlush() {
+    if (!this.flushScheduled) {
+      this.flushScheduled = true;
+      setTimeout(() => this.flushCues(), 0);
+    }
+  }
+
+  flushCues() {
+    this.flushScheduled = false;
+    const cues = this.pendingCues;
+    const deltas = this.pendingDeltas;
+    this.pendingCues = [];
+    this.pendingDeltas = [];
+    if ((!cues.length && !deltas.length) || !this.websocket ||
+        this.websocket.readyState !== WebSocket.OPEN) {
+      return;
+    }
+
+    const url = window.location.href;
+    if (url !== this.registeredUrl) {
+      this.websocket.send(this.encodeRegister(url, Date.now()));
+      this.registeredUrl = url;
+    }
+    // Full cues were queued before deltas were enabled, so they go first
+    if (cues.length) {
+      this.websocket.send(this.encodeCues(cues));
     }
+    if (deltas.length) {
+      this.websocket.send(this.encodeDeltas(deltas));
+    }
+  }
+
+  encodeHeader(view, kind, count, timestamp) {
+    view.setUint8(0, PROTOCOL_BINARY);
+    view.setUint8(1, kind);
+    view.setUint16(2, count, true);
+    view.setBigUint64(4, BigInt(timestamp), true);
+  }
+
+  encodeRegister(url, timestamp) {
+    const urlBytes = this.encoder.encode(url);
+    const buffer = new ArrayBuffer(HEADER_SIZE + urlBytes.length);
+    this.encodeHeader(new DataView(buffer), KIND_REGISTER, 0, timestamp);
+    new Uint8Array(buffer, HEADER_SIZE).set(urlBytes);
+    return buffer;
+  }
+
+  encodeCues(cues) {
+    const baseTime = cues[0][0];
+    const encoded = cues.map(([timestamp, text]) => [
+      Math.min(timestamp - baseTime, 0xffff),
+      truncateUtf8(this.encoder.encode(text), 0xffff),
+    ]);
+    const size = encoded.reduce(
+      (total, [, bytes]) => total + CUE_HEADER_SIZE + bytes.length,
+      HEADER_SIZE
+    );
+
+    const buffer = new ArrayBuffer(size);
+    const view = new DataView(buffer);
+    const bytesView = new Uint8Array(buffer);
+    this.encodeHeader(view, KIND_CUES, encoded.length, baseTime);
+
+    let offset = HEADER_SIZE;
+    for (const [delta, bytes] of encoded) {
+      view.setUint16(offset, delta, true);
+      view.setUint16(offset + 2, bytes.length, true);
+      bytesView.set(bytes, offset + CUE_HEADER_SIZE);
+      offset += CUE_HEADER_SIZE + bytes.length;
+    }
+    return buffer;
+  }
+
+  encodeDeltas(deltas) {
+    const baseTime = deltas[0][0];
+    const encoded = deltas.map(([timestamp, delta]) => [
+      Math.min(timestamp - baseTime, 0xffff),
+      delta,
+      this.encoder.encode(delta.text),
+    ]);
+    const size = encoded.reduce(
+      (total, [, , bytes]) => total + DELTA_HEADER_SIZE + bytes.length,
+      HEADER_SIZE
+    );
+
+    const buffer = new ArrayBuffer(size);
+    const view = new DataView(buffer);
+    const bytesView = new Uint8Array(buffer);
+    this.encodeHeader(view, KIND_DELTA, encoded.length, baseTime);
+
+    let offset = HEADER_SIZE;
+    for (const [offsetMs, delta, bytes] of encoded) {
+      view.setUint16(offset, offsetMs, true);
+      view.setUint16(offset + 2, delta.drop, true);
+      view.setUint16(offset + 4, delta.keep, true);
+      view.setUint16(offset + 6, delta.total, true);
+      view.setUint16(offset + 8, bytes.length, true);
+      bytesView.set(bytes, offset + DELTA_HEADER_SIZE);
+      offset += DELTA_HEADER_SIZE + bytes.length;
+    }
+    return buffer;
   }
 
   sendConnectionStatus(connected) {
@@ -56,6 +318,112 @@ class SubtitleDetector {
     });
   }
 
+  findCueTrack(video) {
+    // Prefer the track the user has turned on; hidden tracks still load cues
+    let fallback = null;
+    for (let i = 0; i < video.textTracks.length; i++) {
+      const track = video.textTracks[i];
+      if (!track.cues || !track.cues.length || track.mode === "disabled") {
+        continue;
+      }
+      if (track.mode === "showing") {
+        return track;
+      }
+      fallback = fallback || track;
+    }
+    return fallback;
+  }
+
+  uploadTrack(track, append) {
+    // Appends carry only the cues loaded since the last upload; cues can be
+    // inserted anywhere in the list, so the sent ones are remembered
+    const cues = [];
+    for (let i = 0; i < track.cues.length; i++) {
+      const cue = track.cues[i];
+      if (cue.text && !(append && this.sentCues.has(cue))) {
+        cues.push({ start: cue.startTime, end: cue.endTime, text: cue.text });
+      }
+    }
+    const sent = this.sendJson({
+      type: "track",
+      cues: cues,
+      append: append,
+      url: window.location.href,
+    });
+    if (sent) {
+      if (!append) {
+        this.sentCues = new WeakSet();
+      }
+      for (let i = 0; i < track.cues.length; i++) {
+        this.sentCues.add(track.cues[i]);
+      }
+    }
+    return sent;
+  }
+
+  sendClock() {
+    const video = this.clockVideo;
+    if (!this.trackMode || !video) {
+      return;
+    }
+    this.sendJson({
+      type: "clock",
+      media_time: video.currentTime,
+      rate: video.playbackRate,
+      paused: video.paused || video.ended,
+      timestamp: Date.now(),
+    });
+  }
+
+  watchTextTracks() {
+    const clockEvents = ["play", "pause", "seeked", "ratechange", "ended"];
+    const onClockEvent = () => this.sendClock();
+
+    setInterval(() => {
+      const video = document.querySelector("video");
+      const track = video && video.textTracks ? this.findCueTrack(video) : null;
+
+      if (video !== this.clockVideo) {
+        if (this.clockVideo) {
+          clockEvents.forEach((name) =>
+            this.clockVideo.removeEventListener(name, onClockEvent));
+        }
+        if (video) {
+          clockEvents.forEach((name) => video.addEventListener(name, onClockEvent));
+        }
+        this.clockVideo = video;
+      }
+
+      if (!track) {
+        if (this.trackMode) {
+          // Track gone: clear it in the app and fall back to DOM polling
+          this.sendJson({ type: "track", cues: [], url: window.location.href });
+          this.trackMode = false;
+          this.trackKey = null;
+        }
+        return;
+      }
+
+      // Upload once the cue count has held for a tick, so a track that is
+      // still loading is not sent again every second. A new track is sent
+      // whole; more cues on the same one are appended.
+      const count = track.cues.length;
+      const stable = count === this.lastCueCount;
+      this.lastCueCount = count;
+      const key = `${track.label}|${track.language}`;
+      if (stable && (key !== this.trackKey || count !== this.sentCueCount)) {
+        const append = key === this.trackKey && count > this.sentCueCount;
+        if (this.uploadTrack(track, append)) {
+          this.trackKey = key;
+          this.sentCueCount = count;
+          this.trackMode = true;
+        }
+      }
+      // Heartbeat; events above cover play/pause/seek immediately
+      this.sendClock();
+    }, 1000);
+  }
+
   startDetection() {
     const hostname = window.location.hostname;
 
@@ -74,6 +442,9 @@ class SubtitleDetector {
     } else if (hostname.includes("rezka")) {
       this.detectRezka();
     } else {
+      // Sites with a DOM detector above render their own captions; only
+      // generic players are worth timing from their text tracks
+      this.watchTextTracks();
       this.detectGeneric();
     }
   }
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The app uses flat imports (python app/main.py puts app/ on the path)
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+sys.path.insert(0, str(APP_DIR))
@@ -0,0 +1,28 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+
+from conftest import APP_DIR
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_benchmark_leaves_home_untouched(tmp_path):
+    home = tmp_path / 'home'
+    home.mkdir()
+    output = tmp_path / 'report.json'
+    env = dict(os.environ, HOME=str(home), USERPROFILE=str(home), QT_QPA_PLATFORM='offscreen')
+    subprocess.run(
+        [sys.executable, str(APP_DIR / 'benchmark.py'), '--duration', '0.5', '--rate', '20',
+         '--port', str(free_port()), '--output', str(output)],
+        env=env, check=True, timeout=60, capture_output=True)
+
+    assert list(home.iterdir()) == []
+    report = json.loads(output.read_text())
+    assert report['results']['sent'] > 0
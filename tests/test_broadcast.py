@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from broadcast import POLICY_DISCONNECT, POLICY_DROP, Broadcaster
+from protocol import PROTOCOL_BINARY, PROTOCOL_JSON
+
+
+class StalledConnection:
+    """Accepts one send and then never completes another, like a slow client"""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+        self.release = asyncio.Event()
+
+    async def send(self, message):
+        self.sent.append(message)
+        await self.release.wait()
+
+    async def close(self, code=1000, reason=""):
+        self.closed = (code, reason)
+
+
+class FakeSession:
+    def __init__(self, client_id, protocol=PROTOCOL_JSON):
+        self.client_id = client_id
+        self.protocol = protocol
+        self.websocket = StalledConnection()
+
+
+def texts(messages):
+    return [json.loads(message)['text'] for message in messages]
+
+
+def test_full_queue_drops_the_oldest_message():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=2, policy=POLICY_DROP)
+        session = FakeSession(1)
+        subscriber = broadcaster.subscribe(session)
+        broadcaster.publish('first')
+        await asyncio.sleep(0)  # the writer takes 'first' and stalls on send
+        for text in ('a', 'b', 'c', 'd'):
+            broadcaster.publish(text)
+        assert texts(list(subscriber.queue._queue)) == ['c', 'd']
+        assert broadcaster.stats()['dropped'] == 2
+        assert broadcaster.stats()['disconnected'] == 0
+
+        session.websocket.release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert texts(session.websocket.sent) == ['first', 'c', 'd']
+        broadcaster.unsubscribe(session)
+    asyncio.run(scenario())
+
+
+def test_full_queue_disconnects_a_slow_subscriber():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=2, policy=POLICY_DISCONNECT)
+        slow = FakeSession(1)
+        fast = FakeSession(2)
+        fast.websocket.release.set()
+        broadcaster.subscribe(slow)
+        broadcaster.subscribe(fast)
+        broadcaster.publish('first')
+        await asyncio.sleep(0)
+        for text in ('a', 'b', 'c'):
+            broadcaster.publish(text)
+            await asyncio.sleep(0)  # the fast subscriber keeps up
+        assert slow.websocket.closed == (1008, "subscriber too slow")
+        assert list(broadcaster.subscribers) == [2]
+        stats = broadcaster.stats()
+        assert stats['disconnected'] == 1
+        assert stats['dropped'] == 0
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert texts(fast.websocket.sent) == ['first', 'a', 'b', 'c']
+        broadcaster.unsubscribe(fast)
+    asyncio.run(scenario())
+
+
+def test_each_format_is_encoded_once():
+    async def scenario():
+        broadcaster = Broadcaster()
+        sessions = [FakeSession(1), FakeSession(2), FakeSession(3, PROTOCOL_BINARY)]
+        subscribers = [broadcaster.subscribe(session) for session in sessions]
+        broadcaster.publish('hello', timestamp=1.0)
+        first, second, binary = (s.queue.get_nowait() for s in subscribers)
+        assert first is second
+        assert isinstance(binary, bytes)
+        for session in sessions:
+            broadcaster.unsubscribe(session)
+    asyncio.run(scenario())
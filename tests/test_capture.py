@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import json
+import socket
+import time
+
+from capture import (CAPTURE_HEADER, KIND_BINARY, KIND_CONNECT, KIND_DISCONNECT, KIND_TEXT,
+                     CaptureWriter, read_capture)
+from protocol import HEADER, decode_frame, encode_cues
+from replay import Replayer, retime
+from server import SubtitleServer
+
+
+class FakeConnection:
+    async def send(self, message):
+        pass
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def make_server(**kwargs):
+    server = SubtitleServer(rate_limit=1000, rate_burst=1000, switch_delay=0, **kwargs)
+    shown = []
+    server.set_subtitle_callback(lambda text, timing, client_id: shown.append(text))
+    return server, shown
+
+
+def test_capture_records_every_frame_in_order(tmp_path):
+    path = tmp_path / 'session.socap'
+    writer = CaptureWriter(path)
+    writer.record(1, KIND_CONNECT)
+    writer.record(1, KIND_TEXT, '{"type": "subtitle", "text": "héllo"}')
+    writer.record(1, KIND_BINARY, encode_cues([(1000, 'binary')]))
+    writer.record(1, KIND_DISCONNECT)
+    writer.close()
+
+    with gzip.open(path, 'rb') as f:
+        assert f.read(CAPTURE_HEADER.size)[:5] == b'SOCAP'
+    records = list(read_capture(path))
+    assert [r.kind for r in records] == [KIND_CONNECT, KIND_TEXT, KIND_BINARY, KIND_DISCONNECT]
+    assert json.loads(records[1].payload)['text'] == 'héllo'
+    assert decode_frame(records[2].payload).cues == [(1000, 'binary')]
+    assert [r.offset for r in records] == sorted(r.offset for r in records)
+
+
+def test_truncated_capture_ends_at_the_last_full_record(tmp_path):
+    path = tmp_path / 'session.socap'
+    writer = CaptureWriter(path)
+    writer.record(1, KIND_TEXT, 'x' * 100)
+    writer.record(1, KIND_TEXT, 'y' * 100)
+    writer.close()
+    data = gzip.decompress(path.read_bytes())
+    path.write_bytes(gzip.compress(data[:-10]))
+    assert [r.payload for r in read_capture(path)] == [b'x' * 100]
+
+
+def test_retime_rewrites_client_timestamps():
+    binary = retime(KIND_BINARY, encode_cues([(1000, 'a'), (1200, 'b')]), 5000)
+    assert HEADER.unpack_from(binary)[3] == 5000
+    assert decode_frame(binary).cues == [(5000, 'a'), (5200, 'b')]
+    text = retime(KIND_TEXT, b'{"type": "subtitle", "timestamp": 1}', 5000)
+    assert json.loads(text)['timestamp'] == 5000
+    assert retime(KIND_TEXT, b'not json', 5000) == b'not json'
+
+
+def test_captured_session_replays_into_a_server(tmp_path):
+    path = tmp_path / 'session.socap'
+
+    async def capture():
+        server, shown = make_server()
+        server.loop = asyncio.get_running_loop()
+        server.start_capture(path)
+        session = server.open_session(FakeConnection())
+        now = int(time.time() * 1000)
+        await server.handle_message(session, json.dumps(
+            {'type': 'subtitle', 'text': 'first', 'timestamp': now}))
+        await server.handle_message(session, encode_cues([(now, 'second')]))
+        server.close_session(session)
+        server.stop_capture()
+        return shown
+
+    async def replay():
+        server, shown = make_server(port=free_port())
+        listening = asyncio.Event()
+        server.set_listening_callback(listening.set)
+        task = asyncio.create_task(server.start())
+        await asyncio.wait_for(listening.wait(), 5)
+        replayer = Replayer(list(read_capture(path)), f'ws://127.0.0.1:{server.port}', 0)
+        await replayer.run()
+        for _ in range(50):
+            if len(shown) == 2:
+                break
+            await asyncio.sleep(0.02)
+        await server.stop()
+        await task
+        return replayer, shown
+
+    captured = asyncio.run(capture())
+    assert captured == ['first', 'second']
+    replayer, replayed = asyncio.run(replay())
+    assert replayer.sent == 2
+    assert replayer.failed == 0
+    assert replayed == captured
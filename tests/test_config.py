@@ -0,0 +1,86 @@
+import json
+import time
+
+import config as config_module
+from config import ConfigManager
+
+
+def make_config(tmp_path, flush_delay=0.05):
+    config = ConfigManager(flush_delay=flush_delay, config_dir=tmp_path)
+    writes = []
+    save = config.save_settings
+
+    def counted():
+        writes.append(dict(config.settings['window']))
+        save()
+    config.save_settings = counted
+    return config, writes
+
+
+def saved(tmp_path):
+    return json.loads((tmp_path / 'config.json').read_text())
+
+
+def test_changes_are_written_once_after_they_stop(tmp_path):
+    config, writes = make_config(tmp_path)
+    for x in range(10):
+        config.set('window', 'x', value=x)
+    assert writes == []
+    time.sleep(0.3)
+    assert len(writes) == 1
+    assert saved(tmp_path)['window']['x'] == 9
+    config.flush()  # nothing pending
+    assert len(writes) == 1
+
+
+def test_failed_write_keeps_the_old_file_and_no_temp_file(tmp_path, monkeypatch, capsys):
+    config, _ = make_config(tmp_path, flush_delay=60)
+    config.set('window', 'x', value=1)
+    config.flush()
+    assert saved(tmp_path)['window']['x'] == 1
+
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(config_module.os, 'replace', fail)
+    config.set('window', 'x', value=2)
+    config.flush()
+    assert 'Error saving config: disk full' in capsys.readouterr().out
+    assert saved(tmp_path)['window']['x'] == 1
+    assert not list(tmp_path.glob('.config-*.tmp'))
+    assert config._dirty  # retried on the next flush
+
+    monkeypatch.undo()
+    config.flush()
+    assert saved(tmp_path)['window']['x'] == 2
+
+
+def test_nested_transaction_commits_once(tmp_path):
+    config, writes = make_config(tmp_path)
+    commits = []
+    commit = config.commit
+    config.commit = lambda: (commits.append(1), commit())
+    with config.transaction():
+        config.set('window', 'x', value=10)
+        with config.transaction():
+            config.set('window', 'y', value=20)
+        assert config.snapshot.window.x == 100  # not rebuilt yet
+        config.set('text', 'font_size', value=30)
+    assert len(commits) == 1
+    assert (config.snapshot.window.x, config.snapshot.window.y) == (10, 20)
+    assert config.snapshot.text.font_size == 30
+    time.sleep(0.3)
+    assert len(writes) == 1
+
+
+def test_unknown_and_malformed_settings_fall_back_to_defaults(tmp_path):
+    (tmp_path / 'config.json').write_text(json.dumps({
+        'window': {'x': 5, 'retired_option': True},
+        'plugins': {'enabled': ['x']},
+        'text': 7,
+    }))
+    config = ConfigManager(config_dir=tmp_path)
+    snapshot = config.snapshot
+    assert snapshot.window.x == 5
+    assert snapshot.window.width == 800
+    assert snapshot.text.font_size == 22
+    assert config.get('plugins', 'enabled') == ['x']  # kept for newer versions
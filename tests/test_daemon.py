@@ -0,0 +1,87 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from daemon import HistorySink, JsonLinesSink, TextFileSink, create_sink
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+
+
+class FakeStore:
+    def __init__(self):
+        self.entries = []
+        self.closed = False
+
+    def append(self, text, timestamp, source_id):
+        self.entries.append((text, timestamp, source_id))
+
+    def close(self):
+        self.closed = True
+
+
+def test_daemon_runs_sinks_without_qt(tmp_path):
+    script = f"""
+import sys
+sys.path.insert(0, {str(APP_DIR)!r})
+from pathlib import Path
+from config import ConfigManager
+from daemon import SubtitleDaemon, create_sink
+tmp = Path({str(tmp_path)!r})
+sinks = [create_sink('jsonl:' + str(tmp / 'subs.jsonl')), create_sink('text:' + str(tmp / 'now.txt'))]
+daemon = SubtitleDaemon(ConfigManager(config_dir=tmp / 'config'), sinks)
+daemon.on_subtitle('hello', None, 3)
+assert (tmp / 'now.txt').read_text() == 'hello'
+daemon.close()
+assert 'PyQt6' not in sys.modules, sorted(m for m in sys.modules if m.startswith('PyQt6'))
+"""
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                            timeout=60)
+    assert result.returncode == 0, result.stderr
+    lines = (tmp_path / 'subs.jsonl').read_text().splitlines()
+    assert [json.loads(line)['text'] for line in lines] == ['hello']
+    assert json.loads(lines[0])['source'] == 3
+    assert (tmp_path / 'now.txt').read_text() == ''
+    assert (tmp_path / 'config' / 'history').exists()
+
+
+def test_text_sink_holds_only_the_current_subtitle(tmp_path):
+    path = tmp_path / 'now.txt'
+    sink = TextFileSink(path)
+    assert path.read_text() == ''
+    sink.write('one', 1.0, 0)
+    sink.write('two', 2.0, 0)
+    assert path.read_text() == 'two'
+    sink.close()
+    assert path.read_text() == ''
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_jsonl_sink_skips_hides(tmp_path):
+    path = tmp_path / 'subs.jsonl'
+    sink = JsonLinesSink(path)
+    sink.write('héllo', 1.5, 2)
+    sink.write('', 2.0, 2)
+    sink.close()
+    assert [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()] == [
+        {'time': 1.5, 'source': 2, 'text': 'héllo'}]
+
+
+def test_history_sink_stores_finished_captions_once():
+    store = FakeStore()
+    sink = HistorySink(store)
+    sink.write('Hello', 1.0, 1)
+    sink.write('Hello there', 1.1, 1)
+    assert store.entries == []
+    sink.write('', 1.2, 1)
+    assert store.entries == [('Hello there', 1.0, 1)]
+    sink.close()
+    assert store.closed
+
+
+def test_create_sink_rejects_unknown_specs():
+    for spec in ('bogus', 'jsonl', 'text:'):
+        with pytest.raises(ValueError):
+            create_sink(spec)
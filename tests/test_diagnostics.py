@@ -0,0 +1,79 @@
+import queue
+import threading
+
+import pytest
+
+from diagnostics import CProfileCapture, SamplingProfiler, create_profiler
+
+
+def busy():
+    return sum(i * i for i in range(20000))
+
+
+class Worker:
+    """A thread that runs callbacks handed to it, like the server loop"""
+
+    def __init__(self):
+        self.calls = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            callback = self.calls.get()
+            if callback is None:
+                return
+            callback()
+
+    def stop(self):
+        self.calls.put(None)
+        self.thread.join()
+
+
+def test_falls_back_to_sampling_without_per_thread_cprofile(monkeypatch, capsys):
+    monkeypatch.setattr(CProfileCapture, 'per_thread', False)
+    profiler = create_profiler('cprofile', {'gui': lambda callback: callback()},
+                               {'gui': threading.get_ident()}, 0.005)
+    assert isinstance(profiler, SamplingProfiler)
+    assert 'sampling instead' in capsys.readouterr().out
+
+
+def test_sampling_is_the_default():
+    profiler = create_profiler('sampling', {}, {'gui': threading.get_ident()}, 0.005)
+    assert isinstance(profiler, SamplingProfiler)
+
+
+@pytest.mark.skipif(not CProfileCapture.per_thread,
+                    reason="cProfile cannot run per thread on this Python")
+def test_cprofile_captures_each_thread(tmp_path):
+    worker = Worker()
+    try:
+        profiler = create_profiler('cprofile', {'gui': lambda callback: callback(),
+                                                'server': worker.calls.put}, {}, 0.005)
+        assert isinstance(profiler, CProfileCapture)
+        profiler.start()
+        busy()
+        worker.calls.put(busy)
+        path = tmp_path / 'profile.txt'
+        profiler.stop(path)
+    finally:
+        worker.stop()
+    report = path.read_text()
+    assert '=== gui thread\n' in report
+    assert '=== server thread\n' in report
+    assert report.count('busy') >= 2
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: done.wait(5), daemon=True)
+    thread.start()
+    profiler = SamplingProfiler({'waiter': thread.ident}, interval=0.001)
+    profiler.start()
+    while profiler.count < 5:
+        done.wait(0.005)
+    path = tmp_path / 'profile.folded'
+    profiler.stop(path)
+    done.set()
+    lines = path.read_text().splitlines()
+    assert lines and all(line.startswith('waiter;') for line in lines)
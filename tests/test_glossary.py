@@ -0,0 +1,58 @@
+import os
+
+import glossary
+from glossary import TermMatcher, load_matcher
+
+
+def write_glossary(path, terms, mtime_ns=None):
+    path.write_text(''.join(f'{term}\tgloss\n' for term in terms), encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_find_matches_whole_words_case_insensitively():
+    matcher = TermMatcher(['New York', 'York', 'café'])
+    text = 'CAFÉ in New York, not Yorkshire'
+    assert [text[start:end] for start, end in matcher.find(text)] == ['CAFÉ', 'New York']
+
+
+def test_cache_hit_skips_parsing(tmp_path, monkeypatch):
+    source = tmp_path / 'terms.tsv'
+    cache = tmp_path / 'cache'
+    write_glossary(source, ['alpha', 'beta'])
+    assert len(load_matcher(source, cache)) == 2
+    assert len(list(cache.glob('*.bin'))) == 1
+
+    def fail(path):
+        raise AssertionError("the glossary was parsed again")
+    monkeypatch.setattr(glossary, 'read_terms', fail)
+    assert load_matcher(source, cache).terms == ['alpha', 'beta']
+
+
+def test_changed_file_replaces_only_its_own_cache(tmp_path):
+    source = tmp_path / 'terms.tsv'
+    other = tmp_path / 'other.tsv'
+    cache = tmp_path / 'cache'
+    write_glossary(source, ['alpha'], mtime_ns=1_000_000_000)
+    write_glossary(other, ['gamma'])
+    load_matcher(source, cache)
+    load_matcher(other, cache)
+    other_cache = glossary.cache_path(other, cache)
+
+    write_glossary(source, ['alpha', 'delta'], mtime_ns=2_000_000_000)
+    assert load_matcher(source, cache).terms == ['alpha', 'delta']
+    assert sorted(cache.glob('*.bin')) == sorted([glossary.cache_path(source, cache), other_cache])
+
+
+def test_corrupt_cache_is_rebuilt(tmp_path, capsys):
+    source = tmp_path / 'terms.tsv'
+    cache = tmp_path / 'cache'
+    write_glossary(source, ['alpha', 'beta'])
+    load_matcher(source, cache)
+    cached = glossary.cache_path(source, cache)
+    cached.write_bytes(b'not a cache')
+
+    assert load_matcher(source, cache).terms == ['alpha', 'beta']
+    assert 'Ignoring glossary cache' in capsys.readouterr().out
+    assert TermMatcher.loads(cached.read_bytes()).terms == ['alpha', 'beta']
+    assert not list(cache.glob('*.tmp'))
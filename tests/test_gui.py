@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PyQt6.QtWidgets')
+
+from config import ConfigManager
+from metrics import CueTiming
+
+
+@pytest.fixture
+def window(tmp_path):
+    from gui import SubtitleWindow
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    config = ConfigManager(config_dir=tmp_path)
+    window = SubtitleWindow(config)
+    yield window
+    window.hide()
+    window.deleteLater()
+    app.processEvents()
+
+
+def test_unchanged_text_is_not_timed(window):
+    first = CueTiming()
+    assert window.show_subtitle('hello', first)
+    assert window.pending_timing is first
+    window.pending_timing = None  # as the paint of 'hello' does
+
+    # Nothing repaints for the same text, so its timing must not wait for
+    # some later, unrelated paint
+    assert not window.show_subtitle('hello', CueTiming())
+    assert window.pending_timing is None
+
+
+def test_repeat_before_paint_keeps_the_first_timing(window):
+    first = CueTiming()
+    window.show_subtitle('hello', first)
+    assert not window.show_subtitle('hello', CueTiming())
+    assert window.pending_timing is first
+    assert window.show_subtitle('world', None) is True
@@ -0,0 +1,49 @@
+import threading
+
+from handoff import SubtitleHandoff
+
+
+def test_latest_wins_and_wakes_once():
+    handoff = SubtitleHandoff()
+    assert handoff.take() is None
+    assert handoff.put('one') is True
+    assert handoff.put('two') is False  # a wakeup is already pending
+    assert handoff.put('three') is False
+    assert handoff.pending() == 1
+    assert handoff.take() == 'three'
+    assert handoff.take() is None
+    assert handoff.stats() == {'submitted': 3, 'delivered': 1, 'dropped': 2,
+                               'coalesced': 1, 'pending': 0}
+
+
+def test_single_items_are_not_coalesced():
+    handoff = SubtitleHandoff()
+    for text in ('a', 'b'):
+        assert handoff.put(text) is True
+        assert handoff.take() == text
+    handoff.absorbed()
+    assert handoff.stats()['coalesced'] == 1
+    assert handoff.stats()['dropped'] == 0
+
+
+def test_consumer_always_ends_with_the_newest_item():
+    handoff = SubtitleHandoff()
+    wakeups = []
+
+    def produce():
+        for i in range(10000):
+            if handoff.put(i):
+                wakeups.append(i)
+    producer = threading.Thread(target=produce)
+    producer.start()
+    seen = []
+    while producer.is_alive() or handoff.pending():
+        item = handoff.take()
+        if item is not None:
+            seen.append(item)
+    producer.join()
+    assert seen == sorted(seen)
+    assert seen[-1] == 9999
+    stats = handoff.stats()
+    assert stats['delivered'] == len(seen) == len(wakeups)
+    assert stats['submitted'] == stats['delivered'] + stats['dropped'] == 10000
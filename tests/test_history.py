@@ -0,0 +1,55 @@
+import pytest
+
+from history import HistoryEntry, SubtitleHistory
+
+
+def test_ring_wraps_and_keeps_newest():
+    history = SubtitleHistory(capacity=3)
+    for i in range(5):
+        assert history.append(f'line {i}', float(i), i) == i
+    assert len(history) == 3
+    assert [entry.text for entry in history] == ['line 2', 'line 3', 'line 4']
+    assert history[0] == HistoryEntry('line 2', 2.0, 2)
+    assert history[-1] == HistoryEntry('line 4', 4.0, 4)
+    assert [entry.text for entry in history.latest(2)] == ['line 4', 'line 3']
+    assert len(history.latest(10)) == 3
+    with pytest.raises(IndexError):
+        history[3]
+
+
+def test_repeats_share_one_interned_string():
+    history = SubtitleHistory(capacity=4)
+    first = ''.join(['rolling', ' caption'])
+    second = ''.join(['rolling ', 'caption'])
+    assert first is not second
+    history.append(first, 1.0)
+    history.append(second, 2.0)
+    history.append('other', 3.0)
+    assert history[0].text is history[1].text
+    assert history.unique_texts() == 2
+
+
+def test_evicted_text_leaves_the_pool():
+    history = SubtitleHistory(capacity=2)
+    history.append('a', 1.0)
+    history.append('a', 2.0)
+    history.append('b', 3.0)
+    assert history.unique_texts() == 2  # one 'a' is still held
+    history.append('c', 4.0)
+    assert history.unique_texts() == 2
+    assert [entry.text for entry in history] == ['b', 'c']
+
+
+def test_resize_keeps_newest_and_sequence():
+    history = SubtitleHistory(capacity=5)
+    for i in range(5):
+        history.append(str(i), float(i))
+    history.resize(2)
+    assert [entry.text for entry in history] == ['3', '4']
+    assert history.unique_texts() == 2
+    assert history.append('5', 5.0) == 5
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        SubtitleHistory(capacity=0)
@@ -0,0 +1,27 @@
+from history_store import HistoryStore
+
+
+def test_read_latest_spans_blocks_in_order(tmp_path):
+    store = HistoryStore(tmp_path, block_entries=7)
+    for i in range(100):
+        store.append(f'line {i}', float(i), i % 3)
+    store.close()
+
+    store = HistoryStore(tmp_path, block_entries=7)
+    try:
+        for count in (1, 7, 8, 30, 100, 500):
+            expected = [f'line {i}' for i in range(max(0, 100 - count), 100)]
+            assert [e.text for e in store.read_latest(count)] == expected
+        assert store.read_latest(0) == []
+        latest = store.read_latest(3)
+        assert [(e.timestamp, e.source_id) for e in latest] == [(97.0, 1), (98.0, 2), (99.0, 0)]
+    finally:
+        store.close()
+
+
+def test_read_latest_of_an_empty_store(tmp_path):
+    store = HistoryStore(tmp_path)
+    try:
+        assert store.read_latest(10) == []
+    finally:
+        store.close()
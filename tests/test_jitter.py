@@ -0,0 +1,43 @@
+from jitter import ClockOffset, JitterBuffer
+
+
+def test_late_is_judged_per_source():
+    buffer = JitterBuffer(window_ms=25, max_age_ms=3000)
+    assert buffer.push(1000, 1000, 'a1', source='a')
+    assert buffer.pop_ready(1100) == ['a1']
+    # Another client's estimate may lag a little; that is not late
+    assert buffer.push(990, 1100, 'b1', source='b')
+    # An older cue from the same client is
+    assert not buffer.push(995, 1100, 'a0', source='a')
+    assert buffer.snapshot()['late'] == 1
+    assert buffer.flush() == ['b1']
+
+
+def test_pending_cues_are_released_in_order():
+    buffer = JitterBuffer(window_ms=25, max_age_ms=3000)
+    buffer.push(1010, 1010, 'b', source='b')
+    buffer.push(1000, 1011, 'a', source='a')
+    assert buffer.snapshot()['reordered'] == 1
+    assert buffer.pop_ready(1020) == []
+    assert buffer.pop_ready(1040) == ['a', 'b']
+
+
+def test_seeded_clock_exposes_a_stale_first_cue():
+    clock = ClockOffset()
+    clock.seed(50.0, local_ms=100000)
+    # First cue of a reconnecting tab, sent 5 s before it arrived
+    offset = clock.update(client_ms=100000 - 50 - 5000, local_ms=100000)
+    assert offset == 50.0
+    buffer = JitterBuffer(max_age_ms=3000)
+    assert not buffer.push(100000 - 5000, 100000, 'stale')
+
+    # Without a seed the same cue would look fresh
+    assert ClockOffset().update(client_ms=100000 - 50 - 5000, local_ms=100000) == 5050.0
+
+
+def test_seed_ages_out_and_clock_steps_reset():
+    clock = ClockOffset(window_ms=1000, step_ms=30000)
+    clock.seed(-500.0, local_ms=0)
+    assert clock.update(0, 100) == -500.0
+    assert clock.update(1000, 1100) == 100.0  # seed's window has passed
+    assert clock.update(0, 60000) == 60000.0  # client clock set back
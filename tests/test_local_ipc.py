@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from local_ipc import LENGTH, LineReader, UnixSocketListener, line_message
+from server import SubtitleServer
+
+needs_posix = pytest.mark.skipif(sys.platform == 'win32', reason="needs FIFOs and Unix sockets")
+
+
+async def make_server():
+    server = SubtitleServer(rate_limit=1000, rate_burst=1000, switch_delay=0)
+    server.loop = asyncio.get_running_loop()
+    shown = []
+    server.set_subtitle_callback(lambda text, timing, client_id: shown.append(text))
+    return server, shown
+
+
+async def wait_for(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_line_message_formats():
+    assert json.loads(line_message('hello\\nworld')) == {'type': 'subtitle', 'text': 'hello\nworld'}
+    assert line_message('   ') is None
+    assert line_message('{"type": "subtitle", "text": "x"}') == '{"type": "subtitle", "text": "x"}'
+    mpv = '{"event": "property-change", "id": 1, "name": "sub-text", "data": "from mpv"}'
+    assert json.loads(line_message(mpv))['text'] == 'from mpv'
+    assert line_message('{"event": "pause"}') is None
+    assert json.loads(line_message('{not json'))['text'] == '{not json'
+
+
+@needs_posix
+def test_fifo_lines_are_shown_and_writers_can_come_back(tmp_path):
+    fifo = tmp_path / 'subs'
+    os.mkfifo(fifo)
+
+    def write(*lines):
+        with open(fifo, 'w', encoding='utf-8') as f:
+            f.write(''.join(line + '\n' for line in lines))
+
+    async def scenario():
+        server, shown = await make_server()
+        reader = LineReader(server, str(fifo))
+        await reader.start()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, write, 'first line', '', '{"type": "subtitle", "text": "json"}')
+        await wait_for(lambda: len(shown) == 2)
+        await loop.run_in_executor(None, write, 'after reopen')
+        await wait_for(lambda: len(shown) == 3)
+        clients = server.get_client_count()
+        await reader.stop()
+        return shown, clients, server.get_client_count(), server.stats['local_messages']
+    assert asyncio.run(scenario()) == (['first line', 'json', 'after reopen'], 1, 0, 3)
+
+
+@needs_posix
+def test_unix_socket_round_trip(tmp_path):
+    path = tmp_path / 'overlay.sock'
+
+    async def send(writer, message):
+        data = json.dumps(message).encode('utf-8')
+        writer.write(LENGTH.pack(len(data)) + data)
+        await writer.drain()
+
+    async def scenario():
+        server, shown = await make_server()
+        listener = UnixSocketListener(server, str(path))
+        await listener.start()
+        reader, writer = await asyncio.open_unix_connection(str(path))
+        await send(writer, {'type': 'hello', 'protocols': [1]})
+        (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+        reply = json.loads(await reader.readexactly(length))
+        await send(writer, {'type': 'subtitle', 'text': 'over the socket'})
+        await wait_for(lambda: shown)
+        writer.close()
+        await wait_for(lambda: not server.get_client_count())
+        await listener.stop()
+        return reply, shown, path.exists()
+    reply, shown, exists = asyncio.run(scenario())
+    assert reply['type'] == 'hello' and reply['protocol'] == 1
+    assert shown == ['over the socket']
+    assert not exists
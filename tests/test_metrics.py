@@ -0,0 +1,114 @@
+from metrics import BUCKET_BOUNDS_MS, LatencyHistogram, LatencyTracker, PrometheusText
+
+
+def test_empty_histogram_reports_zero():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+    assert histogram.summary() == {'count': 0, 'mean': 0.0, 'min': 0.0, 'p50': 0.0,
+                                   'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+
+def test_percentiles_are_within_one_bucket():
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(float(value))
+    for percent, exact in ((50, 500), (95, 950), (99, 990)):
+        estimate = histogram.percentile(percent)
+        assert exact <= estimate <= exact * 1.2
+    assert histogram.percentile(100) == 1000
+    stats = histogram.summary()
+    assert stats['count'] == 1000
+    assert stats['mean'] == 500.5
+    assert stats['min'] == 1 and stats['max'] == 1000
+
+
+def test_percentile_never_exceeds_max():
+    histogram = LatencyHistogram()
+    histogram.record(3.0)
+    assert histogram.percentile(50) == 3.0
+    histogram.record(BUCKET_BOUNDS_MS[-1] * 2)  # overflow bucket
+    assert histogram.percentile(99) == BUCKET_BOUNDS_MS[-1] * 2
+
+
+def test_negative_values_clamp_to_zero():
+    histogram = LatencyHistogram()
+    histogram.record(-5.0)
+    assert histogram.min == 0.0
+    assert histogram.max == 0.0
+    assert histogram.total == 0.0
+
+
+def test_cumulative_is_monotone():
+    histogram = LatencyHistogram()
+    values = (0.5, 5.0, 50.0, 500.0, 5000.0, 30000.0, 59000.0)
+    for value in values:
+        histogram.record(value)
+    buckets = histogram.cumulative()
+    bounds = [bound for bound, _ in buckets]
+    counts = [count for _, count in buckets]
+    assert bounds == sorted(bounds)
+    assert counts == sorted(counts)
+    # Values above the last exported bound only show up in the +Inf bucket
+    assert counts[-1] == histogram.count - 1
+    for bound, count in buckets:
+        assert count == sum(1 for value in values if value <= bound)
+
+
+def test_copy_is_independent():
+    histogram = LatencyHistogram()
+    histogram.record(10.0)
+    copy = histogram.copy()
+    histogram.record(20.0)
+    assert copy.count == 1
+    assert copy.max == 10.0
+    assert histogram.count == 2
+
+
+def test_tracker_adds_stages_and_adopts_snapshots():
+    tracker = LatencyTracker()
+    tracker.record('transform.gloss', 2.0)
+    snapshot = tracker.snapshot()
+    assert snapshot['transform.gloss'].count == 1
+    tracker.record('transform.gloss', 4.0)
+    assert snapshot['transform.gloss'].count == 1
+
+    other = LatencyTracker()
+    other.record('paint', 7.0)
+    tracker.replace({'paint': other.snapshot()['paint']})
+    assert tracker.summary()['paint']['count'] == 1
+    tracker.reset()
+    assert 'transform.gloss' not in tracker.summary()
+
+
+def test_prometheus_counters_and_escaped_labels():
+    out = PrometheusText(prefix='test_')
+    out.counter('frames_total', "Frames", [({'format': 'json'}, 3), ({'format': 'a"b\\c'}, 4)])
+    out.gauge('clients', "Clients", 2)
+    assert out.text() == (
+        '# HELP test_frames_total Frames\n'
+        '# TYPE test_frames_total counter\n'
+        'test_frames_total{format="json"} 3\n'
+        'test_frames_total{format="a\\"b\\\\c"} 4\n'
+        '# HELP test_clients Clients\n'
+        '# TYPE test_clients gauge\n'
+        'test_clients 2\n'
+    )
+
+
+def test_prometheus_histogram_is_cumulative_in_seconds():
+    histogram = LatencyHistogram()
+    for value in (1.0, 10.0, 100.0):
+        histogram.record(value)
+    out = PrometheusText(prefix='')
+    out.histogram('latency_seconds', "Latency", 'stage', {'paint': histogram})
+    lines = out.text().splitlines()
+    assert lines[:2] == ['# HELP latency_seconds Latency', '# TYPE latency_seconds histogram']
+    buckets = [line for line in lines if line.startswith('latency_seconds_bucket')]
+    assert buckets[-1] == 'latency_seconds_bucket{stage="paint",le="+Inf"} 3'
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    bounds = [float(line.split('le="')[1].split('"')[0]) for line in buckets[:-1]]
+    assert bounds == sorted(bounds)
+    assert bounds[-1] < 60  # milliseconds were converted to seconds
+    assert 'latency_seconds_sum{stage="paint"} 0.111000' in lines
+    assert 'latency_seconds_count{stage="paint"} 3' in lines
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PyQt6.QtWidgets')
+
+TEXT = 'the quick brown fox jumps over the lazy dog and keeps on running far away'
+
+
+@pytest.fixture
+def view():
+    from renderer import SubtitleView
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    view = SubtitleView(cache_size=2)
+    view.resize(300, 200)
+    yield view
+    view.deleteLater()
+    app.processEvents()
+
+
+def test_pixmaps_come_from_the_lru(view):
+    first = view.pixmap_for('one', 300)
+    assert view.pixmap_for('one', 300) is first
+    assert view.cache_stats()['hits'] == 1
+    view.pixmap_for('two', 300)
+    view.pixmap_for('three', 300)
+    assert len(view.cache) == 2
+    view.pixmap_for('one', 300)  # evicted, rendered again
+    assert view.cache_stats()['misses'] == 4
+
+
+def test_unchanged_text_schedules_no_repaint(view):
+    assert view.setText('hello')
+    assert not view.setText('hello')
+    assert view.setText('hello', [(0, 2)])
+
+
+def test_wrap_reuses_lines_before_the_changed_tail(view):
+    from renderer import SubtitleView
+    font = view.text_font
+    lines = view.wrap(TEXT, 200, font)
+    assert len(lines) > 3
+    grown = TEXT + ' again and again'
+    reused = view.wrap(grown, 200, font)
+    assert view.lines_reused >= len(lines) - 2
+    assert reused == SubtitleView().wrap(grown, 200, font)
+
+
+def test_wrap_starts_over_for_a_different_width(view):
+    font = view.text_font
+    view.wrap(TEXT, 200, font)
+    view.wrap(TEXT + ' again', 250, font)
+    assert view.lines_reused == 0
+
+
+@pytest.fixture
+def fitter():
+    from renderer import FontFitter
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    yield FontFitter(min_size=8)
+    app.processEvents()
+
+
+def test_fit_returns_the_largest_size_within_max_lines(fitter):
+    size = fitter.fit(TEXT, 'Arial', 40, 400, 0, 2)
+    assert 8 < size < 40
+    assert fitter.count_lines(TEXT, 'Arial', size, 400) <= 2
+    assert fitter.count_lines(TEXT, 'Arial', size + 1, 400) > 2
+
+
+def test_fit_keeps_the_size_when_text_already_fits(fitter):
+    assert fitter.fit('short', 'Arial', 22, 400, 0, 2) == 22
+    assert fitter.probes == 1
+
+
+def test_fit_is_cached_per_text_and_box(fitter):
+    size = fitter.fit(TEXT, 'Arial', 40, 400, 0, 2)
+    probes = fitter.probes
+    assert fitter.fit(TEXT, 'Arial', 40, 400, 0, 2) == size
+    assert fitter.probes == probes
+    assert fitter.fit_hits == 1
+    fitter.fit(TEXT, 'Arial', 40, 300, 0, 2)
+    assert fitter.probes > probes
+
+
+def test_fit_falls_back_to_min_size(fitter):
+    assert fitter.fit(TEXT * 5, 'Arial', 40, 100, 0, 1) == 8
+
+
+def test_height_budget_also_shrinks(fitter):
+    spacing = fitter.font_metrics('Arial', 30).lineSpacing()
+    size = fitter.fit('one\ntwo\nthree', 'Arial', 30, 400, 2 * spacing, 0)
+    assert size < 30
+    assert fitter.count_lines('one\ntwo\nthree', 'Arial', size, 400) == 3
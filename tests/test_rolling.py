@@ -0,0 +1,77 @@
+from rolling import (EXTEND, REPLACE, REVISE, SCROLL, RollingCaption, Update,
+                     apply_delta, classify)
+
+
+def test_classify_growing_caption():
+    assert classify("we were", "we were going to") == Update(EXTEND, 0, 7)
+    assert classify("we were going to", "we were going two") == Update(REVISE, 0, 15)
+    previous = "we were going to\nthe park"
+    assert classify(previous, "the park and") == Update(SCROLL, 17, 8)
+    assert classify("we were going to", "Something else entirely") == Update(REPLACE, 0, 0)
+
+
+def test_finished_sentences_are_not_continued():
+    assert classify("Thank you.", "Thank you, sir.").kind == REPLACE
+    assert classify("I do not know.", "I do not know what you mean.").kind == REPLACE
+    assert classify("Really?", "Really? Yes.").kind == REPLACE
+    # A repeat is still the same caption
+    assert classify("Thank you.", "Thank you.").kind == EXTEND
+
+
+def test_apply_delta():
+    assert apply_delta("we were going to", 0, 15, "wo", 17) == "we were going two"
+    assert apply_delta("abc", 0, 4, "x") is None
+    assert apply_delta("abc", 0, 3, "d", 5) is None
+
+
+def lines(finished):
+    return [text for text, _, _ in finished]
+
+
+def test_growing_caption_reaches_history_once():
+    caption = RollingCaption()
+    t = 100.0
+    for text in ["we were", "we were going to", "we were going two",
+                 "we were going two\nthe park"]:
+        _, finished = caption.update(text, t)
+        assert finished == []
+        t += 0.3
+    update, finished = caption.update("the park and", t)
+    assert update.kind == SCROLL
+    assert lines(finished) == ["we were going two"]
+    assert lines(caption.finish()) == ["the park and"]
+
+
+def test_separate_cues_each_reach_history():
+    caption = RollingCaption()
+    recorded = []
+    # Cues that start like the previous one, shown a few seconds apart
+    for i, text in enumerate(["Thank you.", "Thank you, sir.", "I do not know.",
+                              "I do not know what you mean.", "Wait", "Wait for me"]):
+        recorded += lines(caption.update(text, 100.0 + 2.5 * i)[1])
+    recorded += lines(caption.finish())
+    assert recorded == ["Thank you.", "Thank you, sir.", "I do not know.",
+                        "I do not know what you mean.", "Wait", "Wait for me"]
+
+
+def test_quick_sentence_cues_are_not_merged():
+    caption = RollingCaption()
+    caption.update("Thank you.", 100.0)
+    update, finished = caption.update("Thank you, sir.", 100.4)
+    assert update.kind == REPLACE
+    assert lines(finished) == ["Thank you."]
+
+
+def test_repeat_after_a_pause_is_not_a_new_line():
+    caption = RollingCaption()
+    caption.update("Hello there", 100.0)
+    update, finished = caption.update("Hello there", 110.0)
+    assert update.kind == EXTEND and finished == []
+
+
+def test_other_source_replaces():
+    caption = RollingCaption()
+    caption.update("we were", 100.0, source_id=1)
+    update, finished = caption.update("we were going", 100.2, source_id=2)
+    assert update.kind == REPLACE
+    assert finished == [("we were", 100.0, 1)]
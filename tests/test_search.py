@@ -0,0 +1,51 @@
+import random
+
+import search
+from search import SearchIndex, normalize
+
+
+def brute_force(lines, query, limit=200):
+    needle = normalize(query)
+    return [text for text in reversed(lines) if needle in normalize(text)][:limit]
+
+
+def test_matches_brute_force_over_the_kept_lines():
+    rng = random.Random(7)
+    words = ['alpha', 'beta', 'gamma', 'delta', 'Épée', 'straße', 'mix', 'ab']
+    index = SearchIndex(capacity=300)
+    lines = []
+    for i in range(2000):
+        line = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 6))) + f' {i}'
+        lines.append(line)
+        index.add(line, float(i))
+    kept = lines[-len(index):]
+    assert 300 <= len(index) < 375
+    for query in ['alpha', 'ta ga', 'épée', 'STRASSE', 'mix ab', '1999', '12', 'x']:
+        assert [e.text for e in index.search(query)] == brute_force(kept, query)
+
+
+def test_evicted_lines_leave_no_postings():
+    index = SearchIndex(capacity=100)
+    for i in range(1000):
+        index.add(f'line {i:04d} word{i}')
+    assert index.search('0004 ') == []
+    assert index.search('line 0999')[0].text == 'line 0999 word999'
+    # Posting lists are trimmed a batch per added line
+    i = 1000
+    while index._untrimmed:
+        index.add(f'line {i:04d} word{i}')
+        i += 1
+    assert min(posting[0] for posting in index.postings.values()) >= index.base
+    assert len(index._pool) == len(index.texts)
+    assert len(index.postings) < 600
+
+
+def test_short_queries_scan_only_the_newest_lines(monkeypatch):
+    monkeypatch.setattr(search, 'SHORT_QUERY_SCAN', 50)
+    index = SearchIndex()
+    index.add('zq old')
+    for i in range(100):
+        index.add(f'line {i}')
+    assert index.search('zq') == []
+    index.add('zq new')
+    assert [e.text for e in index.search('zq')] == ['zq new']
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import time
+
+from server import SubtitleServer
+
+
+class FakeConnection:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def make_server(**kwargs):
+    server = SubtitleServer(rate_limit=1000, rate_burst=1000, switch_delay=0, **kwargs)
+    server.loop = asyncio.get_running_loop()
+    shown = []
+    server.set_subtitle_callback(lambda text, timing, client_id: shown.append(text))
+    return server, shown
+
+
+def subtitle(text, age_ms=0.0, url='https://example.com/watch'):
+    return json.dumps({'type': 'subtitle', 'text': text, 'url': url,
+                       'timestamp': time.time() * 1000 - age_ms})
+
+
+def test_single_sender_is_not_held():
+    async def scenario():
+        server, shown = await make_server()
+        session = server.open_session(FakeConnection())
+        await server.handle_message(session, subtitle('hello'))
+        return shown, len(server.jitter)
+    assert run(scenario()) == (['hello'], 0)
+
+
+def test_two_senders_are_held_and_ordered():
+    async def scenario():
+        server, shown = await make_server()
+        first = server.open_session(FakeConnection())
+        second = server.open_session(FakeConnection())
+        await server.handle_message(first, subtitle('one', url='https://a/'))
+        await server.handle_message(second, subtitle('two', url='https://b/'))
+        held = list(shown)
+        await asyncio.sleep(0.1)
+        return held, shown
+    held, shown = run(scenario())
+    assert held == ['one']  # the only sender at the time
+    assert shown == ['one', 'two']
+
+
+def test_reconnect_backlog_is_expired():
+    async def scenario():
+        server, shown = await make_server()
+        session = server.open_session(FakeConnection())
+        await server.handle_message(session, subtitle('live'))
+        server.close_session(session)
+        again = server.open_session(FakeConnection())
+        await server.handle_message(again, subtitle('backlog', age_ms=5000))
+        await server.handle_message(again, subtitle('current'))
+        return shown, server.jitter.snapshot()['expired']
+    assert run(scenario()) == (['live', 'current'], 1)
+
+
+class FakeWebSocket(FakeConnection):
+    """Yields the given messages like a websocket, then closes"""
+
+    def __init__(self, messages):
+        super().__init__()
+        self.messages = messages
+
+    async def __aiter__(self):
+        for message in self.messages:
+            yield message
+
+
+def test_websocket_survives_non_object_json():
+    async def scenario():
+        server, shown = await make_server()
+        await server.handler(FakeWebSocket(['[]', '"x"', '1', 'null', subtitle('after')]))
+        return shown, server.stats['decode_errors'], server.clients
+    shown, errors, clients = run(scenario())
+    assert shown == ['after']
+    assert errors == 4
+    assert clients == {}
+
+
+def test_subtitle_text_must_be_a_string():
+    async def scenario():
+        server, shown = await make_server()
+        session = server.open_session(FakeConnection())
+        await server.handle_message(session, json.dumps({'type': 'subtitle', 'text': ['x']}))
+        return shown, server.stats['decode_errors']
+    assert run(scenario()) == ([], 1)
+
+
+def test_line_input_survives_non_object_json():
+    from local_ipc import LineReader, line_message
+
+    async def scenario():
+        server, shown = await make_server()
+        reader = LineReader(server, '-')
+        reader.session = server.open_session(FakeConnection())
+        for line in ['[]\n', '"x"\n', 'hello\n']:
+            await reader.receive(line_message(line))
+        return shown, server.stats['decode_errors']
+    # Anything but a JSON object is a plain text line
+    assert run(scenario()) == (['[]', '"x"', 'hello'], 0)
+
+
+def test_unix_socket_survives_non_object_json(tmp_path):
+    from local_ipc import LENGTH, UnixSocketListener
+
+    async def scenario():
+        server, shown = await make_server()
+        listener = UnixSocketListener(server, str(tmp_path / 'overlay.sock'))
+        await listener.start()
+        try:
+            reader, writer = await asyncio.open_unix_connection(str(listener.path))
+            for message in ['[]', '"x"', subtitle('after')]:
+                payload = message.encode('utf-8')
+                writer.write(LENGTH.pack(len(payload)) + payload)
+            await writer.drain()
+            for _ in range(100):
+                if shown:
+                    break
+                await asyncio.sleep(0.01)
+            writer.close()
+        finally:
+            await listener.stop()
+        return shown, server.stats['decode_errors']
+    assert run(scenario()) == (['after'], 2)
+
+
+def test_track_append_adds_to_the_uploaded_track():
+    def track(cues, **extra):
+        return json.dumps({'type': 'track', 'url': 'https://example.com/watch', **extra,
+                           'cues': [{'start': s, 'end': e, 'text': t} for s, e, t in cues]})
+
+    async def scenario():
+        server, _ = await make_server()
+        session = server.open_session(FakeConnection())
+        await server.handle_message(session, track([(10, 12, 'b'), (0, 2, 'a')]))
+        await server.handle_message(session, track([(5, 7, 'middle')], append=True))
+        appended = [cue.text for cue in session.track.cues]
+        await server.handle_message(session, track([(1, 3, 'new')]))
+        replaced = [cue.text for cue in session.track.cues]
+        await server.handle_message(session, track([]))
+        return appended, replaced, session.track
+    assert run(scenario()) == (['a', 'middle', 'b'], ['new'], None)
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    async def scenario():
+        server, _ = await make_server()
+        session = server.open_session(FakeConnection())
+        await server.handle_message(session, subtitle('hello'))
+        await server.handle_message(session, 'not json')
+        assert await server.process_request('/', {}) is None
+        return await server.process_request('/metrics?x=1', {})
+    status, headers, body = run(scenario())
+    assert status == 200
+    assert dict(headers)['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert int(dict(headers)['Content-Length']) == len(body)
+
+    text = body.decode('utf-8')
+    assert text.endswith('\n')
+    lines = text.splitlines()
+    assert 'subtitle_overlay_clients 1' in lines
+    assert 'subtitle_overlay_frames_received_total{format="json"} 1' in lines
+    assert 'subtitle_overlay_decode_errors_total 1' in lines
+    # Every sample follows the HELP and TYPE lines of its metric family
+    typed = set()
+    for index, line in enumerate(lines):
+        if line.startswith('# TYPE '):
+            name, kind = line.split()[2:]
+            assert lines[index - 1].startswith(f'# HELP {name} ')
+            assert kind in ('counter', 'gauge', 'histogram')
+            typed.add(name)
+        elif not line.startswith('#'):
+            name = line.split('{', 1)[0].split(' ', 1)[0]
+            assert name in typed or name.rsplit('_', 1)[0] in typed, line
+    assert 'subtitle_overlay_latency_seconds' in typed
@@ -0,0 +1,68 @@
+import math
+
+from metrics import CueTiming
+from server_process import SubtitleRing, decode_subtitle, encode_subtitle
+
+
+def test_ring_wraps_and_drops_when_full():
+    ring = SubtitleRing(size=128)
+    try:
+        assert ring.put(b'a' * 100) is True
+        assert ring.put(b'b' * 40) is None
+        assert ring.dropped == 1
+        assert ring.take_all() == [b'a' * 100]
+        for i in range(300):
+            payload = bytes([i % 256]) * (i % 60)
+            assert ring.put(payload) is True
+            assert ring.take_all() == [payload]
+    finally:
+        ring.close(unlink=True)
+
+
+def test_ring_wakes_only_when_it_was_empty():
+    ring = SubtitleRing(size=1024)
+    try:
+        assert ring.put(b'one') is True
+        assert ring.put(b'two') is False
+        assert ring.take_all() == [b'one', b'two']
+        assert ring.put(b'three') is True
+    finally:
+        ring.close(unlink=True)
+
+
+def test_subtitle_record_round_trip():
+    timing = CueTiming(1234.5)
+    text, decoded, source_id = decode_subtitle(encode_subtitle('héllo\nworld', timing, 7))
+    assert (text, source_id, decoded.client_time) == ('héllo\nworld', 7, 1234.5)
+    assert decoded.dispatched == timing.dispatched
+
+    _, decoded, _ = decode_subtitle(encode_subtitle('x', CueTiming(), 0))
+    assert decoded.client_time is None
+    assert not math.isnan(decoded.received)
+
+
+def test_stop_sent_during_child_startup_is_not_lost(tmp_path):
+    import socket
+    import time
+
+    from config import ConfigManager
+    from server_process import ServerProcess
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    config = ConfigManager(config_dir=tmp_path)
+    config.settings['server']['port'] = port
+    config.settings['behavior']['persist_history'] = False
+    process = ServerProcess(config)
+    process.start()
+    try:
+        process.request_stop()  # before the child has built its loop
+        started = time.monotonic()
+        process.process.join(10)
+        assert process.process.exitcode == 0
+        assert time.monotonic() - started < 10
+    finally:
+        if process.process.is_alive():
+            process.process.terminate()
+        process.ring.close(unlink=True)
@@ -0,0 +1,45 @@
+import random
+
+from subtitle_file import Cue, CueIndex
+
+
+def brute_force(cues, t):
+    return sorted(cue for cue in cues if cue.start <= t < cue.end)
+
+
+def check(cues, times):
+    index = CueIndex(cues)
+    for t in times:
+        assert index.active(t) == brute_force(cues, t), t
+
+
+def test_whole_file_cue_with_many_short_cues():
+    rng = random.Random(11)
+    cues = [Cue(0.0, 7200.0, '[music]')]
+    for i in range(2000):
+        start = i * 3.5 + rng.random()
+        cues.append(Cue(start, start + rng.uniform(0.5, 4.0), f'line {i}'))
+    times = [rng.uniform(-5, 7300) for _ in range(2000)]
+    times += [cue.start for cue in cues[:200]] + [cue.end for cue in cues[:200]]
+    check(cues, times)
+
+
+def test_random_overlapping_cues():
+    rng = random.Random(5)
+    for _ in range(50):
+        cues = []
+        for i in range(rng.randint(0, 60)):
+            start = round(rng.uniform(0, 100), 1)
+            cues.append(Cue(start, start + round(rng.uniform(0, 30), 1), str(i)))
+        times = [round(rng.uniform(-1, 131), 1) for _ in range(200)]
+        check(cues, times)
+
+
+def test_next_change_and_duration():
+    index = CueIndex([Cue(0.0, 100.0, 'sign'), Cue(1.0, 2.0, 'a'), Cue(5.0, 6.0, 'b')])
+    assert index.duration == 100.0
+    assert index.text_at(1.5) == 'sign\na'
+    assert index.next_change(1.5) == 2.0
+    assert index.next_change(2.0) == 5.0
+    assert index.next_change(6.0) == 100.0
+    assert CueIndex().active(1.0) == []
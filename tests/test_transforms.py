@@ -0,0 +1,62 @@
+import asyncio
+
+from transforms import GlossDictionary, TransformPipeline, build_stages
+
+
+def write_dictionary(tmp_path):
+    path = tmp_path / 'gloss.tsv'
+    path.write_text('privet\thello\nmir\tworld\n', encoding='utf-8')
+    return str(path)
+
+
+def test_stages_run_in_the_configured_order(tmp_path):
+    gloss = write_dictionary(tmp_path)
+    text = '<i>Привет,   мир</i>'
+    first = TransformPipeline(['strip_tags', 'normalize_whitespace', 'transliterate', 'gloss'],
+                              gloss_dictionary=gloss)
+    assert first.run(text)[0] == 'Privet (hello), mir (world)'
+    # Glossing before transliterating sees only Cyrillic words
+    second = TransformPipeline(['strip_tags', 'gloss', 'transliterate'], gloss_dictionary=gloss)
+    assert second.run(text)[0] == 'Privet,   mir'
+    assert [name for name, _ in first.run(text)[1]] == first.names
+
+
+def test_unknown_stages_are_skipped(capsys):
+    assert [stage.name for stage in build_stages(['strip_tags', 'shout'])] == ['strip_tags']
+    assert 'Unknown subtitle transform: shout' in capsys.readouterr().out
+
+
+def test_gloss_dictionary_glosses_each_word_once_per_line(tmp_path):
+    gloss = GlossDictionary(write_dictionary(tmp_path))
+    assert gloss('Privet privet\nmir') == 'Privet (hello) privet\nmir (world)'
+    assert GlossDictionary(str(tmp_path / 'missing.tsv'))('privet') == 'privet'
+
+
+def test_results_are_cached_in_an_lru():
+    pipeline = TransformPipeline(['normalize_whitespace'], cache_size=2)
+
+    async def process(*texts):
+        return [(await pipeline.process(text))[0] for text in texts]
+
+    assert asyncio.run(process('a  b', 'c  d', 'e  f')) == ['a b', 'c d', 'e f']
+    assert pipeline.lookup('a  b') is None  # evicted
+    assert pipeline.lookup('e  f') == 'e f'
+    assert pipeline.lookup('c  d') == 'c d'
+    assert pipeline.stats()['hits'] == 2
+    pipeline.configure(['strip_tags'])
+    assert pipeline.lookup('e  f') is None  # results of the old chain are not reused
+
+
+def test_heavy_stages_run_in_a_process_pool(tmp_path):
+    pipeline = TransformPipeline(['transliterate', 'gloss'], workers=1, executor='process',
+                                 gloss_dictionary=write_dictionary(tmp_path))
+    try:
+        async def process():
+            first = await pipeline.process('Привет мир')
+            second = await pipeline.process('Ёж')
+            return first[0], second[0]
+        assert asyncio.run(process()) == ('Privet (hello) mir (world)', 'Yozh')
+        assert pipeline.pool is not None
+        assert pipeline.stats()['misses'] == 2
+    finally:
+        pipeline.shutdown()